@@ -186,6 +186,18 @@ function AudioRecorder() {
     }
   };
 
+  // Poll the processing job until it has finished (or we give up).
+  const waitForJob = async (jobId, intervalMs = 1000, maxAttempts = 300) => {
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+      const res = await axios.get(`http://localhost:8000/api/jobs/${jobId}`);
+      if (res.data.status === "succeeded" || res.data.status === "failed") {
+        return res.data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+    return { status: "failed", error: "Timed out waiting for processing" };
+  };
+
   const uploadAudio = async (fileOrBlob) => {
     const formData = new FormData();
     
@@ -220,9 +232,15 @@ function AudioRecorder() {
 
       console.log("Server response:", response);
 
-      if (response.data && response.data.status === "success") {
-        setStatus("Upload successful!");
-        setTranscription(response.data.transcription || "No transcription available");
+      if (response.data && response.data.status === "accepted") {
+        setStatus("Processing...");
+        const job = await waitForJob(response.data.job_id);
+        if (job.status === "succeeded") {
+          setStatus("Upload successful!");
+          setTranscription(job.result?.transcription || "No transcription available");
+        } else {
+          setStatus("Processing error: " + (job.error || "Unknown error"));
+        }
       } else {
         setStatus("Upload error: " + (response.data?.message || "Unknown error"));
       }
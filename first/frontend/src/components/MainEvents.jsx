@@ -12,6 +12,23 @@ function MainEvents() {
       .catch((err) => console.error(err));
   }, []);
 
+  // Events are keyed by their JSON string in all_events.
+  const safeParseJSON = (jsonString) => {
+    try {
+      return JSON.parse(jsonString);
+    } catch (e) {
+      return jsonString;
+    }
+  };
+
+  const getEventString = (event) => {
+    if (typeof event === "object" && event !== null) {
+      const parts = [event.subject, event.action, event.object].filter(Boolean);
+      return parts.length > 0 ? parts.join(" ") : event.sentence || "";
+    }
+    return event;
+  };
+
   return (
     <div style={{ padding: '2rem' }}>
       {/* Main Events */}
@@ -34,9 +51,9 @@ function MainEvents() {
           marginBottom: '2rem'
         }}
       >
-        {data.main_events.map((event) => (
+        {data.main_events.map((event, index) => (
           <div
-            key={event}
+            key={index}
             style={{
               padding: '1rem',
               backgroundColor: '#f8f9fa',
@@ -46,7 +63,7 @@ function MainEvents() {
             }}
           >
             <p style={{ margin: 0, fontWeight: '500', fontSize: '1.1rem' }}>
-              {event}
+              {getEventString(event)}
             </p>
           </div>
         ))}
@@ -85,7 +102,7 @@ function MainEvents() {
               alignItems: 'center'
             }}
           >
-            <span style={{ fontWeight: '500' }}>{event}</span>
+            <span style={{ fontWeight: '500' }}>{getEventString(safeParseJSON(event))}</span>
             <span
               style={{
                 backgroundColor: '#00b894',
@@ -1,15 +1,51 @@
 import React, { useEffect, useState } from "react";
 import axios from "axios";
 
+const PAGE_SIZE = 20;
+const LIST_FIELDS = "id,created_at,sentiment_score,snippet";
+
 function Timeline() {
   const [entries, setEntries] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
+  // Full entries (transcription and events), fetched when an entry is expanded.
+  const [details, setDetails] = useState({});
+
+  const loadPage = (cursor) => {
+    setLoading(true);
+    axios
+      .get("http://localhost:8000/api/timeline", {
+        params: {
+          limit: PAGE_SIZE,
+          fields: LIST_FIELDS,
+          ...(cursor ? { start_after: cursor } : {}),
+        },
+      })
+      .then((res) => {
+        setEntries((prev) => (cursor ? [...prev, ...res.data.entries] : res.data.entries));
+        setNextCursor(res.data.next_cursor);
+      })
+      .catch((err) => console.error(err))
+      .finally(() => setLoading(false));
+  };
 
   useEffect(() => {
+    loadPage(null);
+  }, []);
+
+  const toggleDetails = (entryId) => {
+    if (details[entryId]) {
+      setDetails((prev) => {
+        const { [entryId]: _, ...rest } = prev;
+        return rest;
+      });
+      return;
+    }
     axios
-      .get("http://localhost:8000/api/timeline")
-      .then((res) => setEntries(res.data))
+      .get(`http://localhost:8000/api/entries/${entryId}`)
+      .then((res) => setDetails((prev) => ({ ...prev, [entryId]: res.data })))
       .catch((err) => console.error(err));
-  }, []);
+  };
 
   // Helper function to safely parse JSON
   const safeParseJSON = (jsonString) => {
@@ -94,7 +130,7 @@ function Timeline() {
                 }}
               >
                 {entry.created_at
-                  ? new Date(entry.created_at?.seconds * 1000).toLocaleString()
+                  ? new Date(entry.created_at).toLocaleString()
                   : "No date"}
               </span>
               <span
@@ -110,7 +146,7 @@ function Timeline() {
               </span>
             </div>
 
-            {/* Transcription */}
+            {/* Transcription (snippet until expanded) */}
             <p
               style={{
                 margin: "0 0 1rem 0",
@@ -119,26 +155,63 @@ function Timeline() {
                 color: "#333",
               }}
             >
-              {entry.transcription || "No transcription available"}
+              {details[entry.id]
+                ? details[entry.id].transcription || "No transcription available"
+                : entry.snippet || "No transcription available"}
             </p>
 
+            <button
+              onClick={() => toggleDetails(entry.id)}
+              style={{
+                background: "none",
+                border: "none",
+                color: "#00b894",
+                cursor: "pointer",
+                padding: 0,
+                marginBottom: "0.5rem",
+              }}
+            >
+              {details[entry.id] ? "Show less" : "Show more"}
+            </button>
+
             {/* Related Events */}
-            <div style={{ fontSize: "0.8rem", color: "#555" }}>
-              {safeParseJSON(entry.events_tagged).length > 0 && (
-                <div style={{ marginBottom: "0.5rem", fontStyle: "italic" }}>
-                  Related Event
-                  {safeParseJSON(entry.events_tagged).length > 1 ? "s" : ""}:
-                </div>
-              )}
-              {safeParseJSON(entry.events_tagged).map((eventItem, index) => (
-                <div key={index} style={{ marginBottom: "0.25rem" }}>
-                  {getEventString(eventItem)}
-                </div>
-              ))}
-            </div>
+            {details[entry.id] && (
+              <div style={{ fontSize: "0.8rem", color: "#555" }}>
+                {safeParseJSON(details[entry.id].events_tagged).length > 0 && (
+                  <div style={{ marginBottom: "0.5rem", fontStyle: "italic" }}>
+                    Related Event
+                    {safeParseJSON(details[entry.id].events_tagged).length > 1 ? "s" : ""}:
+                  </div>
+                )}
+                {safeParseJSON(details[entry.id].events_tagged).map((eventItem, index) => (
+                  <div key={index} style={{ marginBottom: "0.25rem" }}>
+                    {getEventString(eventItem)}
+                  </div>
+                ))}
+              </div>
+            )}
           </div>
         ))
       )}
+
+      {nextCursor && (
+        <div style={{ textAlign: "center" }}>
+          <button
+            onClick={() => loadPage(nextCursor)}
+            disabled={loading}
+            style={{
+              padding: "0.5rem 1.5rem",
+              borderRadius: "999px",
+              border: "1px solid #00b894",
+              backgroundColor: "white",
+              color: "#00b894",
+              cursor: loading ? "default" : "pointer",
+            }}
+          >
+            {loading ? "Loading..." : "Load more"}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,19 +1,12 @@
-from google.cloud import firestore
-from .database import get_db
-
-db = get_db()
+from .storage import get_storage
 
 def create_voice_entry(user_id: str, transcription: str):
-    """ Adds a voice entry to Firestore. """
-    doc_ref = db.collection("voice_entries").document()
-    doc_ref.set({
+    """ Adds a voice entry to the configured storage. """
+    return get_storage().add_entry({
         "user_id": user_id,
         "transcription": transcription,
-        "created_at": firestore.SERVER_TIMESTAMP
-    })
-    return doc_ref.id
+    }, [])
 
 def get_all_voice_entries():
-    """ Retrieves all voice entries from Firestore. """
-    docs = db.collection("voice_entries").stream()
-    return [{**doc.to_dict(), "id": doc.id} for doc in docs]
+    """ Retrieves all voice entries from the configured storage. """
+    return list(get_storage().iter_entries())
@@ -1,25 +1,77 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
 import os
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+from . import config
 
 # Get the absolute path to the backend directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CREDENTIALS_PATH = os.path.join(BASE_DIR, "firebase_config.json")  # Make sure this file exists
 
-# Initialize Firebase only if it hasn't been initialized
-if not firebase_admin._apps:
-    try:
-        cred = credentials.Certificate(CREDENTIALS_PATH)
-        firebase_admin.initialize_app(cred)
-        print("Firebase initialized successfully")
-    except Exception as e:
-        print(f"Error initializing Firebase: {e}")
+def _init_firebase():
+    """ Initialize Firebase only if it hasn't been initialized """
+    if not firebase_admin._apps:
+        try:
+            cred = credentials.Certificate(CREDENTIALS_PATH)
+            firebase_admin.initialize_app(cred)
+            print("Firebase initialized successfully")
+        except Exception as e:
+            print(f"Error initializing Firebase: {e}")
 
 def get_db():
     """ Returns a Firestore database instance. """
+    _init_firebase()
     try:
         db = firestore.client()
         return db
     except Exception as e:
         print(f"Error getting Firestore client: {e}")
         return None
+
+# SQL backend. The engine is created on first use, so importing this module
+# (or forking worker processes) never opens a connection. Sessions are made by
+# the storage backend (see storage.sql.SqlStorage).
+_engine = None
+_engine_lock = threading.Lock()
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a worker is writing.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+def create_sql_engine(url: str):
+    """ Create an engine with a connection pool suited to the database behind url. """
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # A single shared connection, or every session would see its own empty database.
+            engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+        else:
+            engine = create_engine(
+                url,
+                connect_args=connect_args,
+                pool_size=config.DB_POOL_SIZE,
+                max_overflow=config.DB_MAX_OVERFLOW,
+            )
+            event.listen(engine, "connect", _sqlite_pragmas)
+        return engine
+    return create_engine(
+        url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+def get_engine():
+    """ Returns the process-wide SQLAlchemy engine for config.DATABASE_URL. """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_sql_engine(config.DATABASE_URL)
+    return _engine
@@ -1,15 +1,38 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-import uuid
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import os
-import json
-from .database import get_db
-from .services.transcription import transcribe_audio
-from .services.nlp import analyze_text, extract_events
-from .services.event_linking import link_events
-from firebase_admin import firestore as admin_firestore
+import threading
+import time
+import zipfile
+from typing import Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+from . import config
+from .pipeline import process_audio, process_audio_batch
+from .services.jobs import JobQueue, QueueFullError
+from .services.uploads import (
+    extract_audio_archive, save_upload, EmptyUploadError, UploadTooLargeError,
+)
+from .services.transcription import get_transcriber
+from .services.cache import cache_stats
+from .services.audio_store import get_audio_store
+from .services.metrics import (
+    REQUEST_SECONDS, metrics_summary, render_prometheus, server_timing_header,
+    start_request_timings, timed,
+)
+from .services.profiling import ProfiledRoute, profiling_requested, save_profile, start_request_profile
+from .services.registry import registry
+from .storage import get_storage, Storage, StorageUnavailableError
+from .services.export import gzip_chunks, iter_ndjson
+from .services.event_registry import get_event_registry
+from .services.events import events_json
+from .services.search import get_search_index, InvalidQueryError
+from .services.vector_store import encode_text, get_vector_store, VectorStoreUnavailableError
+from .services.pagination import decode_cursor, encode_cursor, make_snippet, InvalidCursorError
 
 app = FastAPI()
+# Endpoints run through the profiler when a request asks for it (see instrument_requests)
+app.router.route_class = ProfiledRoute
 
 # Add CORS middleware
 app.add_middleware(
@@ -24,158 +47,485 @@ app.add_middleware(
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "uploaded_audios")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# Get credentials path
-CRED_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "google_speech_credentials.json")
+# Transcription and NLP run on this pool instead of the event loop
+job_queue = JobQueue(
+    workers=config.JOB_WORKERS,
+    executor=config.JOB_EXECUTOR,
+    max_pending=config.JOB_MAX_PENDING,
+    history_size=config.JOB_HISTORY_SIZE,
+)
+
+@app.on_event("startup")
+def init_transcriber():
+    """ Create the shared speech-to-text backend (and its client pool) once. """
+    transcriber = get_transcriber()
+    print(f"Using transcriber backend: {transcriber.config_key()}")
+    if hasattr(transcriber, "warm_up"):
+        try:
+            transcriber.warm_up()
+        except Exception as e:
+            print(f"Error initializing transcriber: {e}")
+
+@app.on_event("startup")
+def warm_up_models():
+    """
+    With WARM_UP_MODELS, load the NLP models in the background so the server
+    starts accepting requests right away; /api/ready turns ready once they are loaded.
+    Otherwise they are loaded by the first job that needs them.
+    """
+    if config.WARM_UP_MODELS:
+        # nlp and event_linking register their models when the pipeline is imported
+        threading.Thread(target=registry.warm_up, name="model-warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_job_queue():
+    job_queue.shutdown(wait=False)
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """
+    Refuse uploads whose declared Content-Length is already over the limit,
+    before any of the body is read.
+    """
+    limit = config.BATCH_MAX_BYTES if request.url.path == "/api/entries/batch" else config.MAX_UPLOAD_BYTES
+    if request.url.path.startswith("/api/entries/") and limit:
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            return JSONResponse(
+                status_code=413,
+                content={"status": "error",
+                         "message": f"Upload exceeds the maximum size of {limit} bytes"}
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """
+    Time every request into the request histogram (by route template) and add a
+    Server-Timing header with the stages timed while handling it. Optionally runs
+    the endpoint under the sampling profiler (see config.PROFILING_ENABLED).
+    """
+    profile = start_request_profile() if profiling_requested(request) else None
+    timings = start_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
 
-# Remove the Firestore initialization code and just use get_db
-db = get_db()
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    REQUEST_SECONDS.observe(elapsed, request.method, route_path, str(response.status_code))
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    if profile is not None:
+        report_path = save_profile(profile, request.method, request.url.path)
+        if report_path:
+            response.headers["X-Profile-Path"] = report_path
+    return response
 
-@app.post("/api/entries/upload")
-async def upload_audio(file: UploadFile = File(...)):
+@app.post("/api/entries/upload", status_code=202)
+async def upload_audio(file: UploadFile = File(...), user_id: Optional[str] = Form(None)):
+    """
+    Saves the uploaded recording and queues it for processing.
+    Responds with 202 and a job id; poll GET /api/jobs/{job_id} for the result.
+    """
     try:
         print(f"Received file: {file.filename}, content_type: {file.content_type}")
         
-        # Create unique filename (keep original extension)
+        # Stream the file to disk (keep original extension)
         extension = file.filename.split(".")[-1]
-        file_name = f"{uuid.uuid4()}.{extension}"
-        audio_path = os.path.join(UPLOAD_DIR, file_name)
-        
-        # Save the file
-        content = await file.read()
-        if len(content) == 0:
-            raise ValueError("Received empty file")
-            
-        with open(audio_path, "wb") as f:
-            f.write(content)
-        
-        file_size = os.path.getsize(audio_path)
-        print(f"File saved, size: {file_size} bytes")
-        
-        if file_size == 0:
-            raise ValueError("File was saved but is empty")
+        with timed("save_upload"):
+            upload = await save_upload(
+                file,
+                UPLOAD_DIR,
+                extension,
+                chunk_size=config.UPLOAD_CHUNK_SIZE,
+                max_bytes=config.MAX_UPLOAD_BYTES,
+            )
+        print(f"File saved, size: {upload.size} bytes, sha256: {upload.sha256}")
 
-        # Transcribe
-        transcription = transcribe_audio(audio_path)
-        
-        # Extract events and analyze sentiment
-        if transcription:
-            analysis = analyze_text(transcription)
-            events = extract_events(transcription)
-        else:
-            analysis = {"sentiment_score": 0, "events": []}
-            events = []
+        job_id = job_queue.submit(process_audio, upload.path, upload.sha256, upload.size, user_id)
+
+        return {
+            "status": "accepted",
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}",
+            "message": "Audio uploaded and queued for processing"
+        }
+
+    except UploadTooLargeError as e:
+        print(f"Rejecting upload: {e}")
+        return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+    except QueueFullError as e:
+        print(f"Rejecting upload: {e}")
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)})
+    except Exception as e:
+        print(f"Error in upload_audio: {str(e)}")
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
 
-        # Only try to save to Firestore if it's initialized
-        if db is not None:
+@app.post("/api/entries/batch", status_code=202)
+async def upload_audio_batch(files: List[UploadFile] = File(...), user_id: Optional[str] = Form(None)):
+    """
+    Saves many recordings, sent as several "files" parts and/or zip archives of
+    audio files, and queues them for processing as one job (see
+    pipeline.process_audio_batch).
+
+    Responds with 202, a job id and the files that were accepted; files that could
+    not be saved are listed with an error and are not processed. The job result
+    reports the outcome of each accepted file.
+    """
+    accepted, rejected = [], []
+    total = 0
+    try:
+        for file in files:
+            extension = file.filename.split(".")[-1].lower()
             try:
-                doc_ref = db.collection("voice_entries").document()
-                doc_data = {
-                    "audio_file_path": audio_path,
-                    "transcription": transcription or "No transcription available",
-                    "sentiment_score": analysis["sentiment_score"],
-                    "events_tagged": link_events("[]", events),
-                    "created_at": admin_firestore.SERVER_TIMESTAMP
-                }
-                doc_ref.set(doc_data)
-                entry_id = doc_ref.id
-                print(f"Successfully saved to Firestore with ID: {entry_id}")
-            except Exception as e:
-                print(f"Firestore error: {e}")
-                entry_id = None
-        else:
-            print("Database not initialized")
-            entry_id = None
+                with timed("save_upload"):
+                    upload = await save_upload(
+                        file,
+                        UPLOAD_DIR,
+                        extension,
+                        chunk_size=config.UPLOAD_CHUNK_SIZE,
+                        max_bytes=config.MAX_UPLOAD_BYTES,
+                    )
+            except (UploadTooLargeError, EmptyUploadError) as e:
+                rejected.append({"filename": file.filename, "error": str(e)})
+                continue
+
+            if extension != "zip":
+                saved = [(file.filename, upload)]
+            else:
+                try:
+                    saved = await run_in_threadpool(
+                        extract_audio_archive,
+                        upload.path,
+                        UPLOAD_DIR,
+                        chunk_size=config.UPLOAD_CHUNK_SIZE,
+                        max_bytes=config.MAX_UPLOAD_BYTES,
+                        max_files=config.BATCH_MAX_FILES,
+                    )
+                except (zipfile.BadZipFile, UploadTooLargeError) as e:
+                    saved = [(file.filename, e)]
+                finally:
+                    os.remove(upload.path)
 
+            for filename, result in saved:
+                if isinstance(result, Exception):
+                    rejected.append({"filename": filename, "error": str(result)})
+                    continue
+                # Rejected files don't count towards the byte limit, so smaller ones still fit
+                if len(accepted) >= config.BATCH_MAX_FILES or (
+                        config.BATCH_MAX_BYTES and total + result.size > config.BATCH_MAX_BYTES):
+                    os.remove(result.path)
+                    rejected.append({"filename": filename, "error": "Batch limit reached"})
+                    continue
+                total += result.size
+                accepted.append({"filename": filename, "path": result.path,
+                                 "sha256": result.sha256, "size": result.size})
+        print(f"Batch saved: {len(accepted)} files accepted, {len(rejected)} rejected")
+
+        if not accepted:
+            return JSONResponse(status_code=400, content={
+                "status": "error", "message": "No audio files to process", "rejected": rejected})
+
+        job_id = job_queue.submit(process_audio_batch, accepted, user_id)
         return {
-            "status": "success",
-            "entry_id": entry_id,
-            "transcription": transcription,
-            "events": events,
-            "message": "Audio uploaded and processed successfully"
+            "status": "accepted",
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}",
+            "accepted": [upload["filename"] for upload in accepted],
+            "rejected": rejected,
+            "message": f"{len(accepted)} recordings uploaded and queued for processing",
         }
 
+    except QueueFullError as e:
+        print(f"Rejecting batch: {e}")
+        for upload in accepted:
+            os.remove(upload["path"])
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)})
     except Exception as e:
-        print(f"Error in upload_audio: {str(e)}")
-        return {"status": "error", "message": str(e)}
+        print(f"Error in upload_audio_batch: {str(e)}")
+        for upload in accepted:
+            if os.path.exists(upload["path"]):
+                os.remove(upload["path"])
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Returns the status of a processing job and, once it succeeded, its result
+    (entry_id, transcription, sentiment_score and events).
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """ Hit/miss counters and sizes of the transcript and analysis caches. """
+    return cache_stats()
+
+@app.get("/api/storage/usage")
+def get_storage_usage():
+    """ Recordings, references and bytes per tier of the audio store. """
+    return get_audio_store().usage()
+
+def _storage() -> Storage:
+    """ The configured storage backend, or a 503 if it is unavailable. """
+    try:
+        return get_storage()
+    except StorageUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """ Stage and request latency histograms in the Prometheus text format. """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics/summary")
+def get_metrics_summary():
+    """ Count, mean and estimated p50/p90/p99 latency of every stage and route. """
+    return metrics_summary()
 
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/ready")
+def readiness_check():
+    """
+    Whether this worker can serve traffic: storage is reachable and, when
+    WARM_UP_MODELS is set, the models are loaded. Responds 503 until then.
+    (/api/health only says the process is up.)
+    """
+    checks = {"models": registry.status()}
+    ready = True
+    try:
+        checks["storage"] = get_storage().name
+    except Exception as e:
+        checks["storage"] = f"unavailable: {e}"
+        ready = False
+    if config.WARM_UP_MODELS and not all(model["loaded"] for model in checks["models"].values()):
+        ready = False
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", **checks},
+    )
+
+def _public_entry(entry: Dict) -> Dict:
+    """ A stored entry as the API returns it: events_tagged is the JSON list of event dicts. """
+    entry = dict(entry)
+    if entry.get("events_tagged"):
+        try:
+            entry["events_tagged"] = events_json(entry["events_tagged"])
+        except ValueError as e:
+            print(f"Error decoding events_tagged of {entry.get('id')}: {e}")
+    return entry
+
+# Fields the timeline can return; "snippet" is derived from the transcription.
+TIMELINE_FIELDS = {
+    "id", "created_at", "sentiment_score", "sentence_sentiments", "snippet", "transcription",
+    "events_tagged", "audio_file_path", "audio_sha256", "audio_size_bytes", "user_id",
+}
+
 @app.get("/api/timeline")
-def get_timeline():
+def get_timeline(
+    limit: int = Query(20, ge=1, le=100),
+    start_after: Optional[str] = None,
+    fields: Optional[str] = None,
+    user_id: Optional[str] = None,
+):
     """
-    Returns all entries in descending date order (most recent first).
+    Returns one page of entries in descending date order (most recent first).
+
+    - limit: page size.
+    - start_after: the next_cursor of the previous page.
+    - fields: comma-separated projection, e.g. "id,created_at,sentiment_score,snippet".
+      All fields are returned when omitted.
+    - user_id: only return this user's entries.
+
+    Response: {"entries": [...], "next_cursor": str or None}.
     """
-    docs = db.collection("voice_entries").order_by("created_at", direction=admin_firestore.Query.DESCENDING).stream()
-    return [{"id": doc.id, **doc.to_dict()} for doc in docs]
+    requested = set(TIMELINE_FIELDS)
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - TIMELINE_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
 
-@app.get("/api/events/main")
-def get_main_events():
+    # Only fetch the stored fields we need (created_at is always needed for the cursor).
+    stored = {f for f in requested if f not in ("id", "snippet")}
+    if "snippet" in requested:
+        stored.add("transcription")
+
+    after = None
+    if start_after:
+        try:
+            after = decode_cursor(start_after)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # Fetch one extra entry to know whether there is a next page.
+    with timed("storage_read"):
+        rows = _storage().list_entries(limit + 1, start_after=after, fields=stored, user_id=user_id)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    entries = []
+    for row in rows:
+        entry = _public_entry(row)
+        if "snippet" in requested:
+            entry["snippet"] = make_snippet(row.get("transcription"))
+        entries.append({k: v for k, v in entry.items() if k in requested})
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return {"entries": entries, "next_cursor": next_cursor}
+
+@app.get("/api/search")
+def search_entries(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    user_id: Optional[str] = None,
+):
     """
-    Retrieves main events from Firestore and counts their occurrences.
-    Converts them to a hashable structure for counting, then back to JSON-friendly data.
+    Full-text search over transcriptions and event fields, best match first.
+
+    - q: the terms to find (all must match); "quoted words" match a phrase,
+      word* matches a prefix and OR matches either side.
+    - limit / offset: page size and position; offset is the next_offset of the
+      previous page.
+    - user_id: only search this user's entries.
+
+    Response: {"results": [{"id", "created_at", "score", "snippet"}], "next_offset": int or None,
+    "truncated": bool, "cutoff_created_at": str or None}.
+    Snippets are HTML-escaped with the matched terms wrapped in <mark>. Only the
+    SEARCH_MAX_CANDIDATES most recently indexed matches are ranked; when there are
+    more, truncated is true and cutoff_created_at is the oldest ranked entry's time.
     """
+    try:
+        with timed("search"):
+            return get_search_index().search(q, limit=limit, offset=offset, user_id=user_id)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    def make_hashable(item):
-        """
-        Recursively convert lists and dictionaries to tuples so that the
-        entire structure becomes hashable (so we can use it as a dict key).
-        """
-        if isinstance(item, (list, tuple)):
-            return tuple(make_hashable(e) for e in item)
-        elif isinstance(item, dict):
-            # Sort the items to ensure consistent ordering for the tuple
-            return tuple(sorted((k, make_hashable(v)) for k, v in item.items()))
-        else:
-            return item
-
-    def make_json_friendly(item):
-        """
-        Recursively convert tuples back into lists (and so on),
-        ensuring that the final data is JSON-serializable.
-        """
-        if isinstance(item, tuple):
-            return [make_json_friendly(sub) for sub in item]
-        elif isinstance(item, list):
-            return [make_json_friendly(sub) for sub in item]
-        elif isinstance(item, dict):
-            return {k: make_json_friendly(v) for k, v in item.items()}
+@app.get("/api/entries/{entry_id}")
+def get_entry(entry_id: str):
+    """ Returns a single entry with all of its fields. """
+    entry = _storage().get_entry(entry_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return _public_entry(entry)
+
+@app.get("/api/export")
+def export_entries(user_id: Optional[str] = None, compress: bool = False):
+    """
+    Streams every entry (or every entry of user_id) as NDJSON, one entry per line
+    in chronological order. With compress=true the stream is gzip-compressed.
+
+    Entries are read from storage in batches and serialized as they are sent, so
+    memory use does not grow with the number of entries.
+    """
+    storage = _storage()
+
+    def entries():
+        try:
+            for entry in storage.iter_entries(user_id=user_id):
+                yield _public_entry(entry)
+        except Exception as e:
+            # The response has already started; all we can do is end it early.
+            print(f"Error during export: {e}")
+
+    body = iter_ndjson(entries())
+    filename = f"journal-{user_id}.ndjson" if user_id else "journal.ndjson"
+    if compress:
+        return StreamingResponse(
+            gzip_chunks(body),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'},
+        )
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/api/events/similar")
+def get_similar_events(
+    q: Optional[str] = Query(None, min_length=1, max_length=2000),
+    entry_id: Optional[str] = None,
+    kind: Optional[str] = Query("event", regex="^(event|transcript|all)$"),
+    k: int = Query(10, ge=1, le=100),
+    user_id: Optional[str] = None,
+):
+    """
+    Semantic search over the stored embeddings of events and transcripts.
+
+    - q: free text to find similar events or entries for, or
+    - entry_id: an entry whose transcript is the query ("when else did I feel
+      like this?"); that entry itself is left out of the results.
+    - kind: "event" (default), "transcript" or "all".
+    - k: number of results; user_id: only this user's entries.
+
+    Response: {"results": [{"entry_id", "kind", "label", "score"}]}, best
+    (highest cosine similarity) first.
+    """
+    if (q is None) == (entry_id is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of q and entry_id")
+    try:
+        store = get_vector_store()
+        if q is not None:
+            with timed("embed"):
+                query = encode_text(q)
         else:
-            return item
+            query = store.entry_vector(entry_id)
+            if query is None:
+                raise HTTPException(status_code=404, detail="No embedding for this entry")
+        with timed("vector_search"):
+            results = store.search(query, k=k, kind=None if kind == "all" else kind,
+                                   user_id=user_id, exclude_entry=entry_id)
+    except VectorStoreUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"results": results}
 
-    docs = db.collection("voice_entries").stream()
-    events_map = {}
+@app.get("/api/events/recurring")
+def get_recurring_events(
+    user_id: Optional[str] = None,
+    min_entries: int = Query(2, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    A user's recurring events: the canonical events of the event registry that
+    occurred in at least min_entries entries, most frequent first.
 
-    for doc in docs:
-        data = doc.to_dict()
-        if "events_tagged" in data and data["events_tagged"]:
-            try:
-                event_list = json.loads(data["events_tagged"])
-            except Exception as e:
-                print(f"Error parsing events_tagged: {e}")
-                event_list = []
-            for ev in event_list:
-                # Convert dictionaries to a hashable structure for counting.
-                key = make_hashable(ev)
-                events_map[key] = events_map.get(key, 0) + 1
-
-    # Filter events with multiple occurrences (you can adjust the threshold if needed).
-    main_events = [k for k, count in events_map.items() if count > 1]
-
-    # Convert the "main events" from tuple form back to JSON-friendly form.
-    main_events_readable = [make_json_friendly(m) for m in main_events]
-
-    # Convert *all* keys in events_map to JSON strings (so the front-end can parse them).
-    events_map_readable = {}
-    for key, count in events_map.items():
-        # key might be a nested tuple/dict structure, so convert it first.
-        json_friendly_key = make_json_friendly(key)
-        # Then turn it into a JSON string (which the frontend can parse).
-        key_str = json.dumps(json_friendly_key)
-        events_map_readable[key_str] = count
-
-    return {
-        "main_events": main_events_readable,
-        "all_events": events_map_readable
-    }
+    Response: {"events": [{"id", "canonical", "event", "mentions", "entry_count",
+    "first_seen", "last_seen"}]}
+    """
+    return {"events": get_event_registry().recurring(user_id, min_entries=min_entries, limit=limit)}
+
+@app.get("/api/events/{event_id}/entries")
+def get_event_entries(event_id: int, limit: int = Query(100, ge=1, le=1000)):
+    """ A canonical event of the registry and the entries it occurred in, most recent first. """
+    event_registry = get_event_registry()
+    event = event_registry.get_event(event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return {"event": event, "entries": event_registry.event_entries(event_id, limit=limit)}
+
+@app.get("/api/entries/{entry_id}/events")
+def get_entry_events(entry_id: str):
+    """ The canonical events of the registry an entry is linked to. """
+    return {"events": get_event_registry().entry_events(entry_id)}
+
+@app.get("/api/events/main")
+def get_main_events():
+    """
+    Returns main events and their occurrence counts.
+
+    Counts are maintained at write time in the event_aggregates collection/table
+    (one record per distinct event, keyed by its fingerprint), so this only reads
+    the distinct events instead of every entry. Rebuild them from scratch with
+    python -m app.services.aggregates rebuild.
+    """
+    return _storage().main_events()
@@ -1,20 +1,38 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float
-from sqlalchemy.sql import func
-from .database import engine, SessionLocal
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Index
+from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
 class VoiceEntry(Base):
     __tablename__ = "voice_entries"
 
-    id = Column(Integer, primary_key=True, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Same kind of string ids as Firestore documents, so entries can move between backends
+    id = Column(String(64), primary_key=True)
+    user_id = Column(String(128), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
     audio_file_path = Column(String, nullable=True)
+    audio_sha256 = Column(String(64), nullable=True)
+    audio_size_bytes = Column(Integer, nullable=True)
     transcription = Column(Text, nullable=True)
     sentiment_score = Column(Float, nullable=True)
-    events_tagged = Column(Text, nullable=True)  # could store JSON data or event references
+    sentence_sentiments = Column(Text, nullable=True)  # JSON list of per-sentence scores
+    events_tagged = Column(Text, nullable=True)  # Linked events, see services.events
 
-# Create tables if not exist
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        # Timeline pages: ORDER BY created_at DESC, id DESC (optionally per user)
+        Index("ix_voice_entries_user_created", "user_id", "created_at", "id"),
+        Index("ix_voice_entries_created", "created_at", "id"),
+    )
+
+class EventAggregate(Base):
+    """ How many times each distinct event was seen (see services.aggregates). """
+    __tablename__ = "event_aggregates"
+
+    fingerprint = Column(String(40), primary_key=True)
+    event = Column(Text, nullable=False)  # JSON of the stable event
+    count = Column(Integer, nullable=False, default=0, index=True)
+
+def create_tables(engine):
+    """ Create the tables and indexes if they don't exist yet. """
+    Base.metadata.create_all(bind=engine)
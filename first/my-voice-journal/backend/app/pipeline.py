@@ -0,0 +1,309 @@
+# backend/app/pipeline.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from . import config
+from .storage import get_storage
+from .services.audio import normalize_audio
+from .services.audio_store import get_audio_store, StoredAudio
+from .services.cache import content_key, get_analysis_cache, get_transcript_cache
+from .services.transcription import get_transcriber, transcribe_audio
+from .services.nlp import analyze_transcript, analyze_transcripts, model_version, TextAnalysis
+from .services.event_linking import link_event_list
+from .services.events import encode_events
+from .services.metrics import timed
+from .services.event_registry import link_entry_events
+from .services.search import index_entries
+from .services.vector_store import index_entry_vectors
+
+def _transcriber_cache_id() -> str:
+    # Long-audio segmentation can change the transcript, so it is part of the key.
+    # So can audio normalization, which changes what is sent to the STT backend.
+    normalization = "off"
+    if config.AUDIO_NORMALIZE:
+        normalization = (f"{config.AUDIO_SAMPLE_RATE}/{config.AUDIO_TRIM_SILENCE}"
+                         f"/{config.AUDIO_SILENCE_THRESHOLD_DB}")
+    return (f"{get_transcriber().config_key()}"
+            f"|long={config.LONG_AUDIO_THRESHOLD_SECONDS}/{config.LONG_AUDIO_SEGMENT_SECONDS}"
+            f"|norm={normalization}")
+
+def normalize_upload(audio_path: str) -> str:
+    """
+    Replace the uploaded recording by its normalized version (see
+    services.audio.normalize_audio) and return the new path. The original is kept
+    if normalization is disabled or fails.
+    """
+    if not config.AUDIO_NORMALIZE:
+        return audio_path
+    try:
+        normalized = normalize_audio(
+            audio_path,
+            os.path.splitext(audio_path)[0] + ".norm",
+            sample_rate=config.AUDIO_SAMPLE_RATE,
+            trim=config.AUDIO_TRIM_SILENCE,
+            threshold_db=config.AUDIO_SILENCE_THRESHOLD_DB,
+        )
+    except Exception as e:
+        print(f"Error normalizing {audio_path}: {e}")
+        normalized = None
+    if normalized is None:
+        return audio_path
+
+    normalized_path, info = normalized
+    print(f"Normalized {audio_path} ({os.path.getsize(audio_path)} bytes) to {normalized_path} "
+          f"({os.path.getsize(normalized_path)} bytes, {info.codec} {info.sample_rate} Hz "
+          f"x{info.channels}, {info.duration or 0:.1f}s)")
+    if not config.KEEP_ORIGINAL_UPLOADS:
+        os.remove(audio_path)
+    return normalized_path
+
+def transcribe_cached(audio_path: str, audio_sha256: Optional[str] = None) -> str:
+    """
+    transcribe_audio, but served from the transcript cache when the same audio
+    content was already transcribed with the same transcriber configuration.
+    Failed transcriptions are not cached.
+    """
+    cache = get_transcript_cache()
+    if cache is None or not audio_sha256:
+        return transcribe_audio(audio_path)
+
+    key = content_key(audio_sha256, _transcriber_cache_id())
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"Transcript cache hit for {audio_sha256}")
+        return cached["transcription"]
+
+    transcription = transcribe_audio(audio_path)
+    if transcription and not transcription.startswith("Transcription error:"):
+        cache.set(key, {"transcription": transcription})
+    return transcription
+
+def _cached_analysis(cached: Dict) -> TextAnalysis:
+    # Same transcript, but a different entry: its events get their own ids and times
+    return TextAnalysis.from_dict(cached).restamp()
+
+def analyze_cached(transcription: str) -> TextAnalysis:
+    """
+    analyze_transcript, but served from the analysis cache when the same transcript
+    was already analyzed by the same NLP model version.
+    """
+    if not transcription:
+        return TextAnalysis()
+    cache = get_analysis_cache()
+    if cache is None:
+        return analyze_transcript(transcription)
+
+    key = content_key(transcription, model_version())
+    cached = cache.get(key)
+    if cached is not None:
+        return _cached_analysis(cached)
+
+    analysis = analyze_transcript(transcription)
+    cache.set(key, analysis.to_dict())
+    return analysis
+
+def store_and_transcribe(audio_path: str, audio_sha256: Optional[str] = None) -> Tuple[StoredAudio, str]:
+    """
+    Normalize the upload at audio_path (see normalize_upload), transcribe it and
+    move it into the content-addressed audio store. Returns the stored recording
+    and its transcription.
+    """
+    store = get_audio_store()
+    stored = store.lookup_source(audio_sha256) if audio_sha256 else None
+    if stored is not None:
+        # Same upload as before: share the stored recording instead of normalizing again
+        os.remove(audio_path)
+        with timed("transcribe"), store.open_path(stored.sha256) as stored_path:
+            transcription = transcribe_cached(stored_path, audio_sha256)
+    else:
+        # Convert to compact 16 kHz mono FLAC before it is stored and sent to STT
+        with timed("normalize_audio"):
+            audio_path = normalize_upload(audio_path)
+
+        # Transcribe (skipped when this audio content was transcribed before)
+        with timed("transcribe"):
+            transcription = transcribe_cached(audio_path, audio_sha256)
+
+        # The hash still identifies the upload; the size is what is stored now.
+        with timed("store_audio"):
+            stored = store.put(audio_path, source_sha256=audio_sha256)
+    if transcription and not transcription.startswith("Transcription error:"):
+        store.mark_transcribed(stored.sha256)
+        if config.AUDIO_DELETE_AFTER_TRANSCRIPTION:
+            store.discard(stored.sha256)
+    return stored, transcription
+
+def _make_entry(stored: StoredAudio, audio_sha256: Optional[str], user_id: Optional[str],
+                transcription: str, analysis: TextAnalysis, events_tagged: str) -> Dict:
+    return {
+        "user_id": user_id,
+        "audio_file_path": stored.key,
+        "audio_sha256": audio_sha256,
+        "audio_size_bytes": stored.size,
+        "transcription": transcription or "No transcription available",
+        "sentiment_score": analysis.sentiment_score,
+        "sentence_sentiments": json.dumps(analysis.sentence_sentiments),
+        "events_tagged": events_tagged,
+    }
+
+def process_audio(audio_path: str, audio_sha256: Optional[str] = None,
+                  audio_size: Optional[int] = None, user_id: Optional[str] = None) -> Dict:
+    """
+    Run the full processing pipeline for an uploaded recording:
+    transcription, NLP analysis and persisting the entry to storage.
+
+    The recording is passed by path (as streamed to disk by the upload endpoint),
+    together with the content hash and size computed while it was written. It is
+    normalized to 16 kHz mono FLAC first (see normalize_upload) and moved into the
+    content-addressed audio store; the entry refers to it as "audio:<sha256>".
+
+    This is blocking work and is meant to run on a background worker
+    (see services.jobs.JobQueue), never on the request event loop.
+
+    Returns:
+        dict: entry_id (None if it could not be saved), transcription,
+        sentiment_score and the extracted events.
+    """
+    stored, transcription = store_and_transcribe(audio_path, audio_sha256)
+
+    # Extract events and analyze sentiment from a single parse
+    with timed("analyze"):
+        analysis = analyze_cached(transcription)
+    events = analysis.events
+
+    try:
+        storage = get_storage()
+        with timed("link_events"):
+            linked = link_event_list([], events)
+            events_tagged = encode_events(linked)
+        entry = _make_entry(stored, audio_sha256, user_id, transcription, analysis, events_tagged)
+        # The entry and its main-events counts are written in one transaction.
+        with timed("storage_write"):
+            entry_id = storage.add_entry(entry, linked)
+        print(f"Successfully saved to {storage.name} with ID: {entry_id}")
+        with timed("search_index"):
+            # Storage assigns the exact created_at; the index only shows it
+            index_entries([dict(entry, id=entry_id, created_at=datetime.now(timezone.utc))])
+        with timed("embed"):
+            index_entry_vectors(entry_id, user_id, transcription, events)
+        with timed("link_registry"):
+            link_entry_events(entry_id, user_id, linked)
+    except Exception as e:
+        print(f"Storage error: {e}")
+        entry_id = None
+        get_audio_store().release(stored.sha256)
+
+    return {
+        "entry_id": entry_id,
+        "transcription": transcription,
+        "sentiment_score": analysis.sentiment_score,
+        "sentence_sentiments": analysis.sentence_sentiments,
+        "events": [event.to_dict() for event in events],
+    }
+
+def analyze_batch(transcriptions: List[str]) -> List[TextAnalysis]:
+    """
+    analyze_cached for many transcripts: cache hits are served from the analysis
+    cache and all misses are parsed together in one nlp.pipe pass.
+    """
+    cache = get_analysis_cache()
+    version = model_version()
+    analyses: List[Optional[TextAnalysis]] = [None] * len(transcriptions)
+    misses = []
+    for i, text in enumerate(transcriptions):
+        if not text:
+            analyses[i] = TextAnalysis()
+            continue
+        cached = cache.get(content_key(text, version)) if cache is not None else None
+        if cached is not None:
+            analyses[i] = _cached_analysis(cached)
+        else:
+            misses.append(i)
+
+    texts = [transcriptions[i] for i in misses]
+    for i, analysis in zip(misses, analyze_transcripts(texts)):
+        analyses[i] = analysis
+        if cache is not None:
+            cache.set(content_key(transcriptions[i], version), analysis.to_dict())
+    return analyses
+
+def process_audio_batch(uploads: List[Dict], user_id: Optional[str] = None) -> Dict:
+    """
+    The pipeline of process_audio for many recordings at once.
+
+    uploads are dicts with the filename, path, sha256 and size of each saved
+    upload. Recordings are normalized and transcribed on up to
+    config.BATCH_TRANSCRIBE_CONCURRENCY threads, all transcripts are analyzed in
+    one nlp.pipe pass (see analyze_batch), and the entries are written with a
+    single storage.add_entries call.
+
+    Returns:
+        dict: "results", one per upload in order, each with the filename, a
+        "status" ("succeeded" or "failed") and either the process_audio result
+        fields or an "error" message; plus "succeeded" and "failed" counts.
+    """
+    results: List[Dict] = [{"filename": upload["filename"]} for upload in uploads]
+    transcribed: List[Tuple[int, StoredAudio, str]] = []
+
+    def transcribe_one(upload: Dict) -> Tuple[StoredAudio, str]:
+        return store_and_transcribe(upload["path"], upload["sha256"])
+
+    workers = max(1, min(config.BATCH_TRANSCRIBE_CONCURRENCY, len(uploads)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(transcribe_one, upload) for upload in uploads]
+        for i, future in enumerate(futures):
+            try:
+                stored, transcription = future.result()
+                transcribed.append((i, stored, transcription))
+            except Exception as e:
+                print(f"Error processing {uploads[i]['filename']}: {e}")
+                results[i].update(status="failed", error=str(e))
+
+    with timed("analyze"):
+        analyses = analyze_batch([transcription for _, _, transcription in transcribed])
+
+    store = get_audio_store()
+    try:
+        storage = get_storage()
+        rows = []
+        with timed("link_events"):
+            for (i, stored, transcription), analysis in zip(transcribed, analyses):
+                linked = link_event_list([], analysis.events)
+                entry = _make_entry(stored, uploads[i]["sha256"], user_id,
+                                    transcription, analysis, encode_events(linked))
+                rows.append((entry, linked))
+        with timed("storage_write"):
+            entry_ids = storage.add_entries(rows) if rows else []
+        print(f"Successfully saved {len(entry_ids)} entries to {storage.name}")
+        with timed("search_index"):
+            now = datetime.now(timezone.utc)
+            index_entries([dict(entry, id=entry_id, created_at=now)
+                           for (entry, _), entry_id in zip(rows, entry_ids)])
+        with timed("embed"):
+            for (_, _, transcription), analysis, entry_id in zip(transcribed, analyses, entry_ids):
+                index_entry_vectors(entry_id, user_id, transcription, analysis.events)
+        with timed("link_registry"):
+            for (_, events), entry_id in zip(rows, entry_ids):
+                link_entry_events(entry_id, user_id, events)
+    except Exception as e:
+        print(f"Storage error: {e}")
+        entry_ids = [None] * len(transcribed)
+        for _, stored, _ in transcribed:
+            store.release(stored.sha256)
+
+    for (i, _, transcription), analysis, entry_id in zip(transcribed, analyses, entry_ids):
+        results[i].update(
+            status="succeeded" if entry_id else "failed",
+            entry_id=entry_id,
+            transcription=transcription,
+            sentiment_score=analysis.sentiment_score,
+            sentence_sentiments=analysis.sentence_sentiments,
+            events=[event.to_dict() for event in analysis.events],
+        )
+        if not entry_id:
+            results[i]["error"] = "Entry could not be saved"
+
+    succeeded = sum(1 for result in results if result["status"] == "succeeded")
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
@@ -0,0 +1,146 @@
+# backend/app/reprocess.py
+# Re-run the NLP stages over stored entries (e.g. after changing extract_events,
+# merge_events or the linking thresholds):
+#     python -m app.reprocess --workers 4 --batch-size 256
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from .services.event_linking import link_events
+from .services.event_registry import get_event_registry
+from .services.nlp import analyze_transcripts, model_version
+from .services.search import index_entries
+from .storage import Storage, get_storage
+
+DEFAULT_CHECKPOINT = "reprocess_checkpoint.json"
+
+# Stored transcriptions that are placeholders rather than speech
+_PLACEHOLDERS = ("No transcription available", "Transcription error:")
+
+def load_checkpoint(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(path: str, checkpoint: Dict):
+    """ Atomically replace the checkpoint file. """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def _process_batch(storage: Storage, entries: List[Dict], workers: int, nlp_batch_size: int) -> int:
+    """ Analyze one batch of entries and write the results back. Returns how many were updated. """
+    texts = [entry.get("transcription") or "" for entry in entries]
+    todo = [i for i, text in enumerate(texts) if text and not text.startswith(_PLACEHOLDERS)]
+    analyses = analyze_transcripts([texts[i] for i in todo], n_process=workers, batch_size=nlp_batch_size)
+
+    updates = []
+    for i, analysis in zip(todo, analyses):
+        updates.append((entries[i]["id"], {
+            "sentiment_score": analysis.sentiment_score,
+            "sentence_sentiments": json.dumps(analysis.sentence_sentiments),
+            "events_tagged": link_events("[]", analysis.events),
+        }))
+    storage.update_entries(updates)
+    index_entries([dict(entries[i], id=entry_id, **fields)
+                   for i, (entry_id, fields) in zip(todo, updates)])
+    return len(updates)
+
+def reprocess(storage: Storage, checkpoint_path: str = DEFAULT_CHECKPOINT, workers: int = 1,
+              batch_size: int = 256, nlp_batch_size: int = 64, restart: bool = False,
+              user_id: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+    """
+    Recompute sentiment, sentence sentiments and linked events of stored entries.
+
+    Entries are streamed from storage in (created_at, id) order, parsed with nlp.pipe
+    (workers processes) and written back every batch_size entries. Progress is saved
+    to checkpoint_path after every commit, so an interrupted run continues where it
+    stopped when started again (restart=True starts over). When the run completes,
+    the main-events aggregate and the event registry are rebuilt and the checkpoint
+    is marked done.
+
+    Returns:
+        dict: The final checkpoint, with processed/updated counts and entries_per_sec.
+    """
+    checkpoint = None if restart else load_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get("done"):
+        print(f"Checkpoint {checkpoint_path} is already complete; use --restart to run again")
+        return checkpoint
+    if checkpoint and checkpoint.get("analysis_version") != model_version():
+        print("Warning: the analysis code changed since this checkpoint was written")
+    if checkpoint is None:
+        checkpoint = {"processed": 0, "updated": 0, "last_created_at": None, "last_id": None,
+                      "user_id": user_id, "analysis_version": model_version(), "done": False}
+    else:
+        user_id = checkpoint.get("user_id")
+        print(f"Resuming after {checkpoint['processed']} entries")
+
+    start_after = None
+    if checkpoint["last_id"] is not None:
+        start_after = (datetime.fromisoformat(checkpoint["last_created_at"]), checkpoint["last_id"])
+    entries_iter = storage.iter_entries(
+        fields={"created_at", "transcription", "user_id"}, user_id=user_id, start_after=start_after
+    )
+
+    started = time.perf_counter()
+    processed_this_run = 0
+
+    def commit(batch: List[Dict]):
+        nonlocal processed_this_run
+        checkpoint["updated"] += _process_batch(storage, batch, workers, nlp_batch_size)
+        checkpoint["processed"] += len(batch)
+        checkpoint["last_created_at"] = batch[-1]["created_at"].isoformat()
+        checkpoint["last_id"] = batch[-1]["id"]
+        save_checkpoint(checkpoint_path, checkpoint)
+        processed_this_run += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"Processed {checkpoint['processed']} entries "
+              f"({processed_this_run / elapsed:.1f} entries/sec)")
+
+    batch = []
+    for entry in entries_iter:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            commit(batch)
+            batch = []
+        if limit is not None and processed_this_run + len(batch) >= limit:
+            break
+    if batch:
+        commit(batch)
+
+    elapsed = time.perf_counter() - started
+    checkpoint["entries_per_sec"] = processed_this_run / elapsed if elapsed > 0 else 0.0
+    if limit is None or processed_this_run < limit:
+        print(f"Rebuilt aggregate with {storage.rebuild_aggregates()} distinct events")
+        print(f"Re-linked {get_event_registry().rebuild(storage, user_id)} entries into the event registry")
+        checkpoint["done"] = True
+    save_checkpoint(checkpoint_path, checkpoint)
+    print(f"Reprocessed {processed_this_run} entries in {elapsed:.1f}s "
+          f"({checkpoint['entries_per_sec']:.1f} entries/sec), {checkpoint['updated']} updated in total")
+    return checkpoint
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run the NLP stages over stored entries.")
+    parser.add_argument("--workers", type=int, default=1, help="spaCy worker processes (nlp.pipe n_process)")
+    parser.add_argument("--batch-size", type=int, default=256, help="entries per storage commit")
+    parser.add_argument("--nlp-batch-size", type=int, default=64, help="texts per nlp.pipe batch")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--user-id", help="only reprocess this user's entries")
+    parser.add_argument("--limit", type=int, help="stop after this many entries (resumable)")
+    args = parser.parse_args()
+
+    reprocess(
+        get_storage(),
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        nlp_batch_size=args.nlp_batch_size,
+        restart=args.restart,
+        user_id=args.user_id,
+        limit=args.limit,
+    )
@@ -8,10 +8,12 @@ class VoiceEntryCreate(BaseModel):
     pass
 
 class VoiceEntryOut(BaseModel):
-    id: int
+    id: str
+    user_id: Optional[str] = None
     created_at: datetime
     transcription: Optional[str] = None
     sentiment_score: Optional[float] = None
+    sentence_sentiments: Optional[str] = None
     events_tagged: Optional[str] = None
 
     class Config:
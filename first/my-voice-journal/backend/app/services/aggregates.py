@@ -0,0 +1,118 @@
+# backend/app/services/aggregates.py
+import hashlib
+import json
+from typing import Dict, Iterable, List
+from firebase_admin import firestore as admin_firestore
+from .events import Event, decode_events
+
+AGGREGATE_COLLECTION = "event_aggregates"
+
+# Per-extraction metadata that differs between otherwise identical events.
+VOLATILE_FIELDS = {"event_id", "extracted_at", "first_mentioned", "last_mentioned", "occurrences"}
+
+# Firestore allows at most 500 writes per batch.
+BATCH_SIZE = 400
+
+def stable_event(event: Event) -> Dict:
+    """ The event's dict form without its per-extraction metadata. """
+    return {k: v for k, v in event.to_dict().items() if k not in VOLATILE_FIELDS}
+
+def event_fingerprint(event: Event) -> str:
+    """ A stable id for an event: the hash of its canonical JSON form. """
+    canonical = json.dumps(stable_event(event), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def count_events(events: Iterable[Event]) -> Dict[str, Dict]:
+    """ Group events by fingerprint: {fingerprint: {"event": stable event, "count": n}}. """
+    counts: Dict[str, Dict] = {}
+    for event in events:
+        fingerprint = event_fingerprint(event)
+        if fingerprint in counts:
+            counts[fingerprint]["count"] += 1
+        else:
+            counts[fingerprint] = {"event": stable_event(event), "count": 1}
+    return counts
+
+def add_event_counts(db, batch, events: List[Event]):
+    """
+    Add increments for the given events to a Firestore write batch, so they are
+    committed atomically with the entry that contains them.
+    """
+    collection = db.collection(AGGREGATE_COLLECTION)
+    for fingerprint, item in count_events(events).items():
+        batch.set(collection.document(fingerprint), {
+            "event": item["event"],
+            "count": admin_firestore.Increment(item["count"]),
+        }, merge=True)
+
+def read_main_events(db, min_count: int = 2) -> Dict:
+    """
+    Read the precomputed counts (one document per distinct event).
+
+    Returns:
+        dict: "main_events" (events seen at least min_count times) and "all_events"
+        (a map from each event's JSON string to its count).
+    """
+    main_events = []
+    all_events = {}
+    for doc in db.collection(AGGREGATE_COLLECTION).stream():
+        data = doc.to_dict()
+        event, count = data.get("event", {}), data.get("count", 0)
+        if count <= 0:
+            continue
+        if count >= min_count:
+            main_events.append(event)
+        all_events[json.dumps(event, sort_keys=True)] = count
+    return {"main_events": main_events, "all_events": all_events}
+
+def rebuild(db) -> int:
+    """
+    Recompute every count from scratch from the voice_entries collection.
+    Returns the number of distinct events.
+    """
+    counts: Dict[str, Dict] = {}
+    for doc in db.collection("voice_entries").stream():
+        data = doc.to_dict()
+        if not data.get("events_tagged"):
+            continue
+        try:
+            event_list = decode_events(data["events_tagged"])
+        except Exception as e:
+            print(f"Error parsing events_tagged of {doc.id}: {e}")
+            continue
+        for fingerprint, item in count_events(event_list).items():
+            if fingerprint in counts:
+                counts[fingerprint]["count"] += item["count"]
+            else:
+                counts[fingerprint] = item
+
+    collection = db.collection(AGGREGATE_COLLECTION)
+    batch, pending = db.batch(), 0
+    for doc in collection.stream():
+        if doc.id not in counts:
+            batch.delete(doc.reference)
+            pending += 1
+            if pending >= BATCH_SIZE:
+                batch.commit()
+                batch, pending = db.batch(), 0
+    for fingerprint, item in counts.items():
+        batch.set(collection.document(fingerprint), item)
+        pending += 1
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+    return len(counts)
+
+# Rebuild the aggregate: python -m app.services.aggregates rebuild
+if __name__ == "__main__":
+    import argparse
+    from ..storage import get_storage
+
+    parser = argparse.ArgumentParser(description="Maintain the main-events aggregate.")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    storage = get_storage()
+    print(f"Rebuilt aggregate with {storage.rebuild_aggregates()} distinct events")
@@ -0,0 +1,317 @@
+# backend/app/services/audio.py
+import io
+import json
+import shutil
+import subprocess
+import sys
+import wave
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+try:
+    import audioop  # Fast RMS; removed from the standard library in Python 3.13
+except ImportError:
+    audioop = None
+
+SAMPLE_WIDTH = 2  # 16-bit signed PCM
+
+@dataclass
+class PcmAudio:
+    """ Decoded mono 16-bit little-endian PCM. """
+    data: bytes
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.data) / (SAMPLE_WIDTH * self.sample_rate)
+
+@dataclass
+class AudioSegment:
+    """ A slice of a longer recording, starting at `start` seconds. """
+    start: float
+    data: bytes
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.data) / (SAMPLE_WIDTH * self.sample_rate)
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+def _is_wav(path: str) -> bool:
+    with open(path, "rb") as f:
+        header = f.read(12)
+    return header[:4] == b"RIFF" and header[8:12] == b"WAVE"
+
+@dataclass
+class AudioInfo:
+    """ What a recording actually contains, as read from its header. """
+    codec: str            # e.g. "pcm_s16le", "flac", "opus", "mp3"
+    container: str        # e.g. "wav", "flac", "webm", "ogg"
+    sample_rate: Optional[int]
+    channels: Optional[int]
+    duration: Optional[float]
+    bits_per_sample: Optional[int] = None
+
+def _probe_wav(path: str) -> Optional[AudioInfo]:
+    """
+    Read the header of a PCM WAV file. None for WAVs the wave module can't read
+    (WAVE_FORMAT_EXTENSIBLE, float or compressed data), which ffprobe handles.
+    """
+    try:
+        with wave.open(path, "rb") as w:
+            return AudioInfo(
+                codec=f"pcm_s{w.getsampwidth() * 8}le",
+                container="wav",
+                sample_rate=w.getframerate(),
+                channels=w.getnchannels(),
+                duration=w.getnframes() / float(w.getframerate()),
+                bits_per_sample=w.getsampwidth() * 8,
+            )
+    except (wave.Error, EOFError):
+        return None
+
+def _probe_flac(path: str) -> Optional[AudioInfo]:
+    """ Read the STREAMINFO block of a native FLAC file. """
+    with open(path, "rb") as f:
+        header = f.read(42)
+    if len(header) < 42 or header[:4] != b"fLaC" or header[4] & 0x7F != 0:
+        return None
+    # STREAMINFO: 20 bits sample rate, 3 bits channels-1, 5 bits bits-per-sample-1,
+    # 36 bits total samples, starting 10 bytes into the block.
+    bits = int.from_bytes(header[18:26], "big")
+    sample_rate = bits >> 44
+    total_samples = bits & 0xFFFFFFFFF
+    return AudioInfo(
+        codec="flac",
+        container="flac",
+        sample_rate=sample_rate or None,
+        channels=((bits >> 41) & 0x7) + 1,
+        duration=total_samples / sample_rate if sample_rate and total_samples else None,
+        bits_per_sample=((bits >> 36) & 0x1F) + 1,
+    )
+
+def probe_audio(path: str) -> Optional[AudioInfo]:
+    """
+    Codec, container, sample rate, channels and duration of the recording.
+
+    PCM WAV and FLAC headers are parsed directly; other formats (including WAVs
+    the wave module can't read) need ffprobe.
+    Returns None if the format cannot be determined.
+    """
+    try:
+        info = _probe_wav(path) if _is_wav(path) else _probe_flac(path)
+        if info is not None:
+            return info
+        if ffmpeg_available():
+            out = subprocess.run(
+                ["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries",
+                 "stream=codec_name,sample_rate,channels,bits_per_raw_sample:format=format_name,duration",
+                 "-of", "json", path],
+                capture_output=True, check=True, timeout=30,
+            ).stdout
+            data = json.loads(out or b"{}")
+            streams = data.get("streams") or [{}]
+            stream, fmt = streams[0], data.get("format", {})
+            if not stream.get("codec_name"):
+                return None
+            duration = fmt.get("duration")
+            bits = stream.get("bits_per_raw_sample")
+            return AudioInfo(
+                codec=stream["codec_name"],
+                # ffprobe lists aliases, e.g. "matroska,webm" or "mov,mp4,m4a,3gp,3g2,mj2"
+                container=_container_name(fmt.get("format_name", ""), path),
+                sample_rate=int(stream["sample_rate"]) if stream.get("sample_rate") else None,
+                channels=stream.get("channels"),
+                duration=float(duration) if duration else None,
+                bits_per_sample=int(bits) if bits else None,
+            )
+    except Exception as e:
+        print(f"Could not probe {path}: {e}")
+    return None
+
+def _container_name(format_name: str, path: str) -> str:
+    names = format_name.split(",")
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    return extension if extension in names else names[0]
+
+def probe_duration(path: str) -> Optional[float]:
+    """
+    Duration of the recording in seconds (see probe_audio).
+    Returns None if it cannot be determined.
+    """
+    info = probe_audio(path)
+    return info.duration if info is not None else None
+
+def _downmix(data: bytes, channels: int) -> bytes:
+    """ Average interleaved 16-bit channels down to mono. """
+    if channels == 1:
+        return data
+    if audioop is not None and channels == 2:
+        return audioop.tomono(data, SAMPLE_WIDTH, 0.5, 0.5)
+    samples = array("h", data)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    mono = array("h", (sum(samples[i:i + channels]) // channels
+                       for i in range(0, len(samples), channels)))
+    if sys.byteorder == "big":
+        mono.byteswap()
+    return mono.tobytes()
+
+def load_pcm(path: str, sample_rate: int = 16000) -> Optional[PcmAudio]:
+    """
+    Decode a recording to mono 16-bit PCM.
+
+    Any format ffmpeg understands is decoded (and resampled to sample_rate) when
+    ffmpeg is on the PATH. Without it only 16-bit WAV files can be read, at their
+    native sample rate. Returns None if the file cannot be decoded.
+    """
+    if ffmpeg_available():
+        try:
+            data = subprocess.run(
+                ["ffmpeg", "-v", "error", "-i", path, "-f", "s16le", "-acodec", "pcm_s16le",
+                 "-ac", "1", "-ar", str(sample_rate), "-"],
+                capture_output=True, check=True,
+            ).stdout
+            return PcmAudio(data=data, sample_rate=sample_rate)
+        except subprocess.CalledProcessError as e:
+            print(f"ffmpeg could not decode {path}: {e.stderr.decode(errors='replace').strip()}")
+            return None
+
+    if _is_wav(path):
+        try:
+            with wave.open(path, "rb") as w:
+                if w.getsampwidth() != SAMPLE_WIDTH:
+                    print(f"Unsupported WAV sample width: {w.getsampwidth()}")
+                    return None
+                data = _downmix(w.readframes(w.getnframes()), w.getnchannels())
+                return PcmAudio(data=data, sample_rate=w.getframerate())
+        except (wave.Error, EOFError) as e:
+            print(f"Could not read {path} without ffmpeg: {e}")
+    return None
+
+def _rms(frame: bytes) -> float:
+    if audioop is not None:
+        return audioop.rms(frame, SAMPLE_WIDTH)
+    samples = array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return (sum(s * s for s in samples) / len(samples)) ** 0.5 if samples else 0.0
+
+def _quietest_offset(data: bytes, lo: int, hi: int, frame_bytes: int) -> int:
+    """ Byte offset of the start of the quietest frame in data[lo:hi]. """
+    best_offset, best_rms = hi, None
+    for offset in range(lo, hi - frame_bytes + 1, frame_bytes):
+        level = _rms(data[offset:offset + frame_bytes])
+        if best_rms is None or level < best_rms:
+            best_offset, best_rms = offset, level
+    return best_offset
+
+def split_pcm(pcm: PcmAudio, segment_seconds: float = 50.0, search_seconds: float = 5.0,
+              frame_ms: int = 20) -> List[AudioSegment]:
+    """
+    Split audio into segments of at most segment_seconds.
+
+    Each cut is placed at the quietest frame_ms frame within the last search_seconds
+    before the window boundary, so words are rarely cut in half. With search_seconds
+    set to 0 the audio is split into fixed windows.
+    """
+    bytes_per_second = pcm.sample_rate * SAMPLE_WIDTH
+    frame_bytes = max(SAMPLE_WIDTH, int(bytes_per_second * frame_ms / 1000) // SAMPLE_WIDTH * SAMPLE_WIDTH)
+    window = int(segment_seconds * bytes_per_second) // SAMPLE_WIDTH * SAMPLE_WIDTH
+    search = int(search_seconds * bytes_per_second) // SAMPLE_WIDTH * SAMPLE_WIDTH
+    total = len(pcm.data)
+
+    segments = []
+    start = 0
+    while start < total:
+        end = start + window
+        if end >= total:
+            end = total
+        elif search:
+            end = _quietest_offset(pcm.data, max(start + frame_bytes, end - search), end, frame_bytes)
+        segments.append(AudioSegment(
+            start=start / bytes_per_second,
+            data=pcm.data[start:end],
+            sample_rate=pcm.sample_rate,
+        ))
+        start = end
+    return segments
+
+def trim_silence(pcm: PcmAudio, threshold_db: float = -50.0, frame_ms: int = 20,
+                 padding_ms: int = 200) -> PcmAudio:
+    """
+    Drop leading and trailing frames quieter than threshold_db (relative to full
+    scale), keeping padding_ms of audio around the speech.
+    """
+    frame_bytes = max(SAMPLE_WIDTH, int(pcm.sample_rate * frame_ms / 1000) * SAMPLE_WIDTH)
+    threshold = 32768 * 10 ** (threshold_db / 20)
+    data = pcm.data
+    offsets = range(0, len(data) - frame_bytes + 1, frame_bytes)
+    loud = [offset for offset in offsets if _rms(data[offset:offset + frame_bytes]) >= threshold]
+    if not loud:
+        return PcmAudio(data=b"", sample_rate=pcm.sample_rate)
+    padding = int(pcm.sample_rate * padding_ms / 1000) * SAMPLE_WIDTH
+    start = max(0, loud[0] - padding)
+    end = min(len(data), loud[-1] + frame_bytes + padding)
+    return PcmAudio(data=data[start:end], sample_rate=pcm.sample_rate)
+
+def _resample(pcm: PcmAudio, sample_rate: int) -> PcmAudio:
+    if pcm.sample_rate == sample_rate or audioop is None:
+        return pcm
+    data, _ = audioop.ratecv(pcm.data, SAMPLE_WIDTH, 1, pcm.sample_rate, sample_rate, None)
+    return PcmAudio(data=data, sample_rate=sample_rate)
+
+def normalize_audio(path: str, dest_stem: str, sample_rate: int = 16000,
+                    trim: bool = True, threshold_db: float = -50.0) -> Optional[Tuple[str, AudioInfo]]:
+    """
+    Convert a recording to compact speech audio: mono, resampled to sample_rate,
+    leading/trailing silence trimmed and losslessly FLAC-encoded (16-bit).
+
+    With ffmpeg this handles any input format. Without it, WAV input is converted
+    in Python to a 16-bit mono WAV instead (FLAC needs an encoder).
+
+    Returns the written path (dest_stem plus ".flac" or ".wav") and its probed
+    format, or None if the recording could not be converted.
+    """
+    if ffmpeg_available():
+        dest_path = f"{dest_stem}.flac"
+        filters = []
+        if trim:
+            # Trim the start, then reverse and trim the start again to trim the end.
+            silence = f"silenceremove=start_periods=1:start_threshold={threshold_db}dB:start_silence=0.2"
+            filters = [silence, "areverse", silence, "areverse"]
+        command = ["ffmpeg", "-v", "error", "-y", "-i", path, "-vn", "-ac", "1", "-ar", str(sample_rate)]
+        if filters:
+            command += ["-af", ",".join(filters)]
+        command += ["-c:a", "flac", "-sample_fmt", "s16", dest_path]
+        try:
+            subprocess.run(command, capture_output=True, check=True, timeout=600)
+        except subprocess.CalledProcessError as e:
+            print(f"ffmpeg could not normalize {path}: {e.stderr.decode(errors='replace').strip()}")
+            return None
+    else:
+        pcm = load_pcm(path, sample_rate)
+        if pcm is None:
+            return None
+        pcm = _resample(pcm, sample_rate)
+        if trim:
+            pcm = trim_silence(pcm, threshold_db)
+        dest_path = f"{dest_stem}.wav"
+        with open(dest_path, "wb") as f:
+            f.write(pcm_to_wav(pcm.data, pcm.sample_rate))
+
+    info = probe_audio(dest_path)
+    return (dest_path, info) if info is not None else None
+
+def pcm_to_wav(data: bytes, sample_rate: int) -> bytes:
+    """ Wrap mono 16-bit PCM in a WAV container. """
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(SAMPLE_WIDTH)
+        w.setframerate(sample_rate)
+        w.writeframes(data)
+    return buf.getvalue()
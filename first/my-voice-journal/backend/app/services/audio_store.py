@@ -0,0 +1,363 @@
+# backend/app/services/audio_store.py
+import hashlib
+import lzma
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+from .. import config
+
+HOT, COLD, DELETED = "hot", "cold", "deleted"
+
+# Entries refer to stored audio as "audio:<sha256>" instead of a local file path.
+KEY_PREFIX = "audio:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    extension TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    tier TEXT NOT NULL,
+    refcount INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    transcribed_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_blobs_tier_used ON blobs (tier, last_used_at);
+CREATE TABLE IF NOT EXISTS sources (
+    source_sha256 TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+"""
+
+@dataclass
+class StoredAudio:
+    """ A recording in the audio store. """
+    sha256: str
+    size: int
+    deduplicated: bool
+
+    @property
+    def key(self) -> str:
+        return KEY_PREFIX + self.sha256
+
+def parse_key(value: Optional[str]) -> Optional[str]:
+    """ The content hash in an "audio:<sha256>" reference, or None for anything else. """
+    if value and value.startswith(KEY_PREFIX):
+        return value[len(KEY_PREFIX):]
+    return None
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+class AudioStore:
+    """
+    Content-addressed storage for recordings.
+
+    Each distinct recording is stored once, under the hash of its bytes, in a
+    two-level shard directory (hot/ab/cd/<sha256>.flac). A SQLite index next to
+    the files keeps a reference count per recording, so uploading the same audio
+    again shares the stored bytes, and maps the hash of the original upload to
+    the stored (normalized) recording so a re-upload can skip normalization.
+
+    Recordings start in the hot tier, as plain files that can be sent to the STT
+    backend directly. apply_retention moves recordings that were not used for a
+    while to the cold tier (lzma compressed) and deletes the bytes of old or
+    already transcribed recordings, keeping their index row for accounting.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One connection per process, shared by its threads under the lock.
+        # Processes coordinate through SQLite's own locking.
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(
+                    os.path.join(self.directory, "index.sqlite3"),
+                    timeout=30, isolation_level=None, check_same_thread=False,
+                )
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._pid = os.getpid()
+            yield self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _path(self, sha256: str, extension: str, tier: str) -> str:
+        file_name = f"{sha256}.{extension}" + (".xz" if tier == COLD else "")
+        return os.path.join(self.directory, tier, sha256[:2], sha256[2:4], file_name)
+
+    def put(self, path: str, source_sha256: Optional[str] = None) -> StoredAudio:
+        """
+        Move the file at path into the store and take a reference to it. If the
+        same bytes are already stored, the file is deleted and the existing copy
+        is shared. source_sha256 is the hash of the upload the file was derived
+        from (see lookup_source).
+        """
+        sha256 = sha256_file(path)
+        extension = os.path.splitext(path)[1].lstrip(".").lower() or "bin"
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT extension, tier FROM blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            deduplicated = row is not None and row[1] != DELETED
+            if deduplicated:
+                os.remove(path)
+                conn.execute(
+                    "UPDATE blobs SET refcount = refcount + 1, last_used_at = ? WHERE sha256 = ?",
+                    (now, sha256),
+                )
+            else:
+                dest = self._path(sha256, extension, HOT)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.move(path, dest)
+                conn.execute(
+                    "INSERT INTO blobs (sha256, extension, size, stored_size, tier, refcount,"
+                    " created_at, last_used_at) VALUES (?, ?, ?, ?, ?, 1, ?, ?)"
+                    " ON CONFLICT (sha256) DO UPDATE SET extension = excluded.extension,"
+                    " stored_size = excluded.stored_size, tier = excluded.tier,"
+                    " refcount = blobs.refcount + 1, last_used_at = excluded.last_used_at,"
+                    " transcribed_at = NULL",
+                    (sha256, extension, size, size, HOT, now, now),
+                )
+            if source_sha256:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sources (source_sha256, sha256) VALUES (?, ?)",
+                    (source_sha256, sha256),
+                )
+        return StoredAudio(sha256=sha256, size=size, deduplicated=deduplicated)
+
+    def lookup_source(self, source_sha256: str) -> Optional[StoredAudio]:
+        """
+        Take another reference to the recording stored for an upload with this
+        hash, if its bytes are still available. Returns None otherwise.
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT b.sha256, b.size FROM sources s JOIN blobs b ON b.sha256 = s.sha256"
+                " WHERE s.source_sha256 = ? AND b.tier != ?",
+                (source_sha256, DELETED),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE blobs SET refcount = refcount + 1, last_used_at = ? WHERE sha256 = ?",
+                (time.time(), row[0]),
+            )
+        return StoredAudio(sha256=row[0], size=row[1], deduplicated=True)
+
+    def release(self, sha256: str):
+        """ Drop a reference; the bytes are deleted when none are left. """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT extension, tier, refcount FROM blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None:
+                return
+            extension, tier, refcount = row
+            if refcount > 1:
+                conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = ?", (sha256,))
+                return
+            conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            conn.execute("DELETE FROM sources WHERE sha256 = ?", (sha256,))
+            self._remove(sha256, extension, tier)
+
+    def mark_transcribed(self, sha256: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE blobs SET transcribed_at = ? WHERE sha256 = ?", (time.time(), sha256))
+
+    def discard(self, sha256: str, unused_since: Optional[float] = None) -> bool:
+        """
+        Delete the bytes of a recording but keep its index row and references, so
+        entries still know what was stored. With unused_since, only if the
+        recording was not used after that time. Returns whether it was deleted.
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT extension, tier, last_used_at FROM blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None or row[1] == DELETED:
+                return False
+            if unused_since is not None and row[2] > unused_since:
+                return False
+            conn.execute(
+                "UPDATE blobs SET tier = ?, stored_size = 0 WHERE sha256 = ?", (DELETED, sha256)
+            )
+            self._remove(sha256, row[0], row[1])
+        return True
+
+    def _remove(self, sha256: str, extension: str, tier: str):
+        if tier == DELETED:
+            return
+        try:
+            os.remove(self._path(sha256, extension, tier))
+        except OSError as e:
+            print(f"Error removing stored audio {sha256}: {e}")
+
+    @contextmanager
+    def open_path(self, sha256: str) -> Iterator[str]:
+        """
+        A local path to the recording for the duration of the with block. Cold
+        recordings are decompressed to a temporary file that is removed afterwards.
+        Raises KeyError if the recording is unknown or was deleted.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT extension, tier FROM blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None or row[1] == DELETED:
+                raise KeyError(sha256)
+            conn.execute("UPDATE blobs SET last_used_at = ? WHERE sha256 = ?", (time.time(), sha256))
+        extension, tier = row
+        path = self._path(sha256, extension, tier)
+        if tier == HOT:
+            yield path
+            return
+        fd, tmp_path = tempfile.mkstemp(suffix=f".{extension}")
+        try:
+            with os.fdopen(fd, "wb") as out, lzma.open(path, "rb") as src:
+                shutil.copyfileobj(src, out)
+            yield tmp_path
+        finally:
+            os.remove(tmp_path)
+
+    def _to_cold(self, sha256: str, extension: str) -> int:
+        src = self._path(sha256, extension, HOT)
+        dest = self._path(sha256, extension, COLD)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+        with open(src, "rb") as f, lzma.open(tmp_path, "wb", preset=config.AUDIO_COLD_PRESET) as out:
+            shutil.copyfileobj(f, out)
+        os.replace(tmp_path, dest)
+        return os.path.getsize(dest)
+
+    def apply_retention(self, cold_after_days: float, delete_after_days: float,
+                        delete_transcribed: bool = False, now: Optional[float] = None) -> Dict:
+        """
+        Move hot recordings unused for cold_after_days to the cold tier, and delete
+        the bytes of recordings unused for delete_after_days (or, with
+        delete_transcribed, of every transcribed recording). A value of 0 disables
+        that rule. Returns the number of recordings moved and deleted.
+        """
+        now = time.time() if now is None else now
+        moved = deleted = 0
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT sha256, extension, tier, last_used_at, transcribed_at FROM blobs"
+                " WHERE tier != ?", (DELETED,)
+            ).fetchall()
+        for sha256, extension, tier, last_used_at, transcribed_at in rows:
+            idle_days = (now - last_used_at) / 86400
+            if ((delete_after_days and idle_days >= delete_after_days)
+                    or (delete_transcribed and transcribed_at is not None)):
+                # Skip if it was used again since the row was read
+                if self.discard(sha256, unused_since=last_used_at):
+                    deleted += 1
+            elif tier == HOT and cold_after_days and idle_days >= cold_after_days:
+                try:
+                    stored_size = self._to_cold(sha256, extension)
+                except OSError as e:
+                    print(f"Error moving {sha256} to the cold tier: {e}")
+                    continue
+                with self._transaction() as conn:
+                    changed = conn.execute(
+                        "UPDATE blobs SET tier = ?, stored_size = ? WHERE sha256 = ? AND tier = ?",
+                        (COLD, stored_size, sha256, HOT),
+                    ).rowcount
+                if changed:
+                    self._remove(sha256, extension, HOT)
+                    moved += 1
+                else:
+                    self._remove(sha256, extension, COLD)
+        return {"moved_to_cold": moved, "deleted": deleted}
+
+    def usage(self) -> Dict:
+        """
+        Disk usage per tier: recordings, references, logical bytes (what every
+        reference would take without deduplication) and bytes actually stored.
+        """
+        tiers = {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT tier, COUNT(*), SUM(refcount), SUM(size), SUM(size * refcount),"
+                " SUM(stored_size) FROM blobs GROUP BY tier"
+            ).fetchall()
+        for tier, recordings, references, size, logical, stored in rows:
+            tiers[tier] = {
+                "recordings": recordings,
+                "references": references,
+                "bytes": size,
+                "logical_bytes": logical,
+                "stored_bytes": stored,
+            }
+        logical = sum(t["logical_bytes"] for name, t in tiers.items() if name != DELETED)
+        stored = sum(t["stored_bytes"] for t in tiers.values())
+        return {
+            "tiers": tiers,
+            "logical_bytes": logical,
+            "stored_bytes": stored,
+            "saved_bytes": logical - stored,
+        }
+
+_store: Optional[AudioStore] = None
+_store_lock = threading.Lock()
+
+def get_audio_store() -> AudioStore:
+    """ The process-wide audio store in config.AUDIO_STORE_DIR. """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AudioStore(config.AUDIO_STORE_DIR)
+    return _store
+
+def apply_retention_policy(store: Optional[AudioStore] = None) -> Dict:
+    """ AudioStore.apply_retention with the AUDIO_* retention settings. """
+    return (store or get_audio_store()).apply_retention(
+        cold_after_days=config.AUDIO_COLD_AFTER_DAYS,
+        delete_after_days=config.AUDIO_DELETE_AFTER_DAYS,
+        delete_transcribed=config.AUDIO_DELETE_AFTER_TRANSCRIPTION,
+    )
+
+# Report or apply retention: python -m app.services.audio_store usage|retention
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Maintain the audio store.")
+    parser.add_argument("command", choices=["usage", "retention"])
+    args = parser.parse_args()
+
+    if args.command == "retention":
+        print(json.dumps(apply_retention_policy()))
+    print(json.dumps(get_audio_store().usage(), indent=2))
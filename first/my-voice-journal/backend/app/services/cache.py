@@ -0,0 +1,166 @@
+# backend/app/services/cache.py
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from .. import config
+
+def content_key(*parts: str) -> str:
+    """ A stable cache key derived from the given strings. """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+class DiskCache:
+    """
+    A small content-addressed cache of JSON values stored on disk.
+
+    Each value lives in its own file under a two-character shard directory. An
+    in-memory index tracks entry sizes in least-recently-used order (seeded from
+    file modification times at startup, which are refreshed on every hit), and the
+    oldest entries are evicted once the total size exceeds max_bytes. Files written
+    since then by other processes sharing the directory are adopted on lookup.
+    Hit and miss counters are kept for monitoring.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, name: str = "cache"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        entries = []
+        for shard in os.listdir(self.directory):
+            shard_dir = os.path.join(self.directory, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for file_name in os.listdir(shard_dir):
+                if not file_name.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(shard_dir, file_name))
+                entries.append((stat.st_mtime, file_name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """ Returns the cached value for key, or None on a miss. """
+        path = self._path(key)
+        with self._lock:
+            known = key in self._index
+            if known:
+                self._index.move_to_end(key)
+        if not known:
+            # Possibly written by another process sharing the directory; adopt it
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                with self._lock:
+                    self.misses += 1
+                return None
+            with self._lock:
+                if key not in self._index:
+                    self._index[key] = size
+                    self._total += size
+                    self._evict()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            # Removed by another process or corrupted; treat as a miss.
+            print(f"{self.name} cache read failed for {key}: {e}")
+            with self._lock:
+                size = self._index.pop(key, None)
+                if size is not None:
+                    self._total -= size
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        """ Stores value (which must be JSON-serializable) under key. """
+        data = json.dumps(value).encode("utf-8")
+        if self.max_bytes and len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            old_size = self._index.pop(key, None)
+            if old_size is not None:
+                self._total -= old_size
+            self._index[key] = len(data)
+            self._total += len(data)
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock (or is __init__).
+        while self.max_bytes and self._total > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+_caches: Dict[str, DiskCache] = {}
+_caches_lock = threading.Lock()
+
+def _get_cache(name: str, max_bytes: int) -> Optional[DiskCache]:
+    if not config.CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = DiskCache(os.path.join(config.CACHE_DIR, name), max_bytes, name=name)
+        return _caches[name]
+
+def get_transcript_cache() -> Optional[DiskCache]:
+    """ Transcripts keyed by audio content hash and transcriber config (None if disabled). """
+    return _get_cache("transcripts", config.TRANSCRIPT_CACHE_MAX_BYTES)
+
+def get_analysis_cache() -> Optional[DiskCache]:
+    """ NLP results keyed by transcript hash and model version (None if disabled). """
+    return _get_cache("analysis", config.ANALYSIS_CACHE_MAX_BYTES)
+
+def cache_stats() -> Dict:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,163 @@
+# backend/app/services/event_index.py
+import difflib
+import math
+from collections import defaultdict
+from typing import Dict, List, Set
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Fallback to per-candidate upper bounds
+
+# Character-count signatures have one column per lowercase letter, digit and space;
+# every other character is hashed into the remaining columns. Sharing a column can
+# only raise the bound, so it stays a valid upper bound on the real ratio.
+_SIGNATURE_WIDTH = 64
+_COLUMNS = {c: i for i, c in enumerate("abcdefghijklmnopqrstuvwxyz0123456789 ")}
+_HASHED = _SIGNATURE_WIDTH - len(_COLUMNS)
+
+def ratio_at_least(matcher: difflib.SequenceMatcher, threshold: float) -> bool:
+    """
+    matcher.ratio() >= threshold, checking the cheap upper bounds
+    (real_quick_ratio, then quick_ratio) before the full computation.
+    """
+    return (matcher.real_quick_ratio() >= threshold
+            and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+def _signature(text: str):
+    sig = np.zeros(_SIGNATURE_WIDTH, dtype=np.int32)
+    for c in text:
+        column = _COLUMNS.get(c)
+        if column is None:
+            column = len(_COLUMNS) + ord(c) % _HASHED
+        sig[column] += 1
+    return sig
+
+class CandidateIndex:
+    """
+    Index over canonical event strings that narrows a lookup down to the few
+    previously seen strings that can possibly match, before running any
+    SequenceMatcher comparison.
+
+    Two structures are kept:
+      - Word posting lists, queried with prefix filtering for word-overlap
+        (Jaccard) matches. A string with Jaccard >= t shares at least
+        ceil(t * |words|) words with the query, so it must contain one of the
+        query's |words| - ceil(t * |words|) + 1 rarest words.
+      - A matrix of character-count signatures, which gives the quick_ratio()
+        upper bound of SequenceMatcher.ratio() against every indexed string in a
+        single vectorized pass.
+
+    Both filters are exact: they never drop a string that would pass the threshold.
+    (Shingle/trigram blocking is not: at a ratio threshold of 0.6 strings such as
+    "we ate a movie" and "the team met" match without sharing a single trigram.)
+    """
+
+    def __init__(self):
+        self._texts: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._rows: Dict[int, int] = {}
+        self._row_ids: List[int] = []
+        if np is not None:
+            self._signatures = np.zeros((16, _SIGNATURE_WIDTH), dtype=np.int32)
+            self._lengths = np.full(16, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._texts
+
+    def text(self, item_id: int) -> str:
+        return self._texts[item_id]
+
+    def add(self, item_id: int, text: str):
+        """ Index text under item_id, replacing any text previously indexed under it. """
+        if item_id in self._texts:
+            self._remove_words(item_id)
+        self._texts[item_id] = text
+        for word in set(text.split()):
+            self._postings[word].add(item_id)
+
+        if np is None:
+            return
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._row_ids)
+            if row == len(self._lengths):
+                self._signatures = np.concatenate([self._signatures, np.zeros_like(self._signatures)])
+                self._lengths = np.concatenate([self._lengths, np.full(len(self._lengths), -1, dtype=np.int64)])
+            self._rows[item_id] = row
+            self._row_ids.append(item_id)
+        self._signatures[row] = _signature(text)
+        self._lengths[row] = len(text)
+
+    def remove(self, item_id: int):
+        if item_id not in self._texts:
+            return
+        self._remove_words(item_id)
+        del self._texts[item_id]
+        row = self._rows.get(item_id)
+        if row is not None:
+            # The row stays allocated but can no longer be returned.
+            self._lengths[row] = -1
+
+    def _remove_words(self, item_id: int):
+        for word in set(self._texts[item_id].split()):
+            posting = self._postings.get(word)
+            if posting is not None:
+                posting.discard(item_id)
+                if not posting:
+                    del self._postings[word]
+
+    def word_candidates(self, text: str, min_jaccard: float) -> List[int]:
+        """ Ids whose word-set Jaccard similarity with text can reach min_jaccard, ascending. """
+        words = set(text.split())
+        if not words:
+            return []
+        if min_jaccard <= 0:
+            return sorted(self._texts)
+        by_rarity = sorted(words, key=lambda word: len(self._postings.get(word, ())))
+        prefix = len(words) - math.ceil(min_jaccard * len(words)) + 1
+        found = set()
+        for word in by_rarity[:prefix]:
+            found.update(self._postings.get(word, ()))
+        return sorted(found)
+
+    def candidates(self, text: str, threshold: float) -> List[int]:
+        """
+        Ids whose quick_ratio() upper bound against text reaches threshold, ascending.
+        Every id with SequenceMatcher(None, indexed, text).ratio() >= threshold is included.
+        """
+        if np is None:
+            matcher = difflib.SequenceMatcher(None, "", text)
+            found = []
+            for item_id in sorted(self._texts):
+                matcher.set_seq1(self._texts[item_id])
+                if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold:
+                    found.append(item_id)
+            return found
+
+        n = len(self._row_ids)
+        if n == 0:
+            return []
+        lengths = self._lengths[:n]
+        matches = np.minimum(self._signatures[:n], _signature(text)).sum(axis=1)
+        total = lengths + len(text)
+        # Two empty strings are a perfect match (SequenceMatcher reports 1.0).
+        bound = np.where(total > 0, 2.0 * matches / np.maximum(total, 1), 1.0)
+        rows = np.flatnonzero((lengths >= 0) & (bound >= threshold - 1e-9))
+        return sorted(self._row_ids[row] for row in rows)
+
+    def first_match(self, text: str, threshold: float) -> int:
+        """
+        The smallest id whose string has SequenceMatcher(None, string, text).ratio()
+        >= threshold, or -1 if there is none.
+        """
+        matcher = difflib.SequenceMatcher(None, "", text)
+        for item_id in self.candidates(text, threshold):
+            matcher.set_seq1(self._texts[item_id])
+            if matcher.ratio() >= threshold:
+                return item_id
+        return -1
@@ -1,15 +1,45 @@
 # backend/app/services/event_linking.py
-import json
 import difflib
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from typing import List
 from datetime import datetime
+from .. import config
+from .event_index import CandidateIndex, ratio_at_least
+from .events import Event, decode_events, encode_events
+from .registry import registry
 
 # Optional: Using SentenceTransformers for event embeddings.
 try:
-    from sentence_transformers import SentenceTransformer, util
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    import numpy as np
 except ImportError:
-    model = None  # Fallback if the embedding model is not available
+    np = None
+
+def _load_embedding_model():
+    # Importing sentence_transformers pulls in torch, so it is deferred as well.
+    if np is None:
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None  # Fallback if the embedding model is not available
+    return SentenceTransformer(config.EMBEDDING_MODEL)
+
+registry.register("embeddings", _load_embedding_model)
+
+def get_embedding_model():
+    """ The shared SentenceTransformer, loaded on first use (None if not installed). """
+    return registry.get("embeddings")
+
+EMBEDDING_THRESHOLD = 0.8  # Adjust as needed
+FUZZY_THRESHOLD = 0.65  # Lowered threshold to allow more leniency
+WORD_OVERLAP_THRESHOLD = 0.5
+
+# Normalized embeddings keyed by canonical event string, so an event is only ever
+# encoded once no matter how many times it is linked against.
+EMBEDDING_CACHE_SIZE = 50000
+_embedding_cache: "OrderedDict[str, object]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
 
 def normalize_field(text: str) -> str:
     """
@@ -22,27 +52,57 @@ def normalize_field(text: str) -> str:
         text = text[:-5].strip()
     return text
 
-def canonical_event(event: Dict) -> str:
+def canonical_event(event: Event) -> str:
     """
     Create a canonical string representation of an event by normalizing key fields.
     This representation concatenates normalized subject, action, object, and location.
     """
     parts = []
-    for key in ["subject", "action", "object", "location"]:
-        value = event.get(key)
+    for value in (event.subject, event.action, event.object, event.location):
         if value and isinstance(value, str):
             parts.append(normalize_field(value))
     return " ".join(parts)
 
-def get_event_embedding(event: Dict):
+def encode_canonicals(canonicals: List[str]):
     """
-    Generate an embedding for an event using its canonical string.
-    Returns None if the embedding model is not available.
+    Return an (N, dim) array of unit-length embeddings for the given canonical strings,
+    or None if the embedding model is not available.
+
+    Strings already in the embedding cache are reused; all the others are encoded
+    together in a single batched model.encode call.
     """
+    model = get_embedding_model()
     if model is None:
         return None
-    canon = canonical_event(event)
-    return model.encode(canon, convert_to_tensor=True)
+
+    vectors = {}
+    with _embedding_cache_lock:
+        for canon in canonicals:
+            if canon in _embedding_cache:
+                _embedding_cache.move_to_end(canon)
+                vectors[canon] = _embedding_cache[canon]
+    missing = [canon for canon in dict.fromkeys(canonicals) if canon not in vectors]
+
+    if missing:
+        encoded = model.encode(missing, convert_to_numpy=True, normalize_embeddings=True)
+        with _embedding_cache_lock:
+            for canon, vector in zip(missing, encoded):
+                vectors[canon] = vector
+                _embedding_cache[canon] = vector
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+
+    if not canonicals:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    return np.stack([vectors[canon] for canon in canonicals])
+
+def get_event_embedding(event: Event):
+    """
+    Generate an embedding for an event using its canonical string.
+    Returns None if the embedding model is not available.
+    """
+    embeddings = encode_canonicals([canonical_event(event)])
+    return embeddings[0] if embeddings is not None else None
 
 def similar_events(event_str1: str, event_str2: str, embedding1=None, embedding2=None) -> bool:
     """
@@ -53,30 +113,27 @@ def similar_events(event_str1: str, event_str2: str, embedding1=None, embedding2
     """
     # If embeddings are provided, use cosine similarity.
     if embedding1 is not None and embedding2 is not None:
-        cosine_sim = util.cos_sim(embedding1, embedding2).item()
-        EMBEDDING_THRESHOLD = 0.8  # Adjust as needed
+        norms = np.linalg.norm(embedding1) * np.linalg.norm(embedding2)
+        cosine_sim = float(np.dot(embedding1, embedding2) / norms) if norms else 0.0
         if cosine_sim >= EMBEDDING_THRESHOLD:
             return True
 
-    # Fuzzy string matching ratio
-    fuzzy_ratio = difflib.SequenceMatcher(None, event_str1, event_str2).ratio()
-    
     # Calculate word overlap ratio
     words1 = set(event_str1.split())
     words2 = set(event_str2.split())
     union_words = words1.union(words2)
     word_overlap = (len(words1.intersection(words2)) / len(union_words)) if union_words else 0
+    if word_overlap >= WORD_OVERLAP_THRESHOLD:
+        return True
 
-    FUZZY_THRESHOLD = 0.65  # Lowered threshold to allow more leniency
-    WORD_OVERLAP_THRESHOLD = 0.5
-
-    return fuzzy_ratio >= FUZZY_THRESHOLD or word_overlap >= WORD_OVERLAP_THRESHOLD
+    # Fuzzy string matching ratio (cheap upper bounds first)
+    return ratio_at_least(difflib.SequenceMatcher(None, event_str1, event_str2), FUZZY_THRESHOLD)
 
-def link_events(existing_events_str: str, new_events: List[Dict]) -> str:
+def link_events(existing_events_str: str, new_events: List[Event]) -> str:
     """
     Link new events with existing ones, maintaining metadata about occurrences.
     
-    Each event is a dictionary with the following fields:
+    Each event is an Event (see services.events) with the following fields:
       - subject: who or what performed the action,
       - action: the main verb describing the event,
       - object: what or who was affected by the action,
@@ -93,44 +150,84 @@ def link_events(existing_events_str: str, new_events: List[Dict]) -> str:
     should be merged with an existing one.
     
     Args:
-        existing_events_str (str): JSON string of existing events.
-        new_events (List[Dict]): A list of new event dictionaries.
+        existing_events_str (str): Encoded existing events (an events_tagged value).
+        new_events (List[Event]): A list of new events.
     
     Returns:
-        str: A JSON string of the updated events list.
+        str: The updated events list, encoded with services.events.encode_events.
     """
     try:
-        existing_events = json.loads(existing_events_str) if existing_events_str else []
-    except json.JSONDecodeError:
+        existing_events = decode_events(existing_events_str)
+    except ValueError:
         existing_events = []
-    
+    return encode_events(link_event_list(existing_events, new_events))
+
+def link_event_list(existing_events: List[Event], new_events: List[Event]) -> List[Event]:
+    """
+    link_events on decoded events: returns the updated events list (the existing
+    events, then the new events that did not match any of them). Events are
+    updated in place.
+    """
+    now = datetime.now().isoformat()
+    existing_events = list(existing_events)
+
     # Ensure each existing event has the proper metadata.
     for event in existing_events:
-        if "occurrences" not in event:
-            event["occurrences"] = 1
-        if "first_mentioned" not in event or not event["first_mentioned"]:
-            event["first_mentioned"] = datetime.now().isoformat()
+        if event.occurrences is None:
+            event.occurrences = 1
+        if not event.first_mentioned:
+            event.first_mentioned = now
     
-    for new_event in new_events:
-        new_event_canonical = canonical_event(new_event)
-        new_embedding = get_event_embedding(new_event) if model is not None else None
-        
-        matching_event = None
-        for existing_event in existing_events:
-            existing_event_canonical = canonical_event(existing_event)
-            existing_embedding = get_event_embedding(existing_event) if model is not None else None
-            
-            if similar_events(existing_event_canonical, new_event_canonical, existing_embedding, new_embedding):
-                matching_event = existing_event
+    # Canonical strings and embeddings are computed once per event (one batched
+    # encode for everything not already cached), and the embedding comparison of
+    # every new event against every candidate is a single matrix product.
+    candidates = existing_events + new_events
+    canonicals = [canonical_event(event) for event in candidates]
+    embeddings = encode_canonicals(canonicals)
+    n_existing = len(existing_events)
+    similarity = embeddings[n_existing:] @ embeddings.T if embeddings is not None else None
+
+    # Indices into candidates that new events can be merged into, in list order.
+    # New events that do not match anything are appended as they are added. The
+    # blocking index narrows the fuzzy fallback down to plausible candidates.
+    active = list(range(n_existing))
+    index = CandidateIndex()
+    for candidate_index in active:
+        index.add(candidate_index, canonicals[candidate_index])
+
+    for i, new_event in enumerate(new_events):
+        new_index = n_existing + i
+        canon = canonicals[new_index]
+
+        # Position (within active) of the first candidate above the embedding threshold.
+        first_embedding_match = None
+        if similarity is not None and active:
+            hits = np.flatnonzero(similarity[i, active] >= EMBEDDING_THRESHOLD)
+            if len(hits):
+                first_embedding_match = int(hits[0])
+
+        # Only candidates before that one can still win through fuzzy matching.
+        # Active indices are increasing, so comparing indices preserves list order.
+        match_index = active[first_embedding_match] if first_embedding_match is not None else None
+        fuzzy_ids = set(index.candidates(canon, FUZZY_THRESHOLD))
+        fuzzy_ids.update(index.word_candidates(canon, WORD_OVERLAP_THRESHOLD))
+        for candidate_index in sorted(fuzzy_ids):
+            if match_index is not None and candidate_index >= match_index:
+                break
+            if similar_events(canonicals[candidate_index], canon):
+                match_index = candidate_index
                 break
-        
-        if matching_event:
-            matching_event["occurrences"] = matching_event.get("occurrences", 1) + 1
-            if not matching_event.get("first_mentioned"):
-                matching_event["first_mentioned"] = datetime.now().isoformat()
+
+        if match_index is not None:
+            matching_event = candidates[match_index]
+            matching_event.occurrences = (matching_event.occurrences or 1) + 1
+            if not matching_event.first_mentioned:
+                matching_event.first_mentioned = now
         else:
-            new_event["occurrences"] = 1
-            new_event["first_mentioned"] = datetime.now().isoformat()
+            new_event.occurrences = 1
+            new_event.first_mentioned = now
             existing_events.append(new_event)
+            active.append(new_index)
+            index.add(new_index, canon)
     
-    return json.dumps(existing_events)
+    return existing_events
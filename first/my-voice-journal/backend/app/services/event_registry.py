@@ -0,0 +1,374 @@
+# backend/app/services/event_registry.py
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from .. import config
+from .aggregates import stable_event
+from .event_index import CandidateIndex
+from .event_linking import (
+    EMBEDDING_THRESHOLD, FUZZY_THRESHOLD, WORD_OVERLAP_THRESHOLD,
+    canonical_event, encode_canonicals, np, similar_events,
+)
+from .events import Event, decode_events
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS canonical_events (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    event TEXT NOT NULL,
+    mentions INTEGER NOT NULL,
+    entry_count INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_canonical_events_recurring
+    ON canonical_events (user_id, entry_count DESC, last_seen DESC);
+CREATE TABLE IF NOT EXISTS aliases (
+    user_id TEXT NOT NULL,
+    canonical TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, canonical)
+);
+CREATE TABLE IF NOT EXISTS entry_events (
+    entry_id TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    mentions INTEGER NOT NULL,
+    seen_at TEXT NOT NULL,
+    PRIMARY KEY (entry_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS ix_entry_events_event ON entry_events (event_id, seen_at);
+"""
+
+_EVENT_COLUMNS = "id, canonical, event, mentions, entry_count, first_seen, last_seen"
+
+def _event_row(row) -> Dict:
+    event_id, canonical, event, mentions, entry_count, first_seen, last_seen = row
+    return {
+        "id": event_id,
+        "canonical": canonical,
+        "event": json.loads(event),
+        "mentions": mentions,
+        "entry_count": entry_count,
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+    }
+
+class _UserEvents:
+    """ One user's canonical strings, in memory, for matching new events against. """
+
+    def __init__(self):
+        self.last_id = 0
+        self.last_alias = 0
+        self.ids: List[int] = []
+        self.canonicals: Dict[int, str] = {}
+        self.aliases: Dict[str, int] = {}
+        self.index = CandidateIndex()
+        # Embeddings of ids, in order, in a buffer that doubles when full (rows
+        # past len(ids) are unused); None until first needed or without the model
+        self.embeddings = None
+        self.embedded = False
+
+    def add(self, event_id: int, canonical: str, vector=None):
+        """ Add a canonical event; vector is its embedding, if the caller already encoded it. """
+        self.ids.append(event_id)
+        self.canonicals[event_id] = canonical
+        self.index.add(event_id, canonical)
+        self.last_id = max(self.last_id, event_id)
+        if self.embeddings is None:
+            return
+        if vector is None:
+            vector = encode_canonicals([canonical])[0]
+        row = len(self.ids) - 1
+        if row == len(self.embeddings):
+            self.embeddings = np.concatenate([self.embeddings, np.zeros_like(self.embeddings)])
+        self.embeddings[row] = vector
+
+    def extend(self, rows: List[Tuple[int, str]]):
+        """ add for many (event_id, canonical) rows, encoded in one batch. """
+        vectors = None
+        if self.embeddings is not None and rows:
+            vectors = encode_canonicals([canonical for _, canonical in rows])
+        for i, (event_id, canonical) in enumerate(rows):
+            self.add(event_id, canonical, vectors[i] if vectors is not None else None)
+
+    def encode(self, canonicals: List[str]) -> Dict:
+        """
+        Embeddings of the given strings that match may need (those without an
+        alias), encoded in one batch. Empty without the embedding model.
+        """
+        pending = [canonical for canonical in dict.fromkeys(canonicals)
+                   if canonical and canonical not in self.aliases]
+        vectors = encode_canonicals(pending) if pending else None
+        return dict(zip(pending, vectors)) if vectors is not None else {}
+
+    def match(self, canonical: str, vector=None) -> Optional[int]:
+        """
+        The canonical event this string belongs to: an exact (alias) hit, else the
+        same rule as link_events, i.e. the oldest event that is similar by
+        embedding, word overlap or fuzzy ratio. vector is the string's embedding,
+        if the caller already encoded it.
+        """
+        if canonical in self.aliases:
+            return self.aliases[canonical]
+        if not self.ids:
+            return None
+
+        match_id = None
+        if not self.embedded:
+            # Encoded on the first lookup that needs them; None without the model
+            vectors = encode_canonicals([self.canonicals[i] for i in self.ids])
+            if vectors is not None:
+                self.embeddings = np.zeros((max(16, 2 * len(vectors)), vectors.shape[1]), dtype=vectors.dtype)
+                self.embeddings[:len(vectors)] = vectors
+            self.embedded = True
+        if self.embeddings is not None:
+            if vector is None:
+                vector = encode_canonicals([canonical])[0]
+            hits = np.flatnonzero(self.embeddings[:len(self.ids)] @ vector >= EMBEDDING_THRESHOLD)
+            if len(hits):
+                match_id = self.ids[int(hits[0])]
+
+        # Ids ascend with creation order, so only older events can beat the embedding hit
+        candidate_ids = set(self.index.candidates(canonical, FUZZY_THRESHOLD))
+        candidate_ids.update(self.index.word_candidates(canonical, WORD_OVERLAP_THRESHOLD))
+        for event_id in sorted(candidate_ids):
+            if match_id is not None and event_id >= match_id:
+                break
+            if similar_events(self.canonicals[event_id], canonical):
+                return event_id
+        return match_id
+
+class EventRegistry:
+    """
+    A persistent registry of each user's canonical events.
+
+    Every saved entry is linked against its user's registry as it comes in: each
+    extracted event is matched to an existing canonical event (exactly, through
+    the alias table of canonical strings seen before, or with the similarity
+    rule of link_events) or becomes a new one. Canonical events keep their
+    mention and entry counts and first/last seen times, and entry_events links
+    entries to canonical event ids, so recurring events and the entries an event
+    occurred in are index lookups.
+
+    The canonical strings of users seen by this process are cached in memory and
+    refreshed with the rows other processes added; linking runs under SQLite's
+    write lock, so concurrent workers never create duplicates.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._users: Dict[str, _UserEvents] = {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One connection per process, shared by its threads under the lock.
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                             check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._pid = os.getpid()
+                self._users = {}
+            yield self._conn
+
+    def _user_events(self, conn, user_key: str) -> _UserEvents:
+        # Caller holds the lock
+        user = self._users.setdefault(user_key, _UserEvents())
+        user.extend(conn.execute(
+            "SELECT id, canonical FROM canonical_events WHERE user_id = ? AND id > ? ORDER BY id",
+            (user_key, user.last_id),
+        ).fetchall())
+        for rowid, canonical, event_id in conn.execute(
+            "SELECT rowid, canonical, event_id FROM aliases WHERE user_id = ? AND rowid > ?",
+            (user_key, user.last_alias),
+        ):
+            user.aliases[canonical] = event_id
+            user.last_alias = max(user.last_alias, rowid)
+        return user
+
+    def link_entry(self, entry_id: str, user_id: Optional[str], events: List[Event],
+                   seen_at: Optional[datetime] = None) -> List[Optional[int]]:
+        """
+        Link the events of a saved entry (its events_tagged) into its user's
+        registry; an event's occurrences count as that many mentions. Returns the
+        canonical event id of each event (None for events without subject, action
+        or object to match on), in order.
+        """
+        user_key = user_id or ""
+        seen = (seen_at or datetime.now(timezone.utc)).isoformat()
+        linked: List[Optional[int]] = []
+        mentions: Dict[int, int] = {}
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                user = self._user_events(conn, user_key)
+                canonicals = [canonical_event(event) for event in events]
+                # One batched encode for the entry's strings instead of one per event
+                vectors = user.encode(canonicals)
+                for event, canonical in zip(events, canonicals):
+                    if not canonical:
+                        linked.append(None)
+                        continue
+                    event_id = user.match(canonical, vectors.get(canonical))
+                    if event_id is None:
+                        event_id = conn.execute(
+                            "INSERT INTO canonical_events (user_id, canonical, event, mentions,"
+                            " entry_count, first_seen, last_seen) VALUES (?, ?, ?, 0, 0, ?, ?)",
+                            (user_key, canonical, json.dumps(stable_event(event)), seen, seen),
+                        ).lastrowid
+                        user.add(event_id, canonical, vectors.get(canonical))
+                    if canonical not in user.aliases:
+                        user.aliases[canonical] = event_id
+                        conn.execute(
+                            "INSERT OR IGNORE INTO aliases (user_id, canonical, event_id) VALUES (?, ?, ?)",
+                            (user_key, canonical, event_id),
+                        )
+                    mentions[event_id] = mentions.get(event_id, 0) + (event.occurrences or 1)
+                    linked.append(event_id)
+
+                for event_id, count in mentions.items():
+                    new_link = conn.execute(
+                        "INSERT OR IGNORE INTO entry_events (entry_id, event_id, mentions, seen_at)"
+                        " VALUES (?, ?, ?, ?)", (entry_id, event_id, count, seen),
+                    ).rowcount
+                    conn.execute(
+                        "UPDATE canonical_events SET mentions = mentions + ?,"
+                        " entry_count = entry_count + ?,"
+                        " first_seen = MIN(first_seen, ?), last_seen = MAX(last_seen, ?) WHERE id = ?",
+                        (count, new_link, seen, seen, event_id),
+                    )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                # The cached strings may include rows that were rolled back
+                self._users.pop(user_key, None)
+                raise
+            conn.execute("COMMIT")
+        return linked
+
+    def recurring(self, user_id: Optional[str], min_entries: int = 2, limit: int = 50) -> List[Dict]:
+        """ The user's canonical events seen in at least min_entries entries, most frequent first. """
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_EVENT_COLUMNS} FROM canonical_events"
+                " WHERE user_id = ? AND entry_count >= ?"
+                " ORDER BY entry_count DESC, last_seen DESC LIMIT ?",
+                (user_id or "", min_entries, limit),
+            ).fetchall()
+        return [_event_row(row) for row in rows]
+
+    def get_event(self, event_id: int) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_EVENT_COLUMNS} FROM canonical_events WHERE id = ?", (event_id,)
+            ).fetchone()
+        return _event_row(row) if row else None
+
+    def entry_events(self, entry_id: str) -> List[Dict]:
+        """ The canonical events an entry is linked to, with the entry's mention counts. """
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join('c.' + c for c in _EVENT_COLUMNS.split(', '))}, l.mentions"
+                " FROM entry_events l JOIN canonical_events c ON c.id = l.event_id"
+                " WHERE l.entry_id = ? ORDER BY c.id",
+                (entry_id,),
+            ).fetchall()
+        return [dict(_event_row(row[:-1]), entry_mentions=row[-1]) for row in rows]
+
+    def event_entries(self, event_id: int, limit: int = 100) -> List[Dict]:
+        """ The entries a canonical event occurred in, most recent first. """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT entry_id, mentions, seen_at FROM entry_events WHERE event_id = ?"
+                " ORDER BY seen_at DESC LIMIT ?",
+                (event_id, limit),
+            ).fetchall()
+        return [{"entry_id": entry_id, "mentions": mentions, "seen_at": seen_at}
+                for entry_id, mentions, seen_at in rows]
+
+    def clear(self, user_id: Optional[str] = None):
+        """ Forget every canonical event and link (of one user, if given). """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if user_id is None:
+                    conn.execute("DELETE FROM entry_events")
+                    conn.execute("DELETE FROM aliases")
+                    conn.execute("DELETE FROM canonical_events")
+                    self._users = {}
+                else:
+                    conn.execute(
+                        "DELETE FROM entry_events WHERE event_id IN"
+                        " (SELECT id FROM canonical_events WHERE user_id = ?)", (user_id,))
+                    conn.execute("DELETE FROM aliases WHERE user_id = ?", (user_id,))
+                    conn.execute("DELETE FROM canonical_events WHERE user_id = ?", (user_id,))
+                    self._users.pop(user_id, None)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def rebuild(self, storage, user_id: Optional[str] = None) -> int:
+        """
+        Re-link every stored entry (of one user, if given) in creation order, from
+        the events in their events_tagged. Returns the number of entries linked.
+        """
+        self.clear(user_id)
+        count = 0
+        for entry in storage.iter_entries(fields={"user_id", "created_at", "events_tagged"},
+                                          user_id=user_id):
+            try:
+                events = decode_events(entry.get("events_tagged"))
+            except ValueError as e:
+                print(f"Error parsing events_tagged of {entry['id']}: {e}")
+                continue
+            self.link_entry(entry["id"], entry.get("user_id"), events, seen_at=entry.get("created_at"))
+            count += 1
+        return count
+
+_registry: Optional[EventRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_event_registry() -> EventRegistry:
+    """ The process-wide event registry in config.EVENT_REGISTRY_PATH. """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = EventRegistry(config.EVENT_REGISTRY_PATH)
+    return _registry
+
+def link_entry_events(entry_id: str, user_id: Optional[str], events: List[Event]) -> List[Optional[int]]:
+    """
+    EventRegistry.link_entry on the shared registry. Failures are logged rather
+    than raised: the entry is already saved, and rebuild can catch the registry up.
+    """
+    try:
+        return get_event_registry().link_entry(entry_id, user_id, events)
+    except Exception as e:
+        print(f"Event registry error: {e}")
+        return [None] * len(events)
+
+# Re-link every stored entry: python -m app.services.event_registry rebuild [--user-id ID]
+if __name__ == "__main__":
+    import argparse
+    from ..storage import get_storage
+
+    parser = argparse.ArgumentParser(description="Maintain the per-user event registry.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", default=None, help="only rebuild this user's events")
+    args = parser.parse_args()
+
+    print(f"Linked {get_event_registry().rebuild(get_storage(), args.user_id)} entries")
@@ -0,0 +1,165 @@
+# backend/app/services/events.py
+import json
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+# Version of the events_tagged encoding written by encode_events. Version 1 is the
+# original JSON list of event dicts, which decode_events still reads.
+EVENTS_FORMAT_VERSION = 2
+
+# Row layout of a version 2 event. Fields after the first OPTIONAL_FROM are
+# metadata added by merging and linking; None means the event doesn't have it.
+EVENT_FIELDS = (
+    "event_id", "sentence", "sentence_index", "extracted_at",
+    "subject", "subjects", "action", "action_lemma", "object", "objects",
+    "time", "location", "additional_info", "entities",
+    "occurrences", "first_mentioned", "last_mentioned", "raw_sentences", "sentence_indices",
+)
+OPTIONAL_FROM = EVENT_FIELDS.index("occurrences")
+_LIST_FIELDS = ("subjects", "objects", "time", "location", "additional_info")
+
+def intern(value: Optional[str]) -> Optional[str]:
+    """ sys.intern for the small vocabulary of labels and lemmas (None passes through). """
+    return sys.intern(value) if isinstance(value, str) else value
+
+class Entity(NamedTuple):
+    """ A named entity of an event's sentence; the label is interned. """
+    text: str
+    label: str
+
+    def to_dict(self) -> Dict:
+        return {"text": self.text, "label": self.label}
+
+class Event:
+    """
+    One extracted event, with the fields described in nlp.extract_events.
+
+    Events are created by extract_events and go through merge_events, link_events
+    and storage as Event objects: __slots__ keep them at a fraction of the size
+    of the equivalent dict, entity labels and action lemmas are interned, and
+    entities are (text, label) tuples. to_dict gives the original dict form for
+    API responses; encode_events/decode_events are the storage encoding.
+    """
+    __slots__ = EVENT_FIELDS + ("extra",)
+
+    def __init__(self, event_id: Optional[str] = None, sentence: str = "", sentence_index: int = 0,
+                 extracted_at: Optional[str] = None, subject: Optional[str] = None,
+                 subjects: Optional[List[str]] = None, action: Optional[str] = None,
+                 action_lemma: Optional[str] = None, object: Optional[str] = None,
+                 objects: Optional[List[str]] = None, time: Optional[List[str]] = None,
+                 location: Optional[List[str]] = None, additional_info: Optional[List[str]] = None,
+                 entities: Optional[List[Entity]] = None, occurrences: Optional[int] = None,
+                 first_mentioned: Optional[str] = None, last_mentioned: Optional[str] = None,
+                 raw_sentences: Optional[List[str]] = None, sentence_indices: Optional[List[int]] = None,
+                 extra: Optional[Dict] = None):
+        self.event_id = event_id
+        self.sentence = sentence
+        self.sentence_index = sentence_index
+        self.extracted_at = extracted_at
+        self.subject = subject
+        self.subjects = subjects if subjects is not None else []
+        self.action = action
+        self.action_lemma = intern(action_lemma)
+        self.object = object
+        self.objects = objects if objects is not None else []
+        self.time = time if time is not None else []
+        self.location = location if location is not None else []
+        self.additional_info = additional_info if additional_info is not None else []
+        self.entities = entities if entities is not None else []
+        self.occurrences = occurrences
+        self.first_mentioned = first_mentioned
+        self.last_mentioned = last_mentioned
+        self.raw_sentences = raw_sentences
+        self.sentence_indices = sentence_indices
+        # Keys of stored events that are not part of the model, kept as they were
+        self.extra = extra
+
+    def __repr__(self) -> str:
+        return f"Event({self.subject!r}, {self.action!r}, {self.object!r})"
+
+    def copy(self) -> "Event":
+        """ A shallow copy (list fields are shared, like dict.copy). """
+        event = Event.__new__(Event)
+        for name in Event.__slots__:
+            setattr(event, name, getattr(self, name))
+        return event
+
+    def to_row(self) -> List:
+        """ The event as a list in EVENT_FIELDS order (plus extra, if any), trailing Nones dropped. """
+        row = [getattr(self, name) for name in EVENT_FIELDS]
+        if self.extra:
+            row.append(self.extra)
+        while len(row) > OPTIONAL_FROM and row[-1] is None:
+            row.pop()
+        return row
+
+    @classmethod
+    def from_row(cls, row: List) -> "Event":
+        event = cls(*row[:len(EVENT_FIELDS)])
+        if len(row) > len(EVENT_FIELDS):
+            event.extra = row[len(EVENT_FIELDS)]
+        event.entities = [Entity(text, intern(label)) for text, label in event.entities]
+        return event
+
+    def to_dict(self) -> Dict:
+        """ The event dict: every core field, plus the metadata fields the event has. """
+        data = {name: getattr(self, name) for name in EVENT_FIELDS[:OPTIONAL_FROM]}
+        data["entities"] = [entity.to_dict() for entity in self.entities]
+        for name in EVENT_FIELDS[OPTIONAL_FROM:]:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Event":
+        """ An Event from a (version 1) event dict; unknown keys are kept in extra. """
+        fields = {name: data[name] for name in EVENT_FIELDS if name in data}
+        for name in _LIST_FIELDS:
+            if fields.get(name) is None:
+                fields.pop(name, None)
+        fields["entities"] = [Entity(entity.get("text", ""), intern(entity.get("label", "")))
+                              for entity in data.get("entities") or []]
+        extra = {key: value for key, value in data.items() if key not in EVENT_FIELDS}
+        return cls(**fields, extra=extra or None)
+
+def encode_events(events: List[Event]) -> str:
+    """
+    The events_tagged encoding of events: a JSON object with the format version
+    and one positional row per event, so field names are not repeated per event
+    and decoding builds lists rather than dicts.
+    """
+    return json.dumps({"v": EVENTS_FORMAT_VERSION, "events": [event.to_row() for event in events]},
+                      separators=(",", ":"), ensure_ascii=False)
+
+def decode_events(data: Optional[str]) -> List[Event]:
+    """
+    The events of an events_tagged value, in any known format version. Raises
+    ValueError for malformed data or a version written by newer code.
+    """
+    if not data:
+        return []
+    decoded = json.loads(data)
+    if isinstance(decoded, list):
+        version = 1
+    else:
+        version = decoded.get("v") if isinstance(decoded, dict) else None
+        if version != EVENTS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported events format version: {version!r}")
+    try:
+        if version == 1:
+            return [Event.from_dict(event) for event in decoded]
+        return [Event.from_row(row) for row in decoded["events"]]
+    except (AttributeError, KeyError, TypeError) as e:
+        raise ValueError(f"Malformed version {version} events: {e}") from e
+
+def events_json(data: Optional[str]) -> Optional[str]:
+    """
+    events_tagged as the JSON list of event dicts that API responses and exports
+    return, whatever format it is stored in.
+    """
+    if not data or data.lstrip().startswith("["):
+        return data
+    return json.dumps([event.to_dict() for event in decode_events(data)])
@@ -0,0 +1,38 @@
+# backend/app/services/export.py
+import json
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator
+
+# Serialized lines are buffered up to this size before being sent (or compressed)
+CHUNK_SIZE = 64 * 1024
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def iter_ndjson(entries: Iterable[Dict], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Serialize entries as newline-delimited JSON, yielding chunks of about
+    chunk_size bytes. Only one chunk is held in memory at a time.
+    """
+    buffer, size = [], 0
+    for entry in entries:
+        line = json.dumps(entry, default=_json_default, ensure_ascii=False).encode("utf-8") + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """ Compress a stream of chunks into a single gzip stream, incrementally. """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
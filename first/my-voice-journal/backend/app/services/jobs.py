@@ -0,0 +1,146 @@
+# backend/app/services/jobs.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from .metrics import STAGE_SECONDS
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class QueueFullError(Exception):
+    """ Raised when the queue already holds the maximum number of pending jobs. """
+
+class JobQueue:
+    """
+    A bounded background job queue on top of a thread or process pool.
+
+    Jobs are plain callables. Their status ("queued", "running", "succeeded" or
+    "failed") and result are kept in memory so they can be polled by id. At most
+    max_pending jobs may be queued or running at once; finished jobs are kept
+    until history_size newer jobs have finished.
+    """
+
+    def __init__(self, workers: int = 2, executor: str = "thread",
+                 max_pending: int = 64, history_size: int = 1000):
+        self.workers = max(1, workers)
+        self.executor_kind = executor
+        self.max_pending = max(1, max_pending)
+        self.history_size = max(0, history_size)
+        self._executor: Optional[Executor] = None
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="pipeline")
+        return self._executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> str:
+        """
+        Queue fn(*args, **kwargs) and return the new job id.
+        Raises QueueFullError when max_pending jobs are already in flight.
+        """
+        job_id = str(uuid.uuid4())
+        submitted = time.perf_counter()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+            self._pending += 1
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": QUEUED,
+                "submitted_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+
+        # Process workers cannot report back that they started, so the job is
+        # marked running as soon as it is handed to the pool.
+        try:
+            if self.executor_kind == "process":
+                self._set(job_id, status=RUNNING, started_at=datetime.now().isoformat())
+                future = self._get_executor().submit(fn, *args, **kwargs)
+            else:
+                future = self._get_executor().submit(self._run, job_id, submitted, fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self._jobs.pop(job_id, None)
+            raise
+        future.add_done_callback(lambda f: self._finish(job_id, submitted, f))
+        return job_id
+
+    def _run(self, job_id: str, submitted: float, fn: Callable, *args, **kwargs):
+        STAGE_SECONDS.observe(time.perf_counter() - submitted, "job_queue_wait")
+        self._set(job_id, status=RUNNING, started_at=datetime.now().isoformat())
+        return fn(*args, **kwargs)
+
+    def _finish(self, job_id: str, submitted: float, future):
+        STAGE_SECONDS.observe(time.perf_counter() - submitted, "job_total")
+        try:
+            result = future.result()
+            fields = {"status": SUCCEEDED, "result": result}
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            fields = {"status": FAILED, "error": str(e)}
+        fields["finished_at"] = datetime.now().isoformat()
+
+        with self._lock:
+            self._pending -= 1
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+                # Move to the end so the oldest finished jobs are evicted first.
+                self._jobs.move_to_end(job_id)
+            self._evict()
+
+    def _evict(self):
+        finished = len(self._jobs) - self._pending
+        if finished <= self.history_size:
+            return
+        for job_id in list(self._jobs):
+            if finished <= self.history_size:
+                break
+            if self._jobs[job_id]["status"] in (SUCCEEDED, FAILED):
+                del self._jobs[job_id]
+                finished -= 1
+
+    def _set(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """ Returns a snapshot of the job, or None if it is unknown or was evicted. """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "executor": self.executor_kind,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "tracked": len(self._jobs),
+            }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,162 @@
+# backend/app/services/metrics.py
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) of the latency buckets; STT calls can take minutes.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+class Histogram:
+    """
+    A labelled latency histogram with fixed buckets, rendered in the Prometheus
+    text format. Values are kept per label combination, in this process only
+    (with JOB_EXECUTOR=process, pipeline stages are recorded in the worker processes).
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (the last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """
+        Estimate the q-quantile by linear interpolation within its bucket
+        (as Prometheus' histogram_quantile does). None if nothing was observed.
+        """
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None or series[2] == 0:
+                return None
+            counts, total = list(series[0]), series[2]
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # in the +Inf bucket
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            keys = [(labels, series[1], series[2]) for labels, series in self._series.items()]
+        return {
+            ",".join(labels): {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else None,
+                "p50": self.quantile(0.5, *labels),
+                "p90": self.quantile(0.9, *labels),
+                "p99": self.quantile(0.99, *labels),
+            }
+            for labels, total, count in sorted(keys)
+        }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items())
+        for labels, counts, total, count in items:
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+STAGE_SECONDS = Histogram(
+    "voice_journal_stage_seconds", "Time spent in each processing stage.", ("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "voice_journal_request_seconds", "HTTP request latency.", ("method", "route", "status")
+)
+HISTOGRAMS = (STAGE_SECONDS, REQUEST_SECONDS)
+
+# Stage timings of the current request, for the Server-Timing header (None outside requests)
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+class timed(ContextDecorator):
+    """
+    Time a block or function as a stage:
+
+        with timed("transcribe"): ...
+
+        @timed("merge_events")
+        def merge_events(...): ...
+
+    The duration goes into the stage histogram and, during a request, into that
+    request's Server-Timing header.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._starts = threading.local()
+
+    def __enter__(self):
+        # A stack per thread, so one instance can decorate reentrant or concurrent calls
+        stack = getattr(self._starts, "stack", None)
+        if stack is None:
+            stack = self._starts.stack = []
+        stack.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._starts.stack.pop()
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+        return False
+
+def start_request_timings():
+    """ Start collecting stage timings for the current request. Returns the list they go into. """
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """ A Server-Timing header value (durations in milliseconds), repeated stages summed. """
+    durations: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+    parts = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in durations.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+def render_prometheus() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+def metrics_summary() -> Dict:
+    """ count, sum, mean and estimated p50/p90/p99 of every stage and route. """
+    return {"stages": STAGE_SECONDS.summary(), "requests": REQUEST_SECONDS.summary()}
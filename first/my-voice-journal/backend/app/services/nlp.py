@@ -2,19 +2,64 @@
 import spacy
 import json
 import difflib
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
 import uuid
+from .. import config
+from .event_index import CandidateIndex
+from .events import Entity, Event, intern
+from .metrics import timed
+from .registry import registry
+from .sentiment import SentimentResult, get_analyzer, score_text
 
-# Load spaCy English language model
-nlp = spacy.load("en_core_web_sm")
+# Components of the spaCy pipeline each task needs (None means the full pipeline).
+# Sentiment doesn't use spaCy at all, see services.sentiment.
+TASK_PIPES = {
+    "sentences": ("tok2vec", "parser"),
+    "events": None,
+}
+
+def _load_spacy():
+    # senter is disabled in the packaged pipeline (the parser sets sentence boundaries)
+    return spacy.load(config.SPACY_MODEL, exclude=["senter"])
+
+registry.register("spacy", _load_spacy)
+
+def get_nlp():
+    """ The shared spaCy pipeline, loaded on first use. """
+    return registry.get("spacy")
+
+def nlp(text: str, task: str = "events"):
+    """ Parse text with only the pipeline components the task needs (see TASK_PIPES). """
+    model = get_nlp()
+    pipes = TASK_PIPES[task]
+    if pipes is None:
+        return model(text)
+    return model(text, disable=[name for name in model.pipe_names if name not in pipes])
+
+# Bump whenever the output of analyze_transcript changes, so cached analyses
+# produced by older code are not reused.
+ANALYSIS_VERSION = 5
+
+def model_version() -> str:
+    """
+    Identifies the analysis code, spaCy model and sentiment lexicon that produced a result.
+    Read from the installed package, so it doesn't require loading the model.
+    """
+    try:
+        package_version = spacy.util.get_package_version(config.SPACY_MODEL)
+    except Exception:
+        package_version = None
+    return (f"{ANALYSIS_VERSION}:{config.SPACY_MODEL}-{package_version}:spacy-{spacy.__version__}"
+            f":sentiment-{get_analyzer().version()}")
 
 def summarize_text(text: str, max_sentences: int = 3) -> str:
     """
     A simple summarization function that selects the first few sentences
     from the text if it is long. (Replace with a call to an AI model if needed.)
     """
-    doc = nlp(text)
+    doc = nlp(text, task="sentences")
     sentences = [sent.text.strip() for sent in doc.sents if sent.text.strip()]
     if len(sentences) <= max_sentences:
         return text
@@ -37,45 +82,185 @@ def preprocess_text(text: str, chunk_size: int = 500) -> List[str]:
         processed_chunks.append(p)
     return processed_chunks
 
+@dataclass
+class TextAnalysis:
+    """
+    Everything the upload path needs from one transcript, computed from a single parse.
+
+      - sentiment_score: Lexicon sentiment of the whole text.
+      - sentence_sentiments: Lexicon sentiment of each parsed sentence, in order
+        (index i is the sentence of events with sentence_index i).
+      - summaries: The processed paragraph chunks (long paragraphs are summarized).
+      - events: One event per sentence of the full text.
+      - merged_events: Events extracted from the processed chunks and merged.
+    """
+    sentiment_score: float = 0.0
+    sentence_sentiments: List[float] = field(default_factory=list)
+    summaries: List[str] = field(default_factory=list)
+    events: List[Event] = field(default_factory=list)
+    merged_events: List[Event] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        # Events are stored as rows (see services.events), as in events_tagged
+        return {
+            "sentiment_score": self.sentiment_score,
+            "sentence_sentiments": self.sentence_sentiments,
+            "summaries": self.summaries,
+            "events": [event.to_row() for event in self.events],
+            "merged_events": [event.to_row() for event in self.merged_events],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TextAnalysis":
+        return cls(
+            sentiment_score=data.get("sentiment_score", 0.0),
+            sentence_sentiments=data.get("sentence_sentiments", []),
+            summaries=data.get("summaries", []),
+            events=[Event.from_row(row) for row in data.get("events", [])],
+            merged_events=[Event.from_row(row) for row in data.get("merged_events", [])],
+        )
+
+    def restamp(self) -> "TextAnalysis":
+        """
+        Give the events new event_ids and extraction times, as a fresh parse would.
+        An analysis served from the cache otherwise repeats the ids and timestamps
+        of the first entry it was computed for.
+        """
+        now = datetime.now().isoformat()
+        for event in self.events:
+            event.event_id = str(uuid.uuid4())
+            event.extracted_at = now
+        for event in self.merged_events:
+            event.event_id = str(uuid.uuid4())
+            event.extracted_at = now
+            if event.first_mentioned is not None:
+                event.first_mentioned = now
+            if event.last_mentioned is not None:
+                event.last_mentioned = now
+        return self
+
+def _paragraph_spans(text: str):
+    """
+    Yield (start, end) character offsets of the non-empty paragraphs in text,
+    using the same newline split as preprocess_text.
+    """
+    offset = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if stripped:
+            start = offset + line.index(stripped)
+            yield start, start + len(stripped)
+        offset += len(line) + 1
+
+def analyze_transcript(text: str, chunk_size: int = 500, max_sentences: int = 3) -> TextAnalysis:
+    """
+    Parse the text exactly once and derive summaries, events and merged events from
+    that single spaCy Doc. Sentiment is scored over the Doc's sentences with the
+    lexicon scorer in services.sentiment.
+
+    The chunking mirrors preprocess_text/summarize_text: each paragraph becomes a chunk,
+    and paragraphs longer than chunk_size are reduced to their first max_sentences
+    sentences. Merged events are extracted from those chunks, while the per-sentence
+    events cover the full text (what extract_events(text) would return).
+    """
+    if not text:
+        return TextAnalysis()
+    with timed("spacy_parse"):
+        doc = nlp(text)
+    return _analysis_from_doc(text, doc, chunk_size, max_sentences)
+
+def analyze_transcripts(texts: Iterable[str], n_process: int = 1, batch_size: int = 64,
+                        chunk_size: int = 500, max_sentences: int = 3) -> Iterator[TextAnalysis]:
+    """
+    analyze_transcript for many texts, parsed with nlp.pipe (in n_process worker
+    processes, batch_size texts at a time). The sentiment of each batch is scored
+    with one SentimentAnalyzer.score_many call. Yields one TextAnalysis per text,
+    in order.
+    """
+    texts = list(texts)
+    docs = get_nlp().pipe((text for text in texts if text), n_process=n_process, batch_size=batch_size)
+    for batch_start in range(0, len(texts), batch_size):
+        batch = texts[batch_start:batch_start + batch_size]
+        parsed = [next(docs) if text else None for text in batch]
+        with timed("sentiment"):
+            sentiments = iter(get_analyzer().score_many(
+                [text for text in batch if text],
+                [[(sent.start_char, sent.end_char) for sent in doc.sents] for doc in parsed if doc is not None],
+            ))
+        for text, doc in zip(batch, parsed):
+            if doc is None:
+                yield TextAnalysis()
+            else:
+                yield _analysis_from_doc(text, doc, chunk_size, max_sentences, next(sentiments))
+
+def _analysis_from_doc(text: str, doc, chunk_size: int, max_sentences: int,
+                       sentiment: Optional[SentimentResult] = None) -> TextAnalysis:
+    sentences = list(doc.sents)
+
+    summaries = []
+    chunk_events = []
+    sent_idx = 0
+    for start, end in _paragraph_spans(text):
+        # Sentences are in document order, so skip those before this paragraph
+        # and collect the ones that start inside it.
+        while sent_idx < len(sentences) and sentences[sent_idx].start_char < start:
+            sent_idx += 1
+        para_sents = []
+        while sent_idx < len(sentences) and sentences[sent_idx].start_char < end:
+            para_sents.append(sentences[sent_idx])
+            sent_idx += 1
+
+        paragraph = text[start:end]
+        if len(paragraph) > chunk_size:
+            kept = [sent for sent in para_sents if sent.text.strip()]
+            if len(kept) > max_sentences:
+                para_sents = kept[:max_sentences]
+                paragraph = " ".join(sent.text.strip() for sent in para_sents)
+        summaries.append(paragraph)
+        chunk_events.extend(_events_from_sentences(para_sents))
+
+    if sentiment is None:
+        with timed("sentiment"):
+            # Scored over the parsed sentences, so sentence_sentiments[i] is the
+            # sentiment of the sentence of events with sentence_index i
+            sentiment = get_analyzer().score_spans(text, [(sent.start_char, sent.end_char) for sent in sentences])
+    with timed("extract_events"):
+        events = _events_from_sentences(sentences)
+    with timed("merge_events"):
+        merged_events = merge_events(chunk_events)
+    return TextAnalysis(
+        sentiment_score=sentiment.score,
+        sentence_sentiments=sentiment.sentence_scores,
+        summaries=summaries,
+        events=events,
+        merged_events=merged_events,
+    )
+
 def analyze_text(text: str) -> Dict:
     """
     Analyze text for sentiment and extract events.
     
-    This function first preprocesses the text (splitting and summarization),
-    then extracts events from each chunk, and finally merges similar events.
+    This is a thin wrapper around analyze_transcript, which parses the text once
+    and reuses that parse for sentiment, chunk summaries and event extraction.
     
     Returns:
-        dict: Contains "sentiment_score" (a float) and "events" (a list of merged event dicts).
+        dict: Contains "sentiment_score" (a float) and "events" (a list of merged Events).
     """
-    sentiment_score = get_sentiment(text)
-    processed_chunks = preprocess_text(text)
-    
-    # Extract events from each processed chunk.
-    events = []
-    for chunk in processed_chunks:
-        events.extend(extract_events(chunk))
-    
-    merged_events = merge_events(events)
+    analysis = analyze_transcript(text)
     return {
-        "sentiment_score": sentiment_score,
-        "events": merged_events
+        "sentiment_score": analysis.sentiment_score,
+        "events": analysis.merged_events
     }
 
 def get_sentiment(text: str) -> float:
     """
-    Compute a basic sentiment score using a simple word-based approach.
-    This method counts occurrences of predefined positive and negative words
-    and returns a normalized score.
+    Compute a sentiment score for the whole text with the lexicon scorer in
+    services.sentiment (weighted words with negation handling, normalized by the
+    number of words). Use services.sentiment.score_text for per-sentence scores.
     """
-    positive_words = {"good", "great", "happy", "excellent", "fortunate", "correct", "superior"}
-    negative_words = {"bad", "terrible", "sad", "poor", "unfortunate", "wrong", "inferior"}
-    tokens = [token.text.lower() for token in nlp(text) if token.is_alpha]
-    pos_count = sum(1 for token in tokens if token in positive_words)
-    neg_count = sum(1 for token in tokens if token in negative_words)
-    total = len(tokens)
-    return (pos_count - neg_count) / total if total > 0 else 0.0
+    return score_text(text).score
 
-def extract_events(text: str) -> List[Dict]:
+def extract_events(text: str) -> List[Event]:
     """
     Extract structured events from text using spaCy.
     
@@ -98,33 +283,20 @@ def extract_events(text: str) -> List[Dict]:
         text (str): The input narrative text.
     
     Returns:
-        List[Dict]: A list of enriched event dictionaries (one per sentence).
+        List[Event]: A list of enriched events (one per sentence with a main verb).
+    """
+    return _events_from_sentences(nlp(text).sents)
+
+def _events_from_sentences(sentences) -> List[Event]:
+    """
+    Build the events described in extract_events from already parsed sentence
+    spans. Sentence indices are relative to the given sequence.
     """
-    doc = nlp(text)
     events = []
+    # One parse, one extraction time (shared by all its events)
+    extracted_at = datetime.now().isoformat()
     
-    for idx, sent in enumerate(doc.sents):
-        event = {
-            "event_id": str(uuid.uuid4()),
-            "sentence": sent.text,
-            "sentence_index": idx,
-            "extracted_at": datetime.now().isoformat(),
-            "subject": None,
-            "subjects": [],
-            "action": None,
-            "action_lemma": None,
-            "object": None,
-            "objects": [],
-            "time": [],
-            "location": [],
-            "additional_info": [],
-            "entities": []
-        }
-        
-        # Capture all named entities with their labels
-        for ent in sent.ents:
-            event["entities"].append({"text": ent.text, "label": ent.label_})
-        
+    for idx, sent in enumerate(sentences):
         # Identify the main verb (ROOT) of the sentence
         main_verb = None
         for token in sent:
@@ -134,52 +306,57 @@ def extract_events(text: str) -> List[Dict]:
         if main_verb is None:
             continue
         
-        event["action"] = main_verb.text
-        event["action_lemma"] = main_verb.lemma_
+        event = Event(
+            event_id=str(uuid.uuid4()),
+            sentence=sent.text,
+            sentence_index=idx,
+            extracted_at=extracted_at,
+            action=main_verb.text,
+            action_lemma=main_verb.lemma_,
+        )
+        
+        # Capture all named entities with their labels
+        event.entities = [Entity(ent.text, intern(ent.label_)) for ent in sent.ents]
         
         # Extract subjects (nsubj or nsubjpass) using noun chunks
-        subj_chunks = [chunk for chunk in sent.noun_chunks if chunk.root.dep_ in ("nsubj", "nsubjpass")]
+        noun_chunks = list(sent.noun_chunks)
+        subj_chunks = [chunk for chunk in noun_chunks if chunk.root.dep_ in ("nsubj", "nsubjpass")]
         subjects = [chunk.text for chunk in subj_chunks]
         if subjects:
-            event["subjects"] = subjects
-            event["subject"] = subjects[0]
+            event.subjects = subjects
+            event.subject = subjects[0]
         
         # Extract objects (dobj, attr, or pobj) using noun chunks
-        obj_chunks = [chunk for chunk in sent.noun_chunks if chunk.root.dep_ in ("dobj", "attr", "pobj")]
+        obj_chunks = [chunk for chunk in noun_chunks if chunk.root.dep_ in ("dobj", "attr", "pobj")]
         objects = [chunk.text for chunk in obj_chunks]
         if objects:
-            event["objects"] = objects
-            event["object"] = objects[0]
+            event.objects = objects
+            event.object = objects[0]
         
         # Extract time-related entities (DATE, TIME)
-        times = [ent.text for ent in sent.ents if ent.label_ in ("TIME", "DATE")]
-        event["time"] = times
+        event.time = [ent.text for ent in sent.ents if ent.label_ in ("TIME", "DATE")]
         
         # Extract location-related entities (GPE, LOC, FAC)
-        locations = [ent.text for ent in sent.ents if ent.label_ in ("GPE", "LOC", "FAC")]
-        event["location"] = locations
+        event.location = [ent.text for ent in sent.ents if ent.label_ in ("GPE", "LOC", "FAC")]
         
         # Extract additional info: adverbial modifiers of the main verb
-        adv_mods = [child.text for child in main_verb.children if child.dep_ == "advmod"]
-        event["additional_info"] = adv_mods
+        event.additional_info = [child.text for child in main_verb.children if child.dep_ == "advmod"]
         
         events.append(event)
     
     return events
 
-def canonical_primary(event: Dict) -> str:
+def _primary_string(subject: Optional[str], action: Optional[str], obj: Optional[str]) -> str:
+    return " ".join(value.strip().lower() for value in (subject, action, obj) if value)
+
+def canonical_primary(event: Event) -> str:
     """
     Create a canonical string from an event's primary details (subject, action, object).
     This helps normalize the core of the event for fuzzy comparison.
     """
-    parts = []
-    for key in ["subject", "action", "object"]:
-        value = event.get(key)
-        if value:
-            parts.append(value.strip().lower())
-    return " ".join(parts)
+    return _primary_string(event.subject, event.action, event.object)
 
-def compute_event_similarity(event1: Dict, event2: Dict) -> float:
+def compute_event_similarity(event1: Event, event2: Event) -> float:
     """
     Compute a similarity score between two events based on their canonical primary details.
     Returns a value between 0 and 1.
@@ -191,7 +368,154 @@ def compute_event_similarity(event1: Dict, event2: Dict) -> float:
     # Optionally, you can incorporate more signals (e.g., entity overlap) here.
     return base_sim
 
-def merge_events(events: List[Dict], similarity_threshold: float = 0.6) -> List[Dict]:
+class _UnionFind:
+    """ Disjoint sets over 0..n-1 with path halving and union by size. """
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+def _cluster_greedy(events: List[Event], canons: List[str], similarity_threshold: float) -> List[List[int]]:
+    """
+    Assign each event to the first earlier cluster it is similar enough to, comparing
+    against the cluster's current canonical string (the first event's, with subject and
+    object filled in from later members once they are known).
+    """
+    clusters = []
+    primaries = []  # [subject, action, object] of each cluster
+    index = CandidateIndex()
+    # canon -> (matched cluster, len(changed) at the time). An event whose canonical
+    # string was seen before has the same first match, unless that cluster or an
+    # earlier one has changed its string since, so the lookup can be skipped.
+    memo = {}
+    changed_clusters = []
+    for i, event in enumerate(events):
+        canon = canons[i]
+        seen = memo.get(canon)
+        if seen is not None and all(c > seen[0] for c in changed_clusters[seen[1]:]):
+            match = seen[0]
+        else:
+            match = index.first_match(canon, similarity_threshold)
+        if match < 0:
+            match = len(clusters)
+            index.add(match, canon)
+            clusters.append([i])
+            primaries.append([event.subject, event.action, event.object])
+            memo[canon] = (match, len(changed_clusters))
+            continue
+
+        clusters[match].append(i)
+        memo[canon] = (match, len(changed_clusters))
+        primary = primaries[match]
+        changed = False
+        if not primary[0] and event.subject:
+            primary[0] = event.subject
+            changed = True
+        if not primary[2] and event.object:
+            primary[2] = event.object
+            changed = True
+        if changed:
+            index.add(match, _primary_string(*primary))
+            changed_clusters.append(match)
+    return clusters
+
+def _event_sort_key(event: Event, canon: str):
+    return (canon, event.sentence or "", event.sentence_index or 0,
+            event.subject or "", event.object or "", event.event_id or "")
+
+def _cluster_deterministic(events: List[Event], canons: List[str], similarity_threshold: float) -> List[List[int]]:
+    """
+    Order-independent clustering. Events with identical canonical strings always
+    belong together; the distinct strings are then visited from most to least
+    frequent (ties by string) and each joins the first cluster leader it is similar
+    enough to, or becomes a leader itself. Joins are recorded with union-find.
+    Comparing only against leaders avoids chaining loosely similar strings together.
+    """
+    counts: Dict[str, int] = {}
+    for canon in canons:
+        counts[canon] = counts.get(canon, 0) + 1
+    unique = sorted(counts, key=lambda canon: (-counts[canon], canon))
+    position = {canon: i for i, canon in enumerate(unique)}
+
+    sets = _UnionFind(len(unique))
+    leaders = CandidateIndex()
+    for i, canon in enumerate(unique):
+        for j in leaders.candidates(canon, similarity_threshold):
+            # Compare in sorted string order so the ratio is symmetric.
+            a, b = sorted((unique[j], canon))
+            if difflib.SequenceMatcher(None, a, b).ratio() >= similarity_threshold:
+                sets.union(j, i)
+                break
+        else:
+            leaders.add(i, canon)
+
+    components: Dict[int, List[int]] = {}
+    for i, canon in enumerate(canons):
+        components.setdefault(sets.find(position[canon]), []).append(i)
+    clusters = [sorted(members, key=lambda i: _event_sort_key(events[i], canons[i]))
+                for members in components.values()]
+    clusters.sort(key=lambda members: _event_sort_key(events[members[0]], canons[members[0]]))
+    return clusters
+
+def _materialize_cluster(events: List[Event], members: List[int]) -> Event:
+    """ Build one merged event from its members (the first one is the representative). """
+    first = events[members[0]]
+    merged = first.copy()
+    merged.occurrences = len(members)
+    merged.first_mentioned = first.extracted_at
+    merged.last_mentioned = first.extracted_at if len(members) == 1 else datetime.now().isoformat()
+
+    raw_sentences = {}
+    for i in members:
+        raw_sentences.setdefault(events[i].sentence, events[i].sentence_index)
+    merged.raw_sentences = list(raw_sentences)
+    merged.sentence_indices = list(raw_sentences.values())
+
+    if len(members) == 1:
+        merged.entities = list(first.entities)
+        return merged
+
+    # Accumulate every list field once (insertion-ordered sets) instead of
+    # rebuilding the lists on every pairwise merge.
+    for key in ("subjects", "objects", "time", "location", "additional_info"):
+        values = {}
+        for i in members:
+            values.update(dict.fromkeys(getattr(events[i], key)))
+        setattr(merged, key, list(values))
+    if not merged.subject:
+        merged.subject = next((events[i].subject for i in members if events[i].subject), merged.subject)
+    if not merged.object:
+        merged.object = next((events[i].object for i in members if events[i].object), merged.object)
+
+    # Merge entities uniquely (using lowercase text for comparison).
+    entities = list(first.entities)
+    seen = {(ent.text.lower(), ent.label) for ent in entities}
+    for i in members[1:]:
+        for ent in events[i].entities:
+            key = (ent.text.lower(), ent.label)
+            if key not in seen:
+                entities.append(ent)
+                seen.add(key)
+    merged.entities = entities
+    return merged
+
+def merge_events(events: List[Event], similarity_threshold: float = 0.6,
+                 deterministic: bool = False) -> List[Event]:
     """
     Merge events that likely refer to the same occurrence.
     
@@ -203,43 +527,21 @@ def merge_events(events: List[Dict], similarity_threshold: float = 0.6) -> List[
       - Update first and last mentioned timestamps.
       - Combine raw sentences and sentence indices.
       - Merge lists (subjects, objects, time, location, additional_info, entities) uniquely.
+
+    Canonical strings are computed once per event, events are first grouped into
+    clusters, and each merged event is then built a single time from its cluster.
+
+    By default each event joins the first earlier merged event it is similar to
+    (candidates come from a CandidateIndex, so it is not compared with all of them).
+    With deterministic=True the events are clustered by content instead (see
+    _cluster_deterministic), and both the clusters and their members are ordered
+    by content, so the result does not depend on the input order.
     """
-    merged = []
-    for event in events:
-        found = False
-        for m_ev in merged:
-            if compute_event_similarity(m_ev, event) >= similarity_threshold:
-                # Merge event into the existing merged event.
-                m_ev["occurrences"] += 1
-                m_ev["last_mentioned"] = datetime.now().isoformat()
-                if event["sentence"] not in m_ev.get("raw_sentences", []):
-                    m_ev.setdefault("raw_sentences", []).append(event["sentence"])
-                    m_ev.setdefault("sentence_indices", []).append(event["sentence_index"])
-                # Merge subjects and objects uniquely.
-                m_ev["subjects"] = list(set(m_ev["subjects"] + event["subjects"]))
-                if not m_ev["subject"] and event["subject"]:
-                    m_ev["subject"] = event["subject"]
-                m_ev["objects"] = list(set(m_ev["objects"] + event["objects"]))
-                if not m_ev["object"] and event["object"]:
-                    m_ev["object"] = event["object"]
-                # Merge other lists uniquely.
-                m_ev["time"] = list(set(m_ev["time"] + event["time"]))
-                m_ev["location"] = list(set(m_ev["location"] + event["location"]))
-                m_ev["additional_info"] = list(set(m_ev["additional_info"] + event["additional_info"]))
-                # Merge entities uniquely (using lowercase text for comparison).
-                existing_entities = {(ent["text"].lower(), ent["label"]) for ent in m_ev["entities"]}
-                for ent in event["entities"]:
-                    if (ent["text"].lower(), ent["label"]) not in existing_entities:
-                        m_ev["entities"].append(ent)
-                        existing_entities.add((ent["text"].lower(), ent["label"]))
-                found = True
-                break
-        if not found:
-            new_event = event.copy()
-            new_event["occurrences"] = 1
-            new_event["first_mentioned"] = event["extracted_at"]
-            new_event["last_mentioned"] = event["extracted_at"]
-            new_event["raw_sentences"] = [event["sentence"]]
-            new_event["sentence_indices"] = [event["sentence_index"]]
-            merged.append(new_event)
-    return merged
+    if not events:
+        return []
+    canons = [canonical_primary(event) for event in events]
+    if deterministic:
+        clusters = _cluster_deterministic(events, canons, similarity_threshold)
+    else:
+        clusters = _cluster_greedy(events, canons, similarity_threshold)
+    return [_materialize_cluster(events, members) for members in clusters]
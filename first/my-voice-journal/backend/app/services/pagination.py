@@ -0,0 +1,34 @@
+# backend/app/services/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+class InvalidCursorError(ValueError):
+    """ Raised when a pagination cursor cannot be decoded. """
+
+def encode_cursor(created_at: datetime, entry_id: str) -> str:
+    """
+    Build an opaque cursor pointing just after the entry with this (created_at, id).
+    """
+    payload = json.dumps({"t": created_at.isoformat(), "id": entry_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """ Inverse of encode_cursor. Raises InvalidCursorError for malformed cursors. """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), str(payload["id"])
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+def make_snippet(text: Optional[str], length: int = 160) -> str:
+    """ The start of text, cut at a word boundary when it is longer than length. """
+    if not text:
+        return ""
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0] or text[:length]
+    return cut + "…"
@@ -0,0 +1,107 @@
+# backend/app/services/profiling.py
+import asyncio
+import functools
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+from fastapi.routing import APIRoute
+from .. import config
+
+# Optional: the pyinstrument sampling profiler.
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None  # Profiling requests are ignored without it
+
+class RequestProfile:
+    """ A profiled request; holds the profiler once the endpoint has started running. """
+    def __init__(self):
+        self.profiler = None
+
+_request_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+def profiling_requested(request) -> bool:
+    """ Whether this request asked to be profiled (and profiling is enabled). """
+    if not config.PROFILING_ENABLED:
+        return False
+    return request.query_params.get("profile") == "1" or request.headers.get("x-profile") == "1"
+
+def start_request_profile() -> RequestProfile:
+    """
+    Mark the current request as profiled. The profiler itself is started by
+    ProfiledRoute in the thread that runs the endpoint.
+    """
+    profile = RequestProfile()
+    _request_profile.set(profile)
+    return profile
+
+def start_profiler(async_mode: str = "enabled"):
+    """ A running sampling profiler, or None if pyinstrument is not installed. """
+    if Profiler is None:
+        print("Profiling requested but pyinstrument is not installed")
+        return None
+    profiler = Profiler(async_mode=async_mode)
+    profiler.start()
+    return profiler
+
+def profiled_endpoint(endpoint: Callable) -> Callable:
+    """
+    Wrap an endpoint so that, for a profiled request, the profiler runs in the
+    thread that executes it: the event loop for async endpoints, the threadpool
+    worker for sync ones (pyinstrument only samples the thread it was started in).
+    The wrapper keeps the endpoint's signature, so FastAPI resolves the same
+    parameters and still runs sync endpoints in the threadpool.
+    """
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def run_async(*args, **kwargs):
+            profile = _request_profile.get()
+            if profile is None or profile.profiler is not None:
+                return await endpoint(*args, **kwargs)
+            profile.profiler = start_profiler("enabled")
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if profile.profiler is not None:
+                    profile.profiler.stop()
+        return run_async
+
+    @functools.wraps(endpoint)
+    def run_sync(*args, **kwargs):
+        profile = _request_profile.get()
+        if profile is None or profile.profiler is not None:
+            return endpoint(*args, **kwargs)
+        # No event loop in a worker thread; profile it as plain synchronous code
+        profile.profiler = start_profiler("disabled")
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if profile.profiler is not None:
+                profile.profiler.stop()
+    return run_sync
+
+class ProfiledRoute(APIRoute):
+    """ The app's route class: runs each endpoint through profiled_endpoint. """
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, profiled_endpoint(endpoint), **kwargs)
+
+def save_profile(profile: RequestProfile, method: str, path: str) -> Optional[str]:
+    """
+    Write the HTML report of a profiled request to PROFILE_DIR. Returns the file
+    path, or None if nothing was profiled (no pyinstrument, or no endpoint ran).
+    """
+    profiler = profile.profiler
+    if profiler is None:
+        return None
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    report_path = os.path.join(config.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{name}.html")
+    try:
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    except Exception as e:
+        print(f"Error writing profile: {e}")
+        return None
+    return report_path
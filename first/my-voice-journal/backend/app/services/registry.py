@@ -0,0 +1,66 @@
+# backend/app/services/registry.py
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+class ModelRegistry:
+    """
+    Process-wide registry of expensive resources (NLP models, embedding models).
+
+    Each resource is registered with a loader and only loaded on first use (or by
+    warm_up), exactly once per process even when several workers ask for it at the
+    same time. A loader may return None when its optional dependency is missing.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        self._loaders[name] = loader
+        self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """ The resource registered under name, loading it if needed. Loader errors propagate. """
+        if name in self._models:
+            return self._models[name]
+        with self._locks[name]:
+            if name not in self._models:
+                started = time.perf_counter()
+                try:
+                    model = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._load_seconds[name] = time.perf_counter() - started
+                self._errors.pop(name, None)
+                self._models[name] = model
+                print(f"Loaded {name} in {self._load_seconds[name]:.2f}s")
+        return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: Optional[Iterable[str]] = None):
+        """ Load the given resources (all registered ones by default), logging failures. """
+        for name in list(names if names is not None else self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Error loading {name}: {e}")
+
+    def status(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "loaded": name in self._models,
+                "available": self._models.get(name) is not None if name in self._models else None,
+                "load_seconds": self._load_seconds.get(name),
+                "error": self._errors.get(name),
+            }
+            for name in self._loaders
+        }
+
+registry = ModelRegistry()
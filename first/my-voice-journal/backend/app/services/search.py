@@ -0,0 +1,326 @@
+# backend/app/services/search.py
+import hashlib
+import html
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from .. import config
+from .events import decode_events
+
+# bm25 weights of the transcription and events columns
+TRANSCRIPTION_WEIGHT = 1.0
+EVENTS_WEIGHT = 0.5
+
+# A prefix search ("walk*") is expanded to the indexed terms it matches, if there
+# are at most this many; more common prefixes use FTS5's own prefix matching
+MAX_PREFIX_TERMS = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    rowid INTEGER PRIMARY KEY,
+    entry_id TEXT NOT NULL UNIQUE,
+    created_at TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    transcription, events, user, tokenize = 'porter unicode61'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_vocab USING fts5vocab(entries_fts, row);
+"""
+
+# Snippet markers that cannot appear in transcripts; replaced by <mark> after escaping.
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+# A quoted phrase, or a bare term (optionally a prefix: "walk*")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+class InvalidQueryError(ValueError):
+    """ Raised when a search query has no searchable terms. """
+
+def to_fts_query(query: str, expand_prefix: Optional[Callable[[str], List[str]]] = None) -> str:
+    """
+    Translate a user query into an FTS5 MATCH expression. Terms must all match;
+    "double quoted" text is matched as a phrase, a trailing * makes a prefix
+    search and OR between terms matches either one. Other punctuation is ignored,
+    so user input can never be an FTS5 syntax error.
+
+    expand_prefix, if given, maps a prefix to the indexed terms that start with it;
+    the prefix is then searched as an OR of those terms (or natively, as "prefix"*,
+    when it returns no terms).
+    """
+    parts = []
+    for phrase, word in _QUERY_RE.findall(query):
+        if word == "OR":
+            if parts and parts[-1] != "OR":
+                parts.append("OR")
+            continue
+        terms = _TERM_RE.findall(phrase if phrase else word)
+        if not terms:
+            continue
+        if not phrase and word.endswith("*"):
+            expanded = expand_prefix(terms[0].lower()) if expand_prefix and len(terms) == 1 else None
+            if expanded:
+                parts.append("(" + " OR ".join(f'"{term}"' for term in expanded) + ")")
+            else:
+                parts.append('"' + " ".join(terms) + '"*')
+            continue
+        # A bare word that the tokenizer splits ("e-mail") is matched as a phrase too
+        parts.append('"' + " ".join(terms) + '"')
+    while parts and parts[-1] == "OR":
+        parts.pop()
+    if parts and parts[0] == "OR":
+        parts.pop(0)
+    if not parts:
+        raise InvalidQueryError(f"No search terms in query: {query!r}")
+    return " ".join(parts)
+
+def events_text(events_tagged: Optional[str]) -> str:
+    """ The searchable words of an entry's events: subjects, actions, objects, times and places. """
+    if not events_tagged:
+        return ""
+    try:
+        events = decode_events(events_tagged)
+    except ValueError:
+        return ""
+    words = []
+    for event in events:
+        for value in (event.subject, event.action, event.object):
+            if value:
+                words.append(str(value))
+        words.extend(str(value) for value in event.time or [])
+        words.extend(str(value) for value in event.location or [])
+        words.extend(str(entity.text) for entity in event.entities)
+    return " ".join(words)
+
+def _user_token(user_id: Optional[str]) -> str:
+    # User ids are indexed as one opaque token, so a user filter is part of the MATCH
+    return "u" + hashlib.sha1((user_id or "").encode("utf-8")).hexdigest()[:20]
+
+_USER_TOKEN_RE = re.compile(r"u[0-9a-f]{20}$")
+
+def _highlight(snippet: str) -> str:
+    escaped = html.escape(snippet, quote=False)
+    return escaped.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+class SearchIndex:
+    """
+    A full-text index of journal entries in a SQLite FTS5 table.
+
+    Each entry's transcription and the words of its events (see events_text) are
+    indexed with the porter stemmer, along with a token for the user so a user
+    filter is part of the match; a side table maps index rows to entry ids and
+    creation times. Entries are added (or replaced) as they are saved,
+    so the index is kept up to date incrementally; rebuild re-creates it from
+    storage. Results are ranked by BM25, with matches in the transcription
+    weighted above matches in events; rowids follow indexing order, which is
+    what bounds the ranking to recent matches (see search).
+    """
+
+    def __init__(self, path: str, max_candidates: int = 2000):
+        self.path = path
+        self.max_candidates = max_candidates
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One connection per process, shared by its threads under the lock.
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                             check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._pid = os.getpid()
+            yield self._conn
+
+    def add_entries(self, entries: Iterable[Dict]):
+        """
+        Index (or re-index) entries in one transaction. Entries are dicts with an
+        "id" and optionally user_id, created_at, transcription and events_tagged.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for entry in entries:
+                    created_at = entry.get("created_at")
+                    if isinstance(created_at, datetime):
+                        created_at = created_at.isoformat()
+                    row = conn.execute(
+                        "SELECT rowid FROM docs WHERE entry_id = ?", (entry["id"],)
+                    ).fetchone()
+                    if row is not None:
+                        # Re-indexed entries keep their rowid, and so their place in recency order
+                        rowid = row[0]
+                        conn.execute("DELETE FROM entries_fts WHERE rowid = ?", (rowid,))
+                        conn.execute("UPDATE docs SET created_at = COALESCE(?, created_at) WHERE rowid = ?",
+                                     (created_at, rowid))
+                    else:
+                        rowid = conn.execute(
+                            "INSERT INTO docs (entry_id, created_at) VALUES (?, ?)",
+                            (entry["id"], created_at),
+                        ).lastrowid
+                    conn.execute(
+                        "INSERT INTO entries_fts (rowid, transcription, events, user) VALUES (?, ?, ?, ?)",
+                        (rowid, entry.get("transcription") or "", events_text(entry.get("events_tagged")),
+                         _user_token(entry.get("user_id"))),
+                    )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def remove(self, entry_id: str):
+        """ Drop an entry from the index. """
+        with self._connect() as conn:
+            row = conn.execute("SELECT rowid FROM docs WHERE entry_id = ?", (entry_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM entries_fts WHERE rowid = ?", (row[0],))
+                conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        # FTS5 rebuilds a prefix's merged match list on every lookup, which makes
+        # ranking and snippets of prefix queries slow; plain terms can seek.
+        # Prefixes of more than MAX_PREFIX_TERMS terms are left to FTS5 (an empty
+        # list), rather than searching for only some of their terms.
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT term FROM entries_vocab WHERE term >= ? AND term < ? LIMIT ?",
+                (prefix, prefix + "\U0010ffff", MAX_PREFIX_TERMS + 1),
+            ).fetchall()
+        if len(rows) > MAX_PREFIX_TERMS:
+            return []
+        return [term for term, in rows if not _USER_TOKEN_RE.match(term)]
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               user_id: Optional[str] = None, snippet_tokens: int = 16) -> Dict:
+        """
+        Entries matching query (see to_fts_query), best BM25 match first.
+
+        Scoring every match of a common word costs a few microseconds per entry,
+        so only the max_candidates most recently indexed matches are ranked (the
+        cutoff is found by walking the match list in rowid order, which needs no
+        scoring). Snippets are only built for the returned page.
+
+        Returns:
+            dict: "results" (id, created_at, score and an HTML-escaped snippet
+            with the matches wrapped in <mark>), "next_offset" (None on the
+            last page), "truncated" (whether older matches were left out of the
+            ranking) and "cutoff_created_at" (created_at of the oldest ranked
+            match when truncated, else None). Raises InvalidQueryError for
+            queries without terms.
+        """
+        match = "{transcription events} : (" + to_fts_query(query, self._expand_prefix) + ")"
+        if user_id is not None:
+            match = f'({match}) AND user : "{_user_token(user_id)}"'
+        with self._connect() as conn:
+            # The max_candidates-th newest match, and whether any older one exists
+            bounds = conn.execute(
+                "SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?"
+                " ORDER BY rowid DESC LIMIT 2 OFFSET ?",
+                (match, self.max_candidates - 1),
+            ).fetchall()
+            cutoff = bounds[0] if bounds else None
+            truncated = len(bounds) > 1
+            cutoff_created_at = conn.execute(
+                "SELECT created_at FROM docs WHERE rowid = ?", (cutoff[0],)
+            ).fetchone()[0] if truncated else None
+            # An explicit bm25() sorted by SQLite honours the rowid bound; FTS5's own
+            # ORDER BY rank path is about twice as slow here.
+            ranked = conn.execute(
+                "SELECT rowid, bm25(entries_fts, ?, ?, 0) AS score FROM entries_fts"
+                " WHERE entries_fts MATCH ? AND rowid >= ? ORDER BY score LIMIT ? OFFSET ?",
+                (TRANSCRIPTION_WEIGHT, EVENTS_WEIGHT, match, cutoff[0] if cutoff else 0,
+                 limit + 1, offset),
+            ).fetchall()
+            page = ranked[:limit]
+            rowids = [rowid for rowid, _ in page]
+            placeholders = ",".join("?" * len(rowids))
+            snippets = dict(conn.execute(
+                f"SELECT rowid, snippet(entries_fts, -1, ?, ?, '…', ?) FROM entries_fts"
+                f" WHERE entries_fts MATCH ? AND rowid IN ({placeholders})",
+                [_MARK_START, _MARK_END, snippet_tokens, match, *rowids],
+            ).fetchall()) if rowids else {}
+            docs = {rowid: (entry_id, created_at) for rowid, entry_id, created_at in conn.execute(
+                f"SELECT rowid, entry_id, created_at FROM docs WHERE rowid IN ({placeholders})", rowids
+            ).fetchall()} if rowids else {}
+
+        results = [{
+            "id": docs[rowid][0],
+            "created_at": docs[rowid][1],
+            # bm25() is lower for better matches; report higher-is-better
+            "score": -score,
+            "snippet": _highlight(snippets.get(rowid, "")),
+        } for rowid, score in page if rowid in docs]
+        return {
+            "results": results,
+            "next_offset": offset + limit if len(ranked) > limit else None,
+            "truncated": truncated,
+            "cutoff_created_at": cutoff_created_at,
+        }
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def rebuild(self, storage, batch_size: int = 1000) -> int:
+        """ Drop the index and re-index every stored entry. Returns the number indexed. """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries_fts")
+            conn.execute("DELETE FROM docs")
+        fields = {"user_id", "created_at", "transcription", "events_tagged"}
+        batch, total = [], 0
+        for entry in storage.iter_entries(fields=fields):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                self.add_entries(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self.add_entries(batch)
+            total += len(batch)
+        with self._connect() as conn:
+            conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('optimize')")
+        return total
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+def get_search_index() -> SearchIndex:
+    """ The process-wide search index in config.SEARCH_INDEX_PATH. """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex(config.SEARCH_INDEX_PATH, config.SEARCH_MAX_CANDIDATES)
+    return _index
+
+def index_entries(entries: Iterable[Dict]):
+    """
+    Add saved entries to the search index. Failures are logged rather than
+    raised: the entries are already stored, and rebuild can catch the index up.
+    """
+    try:
+        get_search_index().add_entries(entries)
+    except Exception as e:
+        print(f"Search index error: {e}")
+
+# Re-create the index from storage: python -m app.services.search rebuild
+if __name__ == "__main__":
+    import argparse
+    from ..storage import get_storage
+
+    parser = argparse.ArgumentParser(description="Maintain the full-text search index.")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    print(f"Indexed {get_search_index().rebuild(get_storage())} entries")
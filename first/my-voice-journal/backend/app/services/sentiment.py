@@ -0,0 +1,191 @@
+# backend/app/services/sentiment.py
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from .. import config
+from .registry import registry
+
+# Default lexicon: word -> weight
+POSITIVE_WORDS = {"good", "great", "happy", "excellent", "fortunate", "correct", "superior"}
+NEGATIVE_WORDS = {"bad", "terrible", "sad", "poor", "unfortunate", "wrong", "inferior"}
+DEFAULT_LEXICON = {**{w: 1.0 for w in POSITIVE_WORDS}, **{w: -1.0 for w in NEGATIVE_WORDS}}
+
+NEGATIONS = {"not", "no", "never", "nothing", "nobody", "none", "neither", "nor", "cannot", "without"}
+
+# Words (letters, with inner apostrophes such as "don't") and the clause punctuation
+# that ends a negation's scope. Digits and other symbols are skipped, like the
+# alphabetic-token filter this replaces.
+_TOKEN_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*|[,;:]")
+# Sentence boundaries: runs of terminal punctuation followed by whitespace, or line breaks
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|$)|[.!?]+", re.MULTILINE)
+# Joins the sentences of a batch (see score_many); matched as a token of its own
+_SENTENCE_SEPARATOR = "\x00"
+_SEPARATED_TOKEN_RE = re.compile(_TOKEN_RE.pattern + "|" + _SENTENCE_SEPARATOR)
+
+@dataclass
+class SentimentResult:
+    """
+    - score: Lexicon score of the whole text, normalized by its number of words.
+    - sentence_scores: The same score for each sentence, in order (0.0 for a
+      sentence without words).
+    """
+    score: float = 0.0
+    sentence_scores: List[float] = field(default_factory=list)
+
+def load_lexicon(path: str) -> Dict[str, float]:
+    """
+    Load a lexicon from a JSON object ({"word": weight}) or a text file with one
+    "word<whitespace>weight" entry per line (extra columns, as in the VADER lexicon,
+    and lines starting with # are ignored).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return {word.lower(): float(weight) for word, weight in json.load(f).items()}
+        lexicon = {}
+        for line in f:
+            parts = line.split()
+            if len(parts) < 2 or parts[0].startswith("#"):
+                continue
+            try:
+                lexicon[parts[0].lower()] = float(parts[1])
+            except ValueError:
+                continue
+        return lexicon
+
+class SentimentAnalyzer:
+    """
+    Lexicon-based sentiment on a regex tokenizer (no spaCy pipeline).
+
+    Each word found in the lexicon contributes its weight; a negation word (or a
+    "n't" contraction) multiplies the weight of lexicon words in the next
+    negation_window words by negation_weight, until the next clause punctuation.
+    Scores are the summed weights divided by the number of words.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None,
+                 negations: Iterable[str] = NEGATIONS,
+                 negation_window: int = 3, negation_weight: float = -1.0):
+        self.lexicon = dict(DEFAULT_LEXICON if lexicon is None else lexicon)
+        self.negations = set(negations)
+        self.negation_window = negation_window
+        self.negation_weight = negation_weight
+
+    def _is_negation(self, token: str) -> bool:
+        return token in self.negations or token.endswith("n't") or token.endswith("n’t")
+
+    def _token_totals(self, tokens: List[str]) -> List[Tuple[float, int]]:
+        """
+        (summed weight, word count) of each sentence in lowercased tokens, where
+        sentences are separated by _SENTENCE_SEPARATOR tokens. Each distinct token
+        is looked up in the lexicon and checked for negation once.
+        """
+        lexicon = self.lexicon
+        info = {token: (lexicon.get(token, 0.0), self._is_negation(token)) for token in set(tokens)}
+        window, negation_weight = self.negation_window, self.negation_weight
+        totals = []
+        total, words, negated = 0.0, 0, 0
+        for token in tokens:
+            if token in ",;:":
+                negated = 0
+                continue
+            if token == _SENTENCE_SEPARATOR:
+                totals.append((total, words))
+                total, words, negated = 0.0, 0, 0
+                continue
+            words += 1
+            weight, negation = info[token]
+            if weight:
+                total += weight * negation_weight if negated else weight
+            if negation:
+                negated = window
+            elif negated:
+                negated -= 1
+        totals.append((total, words))
+        return totals
+
+    def score(self, text: str) -> SentimentResult:
+        """ Score text as a whole and sentence by sentence, splitting sentences with a regex. """
+        return self.score_many([text])[0]
+
+    def score_spans(self, text: str, spans: Iterable[Tuple[int, int]]) -> SentimentResult:
+        """
+        Score text over the given (start, end) sentence spans, such as the sentences
+        of a spaCy Doc. Every span gets a score (0.0 if it has no words), so
+        sentence_scores[i] belongs to sentence i.
+        """
+        return self.score_many([text], [spans])[0]
+
+    def score_many(self, texts: Iterable[str],
+                   spans: Optional[Iterable[Iterable[Tuple[int, int]]]] = None) -> List[SentimentResult]:
+        """
+        score for many texts, or score_spans when the sentence spans of each text
+        are given. The sentences of all texts are lowercased and tokenized in one
+        regex pass, and each distinct word is scored once for the whole batch.
+        """
+        texts = list(texts)
+        if spans is None:
+            spans = ([match.span() for match in _SENTENCE_RE.finditer(text)] for text in texts)
+        sentences, counts = [], []
+        for text, text_spans in zip(texts, spans):
+            count = len(sentences)
+            sentences.extend(text[start:end] for start, end in text_spans)
+            counts.append(len(sentences) - count)
+
+        # The separator is neither cased nor case-ignorable, so each sentence
+        # lowercases as it would on its own
+        joined = _SENTENCE_SEPARATOR.join(sentences)
+        if joined.count(_SENTENCE_SEPARATOR) < len(sentences):
+            tokens = _SEPARATED_TOKEN_RE.findall(joined.lower())
+        else:
+            # A sentence contains the separator itself (or there are none)
+            tokens = []
+            for i, sentence in enumerate(sentences):
+                if i:
+                    tokens.append(_SENTENCE_SEPARATOR)
+                tokens.extend(_TOKEN_RE.findall(sentence.lower()))
+        totals = self._token_totals(tokens)
+
+        results, start = [], 0
+        for count in counts:
+            results.append(self._result(totals[start:start + count]))
+            start += count
+        return results
+
+    @staticmethod
+    def _result(totals: Iterable[Tuple[float, int]]) -> SentimentResult:
+        """ Text and sentence scores from the (summed weight, word count) of each sentence. """
+        total, words = 0.0, 0
+        sentence_scores = []
+        for sentence_total, sentence_words in totals:
+            sentence_scores.append(sentence_total / sentence_words if sentence_words else 0.0)
+            total += sentence_total
+            words += sentence_words
+        return SentimentResult(
+            score=total / words if words > 0 else 0.0,
+            sentence_scores=sentence_scores,
+        )
+
+    def version(self) -> str:
+        """ A short hash of the lexicon and negation settings, for cache keys. """
+        settings = [sorted(self.lexicon.items()), sorted(self.negations),
+                    self.negation_window, self.negation_weight]
+        return hashlib.sha1(json.dumps(settings).encode("utf-8")).hexdigest()[:12]
+
+def _load_analyzer() -> SentimentAnalyzer:
+    lexicon = load_lexicon(config.SENTIMENT_LEXICON_PATH) if config.SENTIMENT_LEXICON_PATH else None
+    return SentimentAnalyzer(
+        lexicon,
+        negation_window=config.SENTIMENT_NEGATION_WINDOW,
+        negation_weight=config.SENTIMENT_NEGATION_WEIGHT,
+    )
+
+registry.register("sentiment", _load_analyzer)
+
+def get_analyzer() -> SentimentAnalyzer:
+    """ The shared analyzer with the configured lexicon, loaded on first use. """
+    return registry.get("sentiment")
+
+def score_text(text: str) -> SentimentResult:
+    return get_analyzer().score(text)
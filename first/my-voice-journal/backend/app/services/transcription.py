@@ -1,91 +1,389 @@
+import hashlib
+import itertools
 import os
-from google.cloud import speech
-from google.oauth2 import service_account
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from .. import config
+from .audio import AudioInfo, PcmAudio, load_pcm, probe_audio, probe_duration, split_pcm
+from .metrics import timed
 
-def transcribe_audio(audio_path):
-    try:
-        # Debug print
-        print(f"\n=== Starting Transcription Process ===")
-        print(f"Input file: {audio_path}")
-        
-        # Check file
-        if not os.path.exists(audio_path):
-            raise FileNotFoundError(f"Audio file not found: {audio_path}")
-        
-        file_size = os.path.getsize(audio_path)
-        print(f"File size: {file_size} bytes")
-        
-        if file_size == 0:
-            raise ValueError("Audio file is empty")
+@dataclass
+class Transcript:
+    """ The result of transcribing one recording. """
+    text: str
+    confidence: Optional[float] = None
+    # Word timings: {"word": str, "start": seconds, "end": seconds}
+    words: List[Dict] = field(default_factory=list)
+
+class Transcriber(ABC):
+    """
+    A speech-to-text backend. Implementations are created once and shared by all
+    pipeline workers, so their methods must be safe to call from several threads.
+
+    Backends implement transcribe_file(). Those that can also transcribe raw PCM
+    derive from PcmTranscriber instead, which adds the long-audio mode.
+    """
+    name = "base"
+
+    def config_key(self) -> str:
+        """ A string that identifies this backend and its settings. """
+        return self.name
+
+    def transcribe(self, audio_path: str) -> Transcript:
+        """ Transcribe the recording at audio_path. Raises on failure. """
+        return self.transcribe_file(audio_path)
+
+    @abstractmethod
+    def transcribe_file(self, audio_path: str) -> Transcript:
+        """ Transcribe a whole file in one request. """
+
+class PcmTranscriber(Transcriber):
+    """
+    A backend that can also transcribe raw PCM (transcribe_pcm), which gives it
+    the long-audio mode for free: recordings longer than
+    LONG_AUDIO_THRESHOLD_SECONDS are split and transcribed segment by segment.
+    """
+
+    def transcribe(self, audio_path: str) -> Transcript:
+        threshold = config.LONG_AUDIO_THRESHOLD_SECONDS
+        if threshold > 0:
+            duration = probe_duration(audio_path)
+            if duration is not None and duration > threshold:
+                pcm = load_pcm(audio_path)
+                if pcm is not None:
+                    print(f"Long recording ({duration:.1f}s), transcribing in segments")
+                    return transcribe_long_audio(self, pcm)
+        return super().transcribe(audio_path)
+
+    @abstractmethod
+    def transcribe_pcm(self, data: bytes, sample_rate: int) -> Transcript:
+        """ Transcribe mono 16-bit PCM. Word times are relative to the start of data. """
+
+_segment_pool: Optional[ThreadPoolExecutor] = None
+_segment_pool_lock = threading.Lock()
+
+def _get_segment_pool() -> ThreadPoolExecutor:
+    # One pool for the whole process, so the number of in-flight segment
+    # requests stays bounded no matter how many uploads are processed at once.
+    global _segment_pool
+    with _segment_pool_lock:
+        if _segment_pool is None:
+            _segment_pool = ThreadPoolExecutor(
+                max_workers=max(1, config.LONG_AUDIO_MAX_PARALLEL),
+                thread_name_prefix="stt-segment",
+            )
+        return _segment_pool
+
+def transcribe_long_audio(transcriber: PcmTranscriber, pcm: PcmAudio) -> Transcript:
+    """
+    Split the audio near silence, transcribe the segments concurrently and stitch
+    the results back together in order, shifting each segment's word times by the
+    segment's start offset.
+    """
+    segments = split_pcm(
+        pcm,
+        segment_seconds=config.LONG_AUDIO_SEGMENT_SECONDS,
+        search_seconds=config.LONG_AUDIO_SEARCH_SECONDS,
+    )
+    print(f"Transcribing {len(segments)} segments of {pcm.duration:.1f}s of audio")
+    pool = _get_segment_pool()
+    futures = [pool.submit(transcriber.transcribe_pcm, seg.data, seg.sample_rate) for seg in segments]
+
+    texts = []
+    words = []
+    confidences = []
+    for seg, future in zip(segments, futures):
+        part = future.result()
+        if part.text:
+            texts.append(part.text)
+        if part.confidence is not None:
+            confidences.append(part.confidence)
+        for word in part.words:
+            words.append({**word, "start": word["start"] + seg.start, "end": word["end"] + seg.start})
+
+    return Transcript(
+        text=" ".join(texts),
+        confidence=sum(confidences) / len(confidences) if confidences else None,
+        words=words,
+    )
+
+# (codec, container) -> Speech-to-Text encoding name; None matches any container
+_RECOGNITION_ENCODINGS = {
+    ("pcm_s16le", None): "LINEAR16",
+    ("flac", None): "FLAC",
+    ("pcm_mulaw", None): "MULAW",
+    ("amr_nb", None): "AMR",
+    ("amr_wb", None): "AMR_WB",
+    ("mp3", None): "MP3",
+    ("opus", "webm"): "WEBM_OPUS",
+    ("opus", "ogg"): "OGG_OPUS",
+}
+
+def recognition_encoding(info: Optional[AudioInfo]) -> Optional[str]:
+    """ The Speech-to-Text AudioEncoding name for a probed recording, or None if unsupported. """
+    if info is None:
+        return None
+    return (_RECOGNITION_ENCODINGS.get((info.codec, info.container))
+            or _RECOGNITION_ENCODINGS.get((info.codec, None)))
+
+# What browsers record into, assumed from the extension when the header can't be
+# probed (ffprobe missing) so the request still names an encoding
+_EXTENSION_AUDIO = {
+    ".webm": AudioInfo(codec="opus", container="webm", sample_rate=48000, channels=None, duration=None),
+    ".ogg": AudioInfo(codec="opus", container="ogg", sample_rate=48000, channels=None, duration=None),
+}
+
+class GoogleTranscriber(PcmTranscriber):
+    """
+    Google Cloud Speech-to-Text backend.
+
+    Credentials are loaded once and a small pool of long-lived SpeechClient
+    instances is reused for every request, so uploads do not pay for a new
+    channel and TLS handshake. The clients are thread-safe; the pool just
+    spreads requests over several channels when pool_size > 1.
+    """
+    name = "google"
+
+    def __init__(self, credentials_path: str, pool_size: int = 1, language_code: str = "en-US"):
+        self.credentials_path = credentials_path
+        self.pool_size = max(1, pool_size)
+        self.language_code = language_code
+        self._clients = None
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def config_key(self) -> str:
+        return f"{self.name}:{self.language_code}"
+
+    def _next_client(self):
+        with self._lock:
+            if self._clients is None:
+                from google.cloud import speech
+                from google.oauth2 import service_account
+
+                print(f"Looking for credentials at: {self.credentials_path}")
+                if not os.path.exists(self.credentials_path):
+                    raise FileNotFoundError(f"Credentials not found at {self.credentials_path}")
+
+                print(f"Initializing {self.pool_size} Speech-to-Text client(s)...")
+                credentials = service_account.Credentials.from_service_account_file(self.credentials_path)
+                self._clients = [speech.SpeechClient(credentials=credentials) for _ in range(self.pool_size)]
+                self._cycle = itertools.cycle(self._clients)
+            return next(self._cycle)
+
+    def warm_up(self):
+        """ Create the client pool ahead of the first request. """
+        self._next_client()
+
+    def recognition_config(self, audio_path: str):
+        """
+        A RecognitionConfig matching what the file header says it contains, or
+        what its extension implies for WebM/Ogg recordings that can't be probed.
+        """
+        from google.cloud import speech
+
+        info = probe_audio(audio_path) or _EXTENSION_AUDIO.get(os.path.splitext(audio_path)[1].lower())
+        encoding_name = recognition_encoding(info)
+        encoding = getattr(speech.RecognitionConfig.AudioEncoding, encoding_name or "", None)
+        settings = {
+            "language_code": self.language_code,
+            "enable_automatic_punctuation": True,
+            "enable_word_time_offsets": True,
+        }
+        if encoding is None:
+            # Let the service read the header (works for WAV and FLAC)
+            print(f"Unrecognized audio format {info}, letting the API detect it")
+            return speech.RecognitionConfig(**settings)
+        if info.sample_rate:
+            settings["sample_rate_hertz"] = info.sample_rate
+        if info.channels:
+            settings["audio_channel_count"] = info.channels
+        return speech.RecognitionConfig(encoding=encoding, **settings)
 
-        # Get credentials
-        script_dir = os.path.dirname(os.path.realpath(__file__))
-        cred_path = os.path.join(script_dir, "..", "..", "google_speech_credentials.json")
-        print(f"Looking for credentials at: {cred_path}")
-        
-        if not os.path.exists(cred_path):
-            raise FileNotFoundError(f"Credentials not found at {cred_path}")
+    def transcribe_file(self, audio_path: str) -> Transcript:
+        from google.cloud import speech
 
-        # Initialize client
-        print("Initializing Speech-to-Text client...")
-        credentials = service_account.Credentials.from_service_account_file(cred_path)
-        client = speech.SpeechClient(credentials=credentials)
+        client = self._next_client()
 
         # Read audio content
-        print("Reading audio file...")
         with open(audio_path, "rb") as audio_file:
             content = audio_file.read()
         print(f"Read {len(content)} bytes from audio file")
 
-        # Create recognition audio
-        print("Creating RecognitionAudio object...")
         audio = speech.RecognitionAudio(content=content)
-        
-        # Configure recognition based on file type
-        if audio_path.lower().endswith('.webm'):
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-                sample_rate_hertz=48000,
-                language_code="en-US",
-                enable_automatic_punctuation=True,
-                audio_channel_count=1,
-            )
-        else:  # For WAV files
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=16000,  # Standard rate for WAV files
-                language_code="en-US",
-                enable_automatic_punctuation=True,
-                audio_channel_count=1,
-                enable_word_time_offsets=True,
-            )
-
+        config = self.recognition_config(audio_path)
         print(f"Using config: {config}")
 
         # Make API call
         print("\nSending request to Google Speech-to-Text API...")
         response = client.recognize(config=config, audio=audio)
         print("Received response from API")
-        
-        # Process results
+        return self._transcript_from_response(response)
+
+    def transcribe_pcm(self, data: bytes, sample_rate: int) -> Transcript:
+        from google.cloud import speech
+
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=self.language_code,
+            enable_automatic_punctuation=True,
+            audio_channel_count=1,
+            enable_word_time_offsets=True,
+        )
+        response = self._next_client().recognize(config=config, audio=speech.RecognitionAudio(content=data))
+        return self._transcript_from_response(response)
+
+    @staticmethod
+    def _transcript_from_response(response) -> Transcript:
+        """ Join the top alternative of every result (not just the first one). """
         if not response.results:
             print("No transcription results received")
+            return Transcript(text="")
+
+        texts = []
+        confidences = []
+        words = []
+        for result in response.results:
+            if not result.alternatives:
+                continue
+            alternative = result.alternatives[0]
+            if alternative.transcript.strip():
+                texts.append(alternative.transcript.strip())
+            confidences.append(alternative.confidence)
+            for info in alternative.words:
+                words.append({
+                    "word": info.word,
+                    "start": info.start_time.total_seconds(),
+                    "end": info.end_time.total_seconds(),
+                })
+        return Transcript(
+            text=" ".join(texts),
+            confidence=sum(confidences) / len(confidences) if confidences else None,
+            words=words,
+        )
+
+# A few journal-style sentences the fake backend stitches transcripts from.
+FAKE_SENTENCES = [
+    "I went for a run in the park this morning.",
+    "My sister called me about the trip to Chicago next week.",
+    "Work was stressful because the project deadline moved up.",
+    "We had dinner at the new Italian place downtown.",
+    "I felt happy after talking with my friend Sam.",
+    "The meeting with my manager went better than expected.",
+    "I was sad that the concert got cancelled.",
+    "Tomorrow I need to finish the report for the client.",
+    "I cooked pasta and watched a movie with Alex.",
+    "The weather in Boston was terrible today.",
+    "I finally fixed the bug that was blocking the release.",
+    "We walked the dog along the river after lunch.",
+]
+
+class FakeTranscriber(PcmTranscriber):
+    """
+    Offline stand-in for benchmarking and local development.
+
+    The transcript is chosen deterministically from the SHA-256 of the file
+    contents, so the same recording always yields the same text and the pipeline
+    can be exercised without network access or credentials. An optional latency
+    simulates the round trip to a real STT service.
+    """
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, sentences: Optional[List[str]] = None):
+        self.latency = latency
+        self.sentences = sentences or FAKE_SENTENCES
+
+    def transcribe_file(self, audio_path: str) -> Transcript:
+        hasher = hashlib.sha256()
+        with open(audio_path, "rb") as audio_file:
+            for chunk in iter(lambda: audio_file.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        return self._from_digest(hasher.digest())
+
+    def transcribe_pcm(self, data: bytes, sample_rate: int) -> Transcript:
+        return self._from_digest(hashlib.sha256(data).digest())
+
+    def _from_digest(self, digest: bytes) -> Transcript:
+        count = 2 + digest[0] % 4
+        chosen = [self.sentences[b % len(self.sentences)] for b in digest[1:1 + count]]
+        if self.latency:
+            time.sleep(self.latency)
+
+        words = []
+        clock = 0.0
+        for word in " ".join(chosen).split():
+            words.append({"word": word, "start": clock, "end": clock + 0.4})
+            clock += 0.5
+        return Transcript(text=" ".join(chosen), confidence=1.0, words=words)
+
+def create_transcriber(backend: str) -> Transcriber:
+    """ Build the transcriber named by backend ("google" or "fake"). """
+    if backend == "fake":
+        return FakeTranscriber(latency=config.FAKE_TRANSCRIBER_LATENCY)
+    if backend == "google":
+        return GoogleTranscriber(
+            config.GOOGLE_CREDENTIALS_PATH,
+            pool_size=config.TRANSCRIBER_POOL_SIZE,
+            language_code=config.TRANSCRIBER_LANGUAGE,
+        )
+    raise ValueError(f"Unknown transcriber backend: {backend}")
+
+_transcriber: Optional[Transcriber] = None
+_transcriber_lock = threading.Lock()
+
+def get_transcriber() -> Transcriber:
+    """ Returns the process-wide transcriber, creating it on first use. """
+    global _transcriber
+    if _transcriber is None:
+        with _transcriber_lock:
+            if _transcriber is None:
+                _transcriber = create_transcriber(config.TRANSCRIBER_BACKEND)
+    return _transcriber
+
+def set_transcriber(transcriber: Optional[Transcriber]):
+    """ Replace the process-wide transcriber (e.g. with a FakeTranscriber in benchmarks). """
+    global _transcriber
+    with _transcriber_lock:
+        _transcriber = transcriber
+
+def transcribe_audio(audio_path):
+    try:
+        # Debug print
+        print(f"\n=== Starting Transcription Process ===")
+        print(f"Input file: {audio_path}")
+
+        # Check file
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+        file_size = os.path.getsize(audio_path)
+        print(f"File size: {file_size} bytes")
+
+        if file_size == 0:
+            raise ValueError("Audio file is empty")
+
+        with timed("stt"):
+            transcript = get_transcriber().transcribe(audio_path)
+        if not transcript.text:
             return "No transcription available"
-            
-        transcript = response.results[0].alternatives[0].transcript
-        confidence = response.results[0].alternatives[0].confidence
-        
+
         print(f"\nTranscription successful!")
-        print(f"Confidence: {confidence}")
-        print(f"Transcript: {transcript}")
-        
-        return transcript
+        print(f"Confidence: {transcript.confidence}")
+        print(f"Transcript: {transcript.text}")
+
+        return transcript.text
 
     except Exception as e:
         print(f"\n❌ Error in transcribe_audio: {str(e)}")
         return f"Transcription error: {str(e)}"
 
 # **Run the function with a sample audio file**
+# (python -m app.services.transcription from the backend directory)
 if __name__ == "__main__":
     # Adjust the path based on your project structure
     script_dir = os.path.dirname(os.path.realpath(__file__))  # backend/app/services
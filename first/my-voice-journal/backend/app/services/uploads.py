@@ -0,0 +1,115 @@
+# backend/app/services/uploads.py
+import hashlib
+import os
+import uuid
+import zipfile
+from dataclasses import dataclass
+from typing import List, Tuple, Union
+from starlette.concurrency import run_in_threadpool
+
+class UploadTooLargeError(Exception):
+    """ Raised when an upload exceeds the configured maximum size. """
+
+class EmptyUploadError(ValueError):
+    """ Raised when an upload contains no data. """
+
+# Archive members with other extensions (and directories) are skipped.
+AUDIO_EXTENSIONS = {"wav", "flac", "mp3", "m4a", "aac", "ogg", "oga", "opus", "webm", "amr", "3gp"}
+
+@dataclass
+class StoredUpload:
+    """ A recording that was streamed to disk. """
+    path: str
+    sha256: str
+    size: int
+
+async def save_upload(file, dest_dir: str, extension: str,
+                      chunk_size: int = 1024 * 1024, max_bytes: int = 0) -> StoredUpload:
+    """
+    Stream an UploadFile to dest_dir in chunk_size pieces, hashing and counting the
+    bytes on the way. Only one chunk is held in memory at a time.
+
+    The data is written to a temporary file that is renamed into place once complete,
+    so readers never see a partial recording. If max_bytes is set and the upload grows
+    beyond it, the partial file is removed and UploadTooLargeError is raised.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    file_name = f"{uuid.uuid4()}.{extension}"
+    final_path = os.path.join(dest_dir, file_name)
+    tmp_path = final_path + ".part"
+
+    out = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds the maximum size of {max_bytes} bytes")
+            hasher.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+        await run_in_threadpool(out.close)
+
+        if size == 0:
+            raise EmptyUploadError("Received empty file")
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        out.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return StoredUpload(path=final_path, sha256=hasher.hexdigest(), size=size)
+
+def _extension(file_name: str) -> str:
+    return os.path.splitext(file_name)[1].lstrip(".").lower()
+
+def extract_audio_archive(zip_path: str, dest_dir: str, chunk_size: int = 1024 * 1024,
+                          max_bytes: int = 0,
+                          max_files: int = 0) -> List[Tuple[str, Union[StoredUpload, Exception]]]:
+    """
+    Extract the audio files of a zip archive to dest_dir, streaming and hashing
+    each member like save_upload. Members are checked against max_bytes while
+    they are decompressed, so a small archive cannot expand without bound.
+
+    Returns (member name, StoredUpload) pairs, or (member name, exception) for
+    members that could not be extracted. Raises zipfile.BadZipFile if the
+    archive is not a zip file, and UploadTooLargeError if it holds more than
+    max_files audio files.
+    """
+    results = []
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not os.path.basename(info.filename).startswith(".")
+            and not info.filename.startswith("__MACOSX/")
+            and _extension(info.filename) in AUDIO_EXTENSIONS
+        ]
+        if max_files and len(members) > max_files:
+            raise UploadTooLargeError(f"Archive holds more than {max_files} audio files")
+        for info in members:
+            final_path = os.path.join(dest_dir, f"{uuid.uuid4()}.{_extension(info.filename)}")
+            tmp_path = final_path + ".part"
+            hasher = hashlib.sha256()
+            size = 0
+            try:
+                with archive.open(info) as src, open(tmp_path, "wb") as out:
+                    for chunk in iter(lambda: src.read(chunk_size), b""):
+                        size += len(chunk)
+                        if max_bytes and size > max_bytes:
+                            raise UploadTooLargeError(
+                                f"File exceeds the maximum size of {max_bytes} bytes")
+                        hasher.update(chunk)
+                        out.write(chunk)
+                if size == 0:
+                    raise EmptyUploadError("Empty file")
+                os.replace(tmp_path, final_path)
+                results.append((info.filename, StoredUpload(final_path, hasher.hexdigest(), size)))
+            except Exception as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                results.append((info.filename, e))
+    return results
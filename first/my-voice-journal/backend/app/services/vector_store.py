@@ -0,0 +1,560 @@
+# backend/app/services/vector_store.py
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+from .. import config
+from .event_linking import canonical_event, encode_canonicals, get_embedding_model, np
+from .events import Event, decode_events
+
+KINDS = ("event", "transcript")
+
+# Stored transcriptions that are placeholders rather than speech
+_PLACEHOLDERS = ("No transcription available", "Transcription error:")
+
+# Rows scored per step of an exact search; bounds the float32 working copy.
+CHUNK_ROWS = 8192
+
+# A worker's claim on building the ANN index expires after this many seconds
+# (so a worker that died while building doesn't block the next build forever).
+ANN_BUILD_TIMEOUT = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    row INTEGER PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    entry_id TEXT NOT NULL,
+    user_id TEXT,
+    label TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_vectors_entry ON vectors (entry_id);
+CREATE TABLE IF NOT EXISTS ann_index (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    lists INTEGER NOT NULL,
+    building_since REAL
+);
+"""
+
+class VectorStoreUnavailableError(RuntimeError):
+    """ Raised when embeddings cannot be computed (numpy or the model is missing). """
+
+class VectorStore:
+    """
+    Unit-length embeddings of events and transcripts, for similarity search.
+
+    Vectors are stored as float16 rows in vectors.f16 and opened with np.memmap,
+    so every worker process maps the same page-cache pages instead of loading
+    its own copy. Row i of the file belongs to row i of the id table (a SQLite
+    database next to it) holding the kind, entry id, user and a label. Rows are
+    only appended; the table is the source of truth for how many are valid.
+
+    search scores every row with chunked dot products; converting float16 rows
+    costs about 2 microseconds per 384-d row, so past ann_min_rows rows an IVF
+    index (k-means centroids and the centroid of every row, see build_ann_index)
+    restricts scoring to the rows of the nprobe closest centroids. It is built
+    when the store reaches that size and rebuilt whenever it has doubled.
+
+    Every build is a new version of the index (the ann_index row), with its own
+    ann_centroids.<version>.npy and ann_assign.<version>.i32 files, so a worker
+    always pairs centroids and assignments of the same build and notices when
+    another worker has rebuilt the index.
+    """
+
+    def __init__(self, directory: str, dim: int, ann_min_rows: int = 20000, nprobe: int = 8):
+        if np is None:
+            raise VectorStoreUnavailableError("numpy is not installed")
+        self.directory = directory
+        self.dim = dim
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+        self._vectors_path = os.path.join(directory, "vectors.f16")
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        # Cached view of the store, refreshed when other workers append rows
+        self._rows = 0
+        self._mmap = None
+        self._kinds = np.zeros(0, dtype=np.int8)
+        self._users = np.zeros(0, dtype=np.int32)
+        self._user_codes: Dict[Optional[str], int] = {}
+        self._ann_version = 0
+        self._ann_trained = 0
+        self._centroids = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            stored_dim = conn.execute("PRAGMA user_version").fetchone()[0]
+            if stored_dim and stored_dim != dim:
+                raise ValueError(f"Vector store in {directory} has dimension {stored_dim}, not {dim}")
+            conn.execute(f"PRAGMA user_version = {int(dim)}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(
+                    os.path.join(self.directory, "ids.sqlite3"),
+                    timeout=30, isolation_level=None, check_same_thread=False,
+                )
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._pid = os.getpid()
+            yield self._conn
+
+    def add(self, entry_id: str, user_id: Optional[str], kinds: Sequence[str],
+            labels: Sequence[str], vectors) -> int:
+        """
+        Append vectors (an (N, dim) array of unit-length rows) for one entry, with
+        the kind and label of each row. Returns the number of rows written.
+        """
+        vectors = np.asarray(vectors, dtype=np.float16).reshape(-1, self.dim)
+        if not len(vectors):
+            return 0
+        row_bytes = self.dim * 2
+        with self._connect() as conn:
+            # The write lock orders appenders across processes. Bytes past the
+            # committed row count (from an interrupted append) are overwritten.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                start = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+                mode = "r+b" if os.path.exists(self._vectors_path) else "wb"
+                with open(self._vectors_path, mode) as f:
+                    f.seek(start * row_bytes)
+                    f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                conn.executemany(
+                    "INSERT INTO vectors (row, kind, entry_id, user_id, label) VALUES (?, ?, ?, ?, ?)",
+                    [(start + i, KINDS.index(kind), entry_id, user_id, label)
+                     for i, (kind, label) in enumerate(zip(kinds, labels))],
+                )
+                self._assign_rows(conn, start, vectors)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return len(vectors)
+
+    def _centroids_file(self, version: int) -> str:
+        return os.path.join(self.directory, f"ann_centroids.{version}.npy")
+
+    def _assign_file(self, version: int) -> str:
+        return os.path.join(self.directory, f"ann_assign.{version}.i32")
+
+    @staticmethod
+    def _index_state(conn):
+        """ (version, rows it was trained on) of the current ANN index; version 0 is none. """
+        row = conn.execute("SELECT version, rows FROM ann_index WHERE id = 0").fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def _assign_rows(self, conn, start: int, vectors):
+        # Keep the ANN index current for appended rows (caller holds the write lock)
+        version, _ = self._index_state(conn)
+        if not version:
+            return
+        if version == self._ann_version and self._centroids is not None:
+            centroids = self._centroids
+        else:
+            centroids = np.load(self._centroids_file(version))
+        assign_path = self._assign_file(version)
+        assigned = os.path.getsize(assign_path) // 4 if os.path.exists(assign_path) else 0
+        if assigned < start:
+            # Rows appended while the index was being built
+            gap = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(start, self.dim))
+            vectors = np.concatenate([gap[assigned:start], vectors])
+        elif assigned > start:
+            return
+        nearest = np.argmax(vectors.astype(np.float32) @ centroids.T, axis=1).astype(np.int32)
+        with open(assign_path, "ab") as f:
+            f.write(nearest.tobytes())
+
+    def _refresh(self):
+        """ Map rows (and their kinds and users) appended since the last call, and the current ANN index. """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+            version, trained = self._index_state(conn)
+            if rows == self._rows and version == self._ann_version:
+                return
+            if rows < self._rows:
+                # Cleared by another process
+                self._rows = 0
+            new = conn.execute(
+                "SELECT kind, user_id FROM vectors WHERE row >= ? ORDER BY row", (self._rows,)
+            ).fetchall() if rows > self._rows else []
+        if version != self._ann_version:
+            # Built (or cleared) by this or another worker
+            self._centroids = np.load(self._centroids_file(version)) if version else None
+            self._ann_version, self._ann_trained = version, trained
+        self._assign = np.zeros(0, dtype=np.int32)
+        if rows == 0:
+            self._rows, self._mmap = 0, None
+            return
+        if new:
+            kinds = np.fromiter((kind for kind, _ in new), dtype=np.int8, count=len(new))
+            users = np.fromiter(
+                (self._user_codes.setdefault(user_id, len(self._user_codes)) for _, user_id in new),
+                dtype=np.int32, count=len(new),
+            )
+            self._kinds = np.concatenate([self._kinds[:self._rows], kinds])
+            self._users = np.concatenate([self._users[:self._rows], users])
+        self._mmap = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(rows, self.dim))
+        assign_path = self._assign_file(version)
+        if self._centroids is not None and os.path.exists(assign_path):
+            assigned = min(rows, os.path.getsize(assign_path) // 4)
+            if assigned:
+                self._assign = np.memmap(assign_path, dtype=np.int32, mode="r", shape=(assigned,))
+        self._rows = rows
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._rows
+
+    def needs_ann_index(self) -> bool:
+        """ Whether the store is big enough for an ANN index and has none, or outgrew it. """
+        with self._lock:
+            self._refresh()
+            if self._rows < self.ann_min_rows:
+                return False
+            return self._centroids is None or self._rows >= 2 * self._ann_trained
+
+    def _candidates(self, query, mask):
+        """ Row numbers worth scoring: the ANN probe lists (plus unindexed rows), or None for all. """
+        if self._centroids is None or self._rows < self.ann_min_rows:
+            if mask is not None and mask.sum() * 2 < self._rows:
+                # Gathering a selective filter's rows is cheaper than converting all of them
+                return np.flatnonzero(mask)
+            return None
+        probes = np.argsort(-(self._centroids @ query))[:self.nprobe]
+        rows = np.flatnonzero(np.isin(self._assign, probes))
+        rows = np.concatenate([rows, np.arange(len(self._assign), self._rows)])
+        if mask is not None:
+            rows = rows[mask[rows]]
+        return rows
+
+    def search(self, query, k: int = 10, kind: Optional[str] = None,
+               user_id: Optional[str] = None, exclude_entry: Optional[str] = None) -> List[Dict]:
+        """
+        The k rows most similar to the unit-length query vector (cosine similarity),
+        optionally only of one kind and one user, leaving out the rows of
+        exclude_entry. Returns dicts with the entry_id, kind, label and score, best first.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._refresh()
+            if not self._rows:
+                return []
+            mask = None
+            if kind is not None:
+                mask = self._kinds == KINDS.index(kind)
+            if user_id is not None:
+                code = self._user_codes.get(user_id)
+                user_mask = self._users == code if code is not None else np.zeros(self._rows, dtype=bool)
+                mask = user_mask if mask is None else mask & user_mask
+            if exclude_entry is not None:
+                # Filtered out before ranking: an entry's own rows are usually its nearest
+                # neighbours, and dropping them from the top k would leave nothing
+                with self._connect() as conn:
+                    excluded = [row for row, in conn.execute(
+                        "SELECT row FROM vectors WHERE entry_id = ? AND row < ?", (exclude_entry, self._rows)
+                    )]
+                if excluded:
+                    if mask is None:
+                        mask = np.ones(self._rows, dtype=bool)
+                    mask[excluded] = False
+            candidates = self._candidates(query, mask)
+            vectors = self._mmap
+
+        best_rows, best_scores = [], []
+        if candidates is None:
+            for start in range(0, len(vectors), CHUNK_ROWS):
+                scores = vectors[start:start + CHUNK_ROWS].astype(np.float32) @ query
+                if mask is not None:
+                    scores[~mask[start:start + CHUNK_ROWS]] = -np.inf
+                top = _top_k(scores, k)
+                best_rows.append(top + start)
+                best_scores.append(scores[top])
+        else:
+            for start in range(0, len(candidates), CHUNK_ROWS):
+                rows = candidates[start:start + CHUNK_ROWS]
+                scores = vectors[rows].astype(np.float32) @ query
+                top = _top_k(scores, k)
+                best_rows.append(rows[top])
+                best_scores.append(scores[top])
+        if not best_rows:
+            return []
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        order = [i for i in np.argsort(-scores) if np.isfinite(scores[i])][:k]
+        if not order:
+            return []
+
+        row_ids = [int(rows[i]) for i in order]
+        with self._connect() as conn:
+            placeholders = ",".join("?" * len(row_ids))
+            meta = {row: (kind_code, entry_id, label) for row, kind_code, entry_id, label in conn.execute(
+                f"SELECT row, kind, entry_id, label FROM vectors WHERE row IN ({placeholders})", row_ids
+            ).fetchall()}
+        results = []
+        for i, row in zip(order, row_ids):
+            kind_code, entry_id, label = meta[row]
+            results.append({"entry_id": entry_id, "kind": KINDS[kind_code], "label": label,
+                            "score": float(scores[i])})
+        return results
+
+    def entry_vector(self, entry_id: str, kind: str = "transcript"):
+        """ The stored vector of an entry's transcript (or first event), or None. """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT row FROM vectors WHERE entry_id = ? AND kind = ? ORDER BY row LIMIT 1",
+                (entry_id, KINDS.index(kind)),
+            ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._refresh()
+            return np.asarray(self._mmap[row[0]], dtype=np.float32)
+
+    def build_ann_index(self, nlist: Optional[int] = None, sample_size: int = 50000,
+                        iterations: int = 10, seed: int = 0) -> int:
+        """
+        Train nlist k-means centroids (default sqrt(rows)) on a sample of the
+        vectors and record the nearest centroid of every row. Returns nlist.
+        """
+        with self._lock:
+            self._refresh()
+            rows, vectors = self._rows, self._mmap
+        if not rows:
+            return 0
+        nlist = nlist or max(1, int(np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(rows, size=min(rows, sample_size), replace=False))
+        data = vectors[sample].astype(np.float32)
+        centroids = data[rng.choice(len(data), size=min(nlist, len(data)), replace=False)]
+        for _ in range(iterations):
+            nearest = np.argmax(data @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = data[nearest == c]
+                if len(members):
+                    center = members.sum(axis=0)
+                    centroids[c] = center / (np.linalg.norm(center) or 1.0)
+
+        # Assign every row, chunk by chunk, then publish the files as a new version
+        tmp_assign = os.path.join(self.directory, f"ann_assign.{os.getpid()}.tmp")
+        with open(tmp_assign, "wb") as f:
+            for start in range(0, rows, CHUNK_ROWS):
+                chunk = vectors[start:start + CHUNK_ROWS].astype(np.float32)
+                f.write(np.argmax(chunk @ centroids.T, axis=1).astype(np.int32).tobytes())
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Rows appended meanwhile are left unassigned until the next add backfills them
+                version = self._index_state(conn)[0] + 1
+                tmp_centroids = os.path.join(self.directory, f"ann_centroids.{os.getpid()}.tmp.npy")
+                np.save(tmp_centroids, centroids)
+                os.replace(tmp_centroids, self._centroids_file(version))
+                os.replace(tmp_assign, self._assign_file(version))
+                conn.execute(
+                    "INSERT INTO ann_index (id, version, rows, lists, building_since) VALUES (0, ?, ?, ?, NULL)"
+                    " ON CONFLICT (id) DO UPDATE SET version = excluded.version, rows = excluded.rows,"
+                    " lists = excluded.lists, building_since = NULL",
+                    (version, rows, len(centroids)),
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        # The previous version stays for workers that are still loading it
+        self._remove_index_files(keep=(version, version - 1))
+        with self._lock:
+            self._refresh()
+        return len(centroids)
+
+    def claim_ann_build(self) -> bool:
+        """
+        Claim building the ANN index for this worker. False if another worker is
+        building it; release_ann_build ends the claim (a successful build does too).
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT building_since FROM ann_index WHERE id = 0").fetchone()
+                if row and row[0] and time.time() - row[0] < ANN_BUILD_TIMEOUT:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.execute(
+                    "INSERT INTO ann_index (id, version, rows, lists, building_since) VALUES (0, 0, 0, 0, ?)"
+                    " ON CONFLICT (id) DO UPDATE SET building_since = excluded.building_since",
+                    (time.time(),),
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return True
+
+    def release_ann_build(self):
+        with self._connect() as conn:
+            conn.execute("UPDATE ann_index SET building_since = NULL WHERE id = 0")
+
+    def _remove_index_files(self, keep=()):
+        keep_names = {os.path.basename(path) for version in keep
+                      for path in (self._centroids_file(version), self._assign_file(version))}
+        for name in os.listdir(self.directory):
+            if name.startswith(("ann_centroids.", "ann_assign.")) and name not in keep_names:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        """ Remove every vector and the ANN index. """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM vectors")
+                conn.execute("DELETE FROM ann_index")
+                if os.path.exists(self._vectors_path):
+                    os.remove(self._vectors_path)
+                self._remove_index_files()
+            finally:
+                conn.execute("COMMIT")
+        with self._lock:
+            self._rows = 0
+            self._mmap = None
+            self._ann_version = self._ann_trained = 0
+            self._centroids = None
+            self._assign = np.zeros(0, dtype=np.int32)
+
+def _top_k(scores, k: int):
+    """ Indices of the k largest scores (unordered). """
+    if len(scores) <= k:
+        return np.arange(len(scores))
+    return np.argpartition(-scores, k)[:k]
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+def get_vector_store() -> VectorStore:
+    """
+    The process-wide vector store in config.VECTOR_STORE_DIR, sized for the
+    embedding model. Raises VectorStoreUnavailableError without a model.
+    """
+    global _store
+    if _store is None:
+        model = get_embedding_model()
+        if model is None:
+            raise VectorStoreUnavailableError("The embedding model is not available")
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore(
+                    config.VECTOR_STORE_DIR,
+                    model.get_sentence_embedding_dimension(),
+                    ann_min_rows=config.VECTOR_ANN_MIN_ROWS,
+                    nprobe=config.VECTOR_ANN_NPROBE,
+                )
+    return _store
+
+def encode_text(text: str):
+    """ The unit-length embedding of text. Raises VectorStoreUnavailableError without a model. """
+    model = get_embedding_model()
+    if model is None:
+        raise VectorStoreUnavailableError("The embedding model is not available")
+    return model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
+
+def index_entry_vectors(entry_id: str, user_id: Optional[str], transcription: Optional[str],
+                        events: List[Event]):
+    """
+    Store the embeddings of an entry's transcript and events. Failures (e.g. no
+    embedding model) are logged rather than raised: the entry is already saved.
+    """
+    try:
+        store = get_vector_store()
+        kinds, labels, vectors = [], [], []
+        if transcription and not transcription.startswith(_PLACEHOLDERS):
+            kinds.append("transcript")
+            labels.append(transcription[:200])
+            vectors.append(encode_text(transcription))
+        canonicals = [canonical_event(event) for event in events]
+        canonicals = [canon for canon in dict.fromkeys(canonicals) if canon]
+        if canonicals:
+            kinds.extend(["event"] * len(canonicals))
+            labels.extend(canonicals)
+            vectors.extend(encode_canonicals(canonicals))
+        if vectors:
+            store.add(entry_id, user_id, kinds, labels, np.stack(vectors))
+        if store.needs_ann_index():
+            schedule_ann_build(store)
+    except Exception as e:
+        print(f"Vector store error: {e}")
+
+_build_thread: Optional[threading.Thread] = None
+
+def build_ann_index_if_needed(store: VectorStore) -> bool:
+    """
+    Build the ANN index if the store needs one and no other worker is already
+    building it. Returns whether an index was built.
+    """
+    if not store.needs_ann_index() or not store.claim_ann_build():
+        return False
+    try:
+        # Another worker may have finished a build just before the claim
+        if not store.needs_ann_index():
+            return False
+        print(f"Building the ANN index over {len(store)} vectors")
+        store.build_ann_index()
+        return True
+    finally:
+        store.release_ann_build()
+
+def schedule_ann_build(store: VectorStore):
+    """
+    build_ann_index_if_needed in a background thread (at most one per process),
+    so the k-means run never holds up the upload that crossed the threshold.
+    """
+    global _build_thread
+    with _store_lock:
+        if _build_thread is not None and _build_thread.is_alive():
+            return
+        _build_thread = threading.Thread(target=_build_in_background, args=(store,),
+                                         name="ann-index-build", daemon=True)
+        _build_thread.start()
+
+def _build_in_background(store: VectorStore):
+    try:
+        build_ann_index_if_needed(store)
+    except Exception as e:
+        print(f"Vector store error while building the ANN index: {e}")
+
+def rebuild(storage) -> int:
+    """ Re-create the vector store from every stored entry. Returns the number of entries. """
+    store = get_vector_store()
+    store.clear()
+    count = 0
+    for entry in storage.iter_entries(fields={"user_id", "transcription", "events_tagged"}):
+        try:
+            events = decode_events(entry.get("events_tagged"))
+        except ValueError:
+            events = []
+        index_entry_vectors(entry["id"], entry.get("user_id"), entry.get("transcription"), events)
+        count += 1
+    build_ann_index_if_needed(store)
+    return count
+
+# python -m app.services.vector_store rebuild|build-index
+if __name__ == "__main__":
+    import argparse
+    from ..storage import get_storage
+
+    parser = argparse.ArgumentParser(description="Maintain the embedding store.")
+    parser.add_argument("command", choices=["rebuild", "build-index"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        print(f"Embedded {rebuild(get_storage())} entries")
+    else:
+        print(f"Built an ANN index with {get_vector_store().build_ann_index()} lists")
@@ -0,0 +1,41 @@
+# backend/app/storage/__init__.py
+import threading
+from typing import Optional
+from .. import config
+from .base import ENTRY_FIELDS, Storage, StorageUnavailableError
+
+def create_storage(backend: str) -> Storage:
+    """ Build the storage named by backend ("firestore" or "sql"). """
+    if backend == "sql":
+        from ..database import get_engine
+        from .sql import SqlStorage
+        return SqlStorage(get_engine())
+    if backend == "firestore":
+        from ..database import get_db
+        from .firestore import FirestoreStorage
+        db = get_db()
+        if db is None:
+            raise StorageUnavailableError("Firestore is not initialized")
+        return FirestoreStorage(db)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+_storage: Optional[Storage] = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> Storage:
+    """
+    Returns the process-wide storage, creating it on first use.
+    Raises StorageUnavailableError if the backend cannot be initialized.
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage(config.STORAGE_BACKEND)
+    return _storage
+
+def set_storage(storage: Optional[Storage]):
+    """ Replace the process-wide storage (e.g. with an in-memory SQLite one in benchmarks). """
+    global _storage
+    with _storage_lock:
+        _storage = storage
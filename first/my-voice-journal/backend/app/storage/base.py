@@ -0,0 +1,93 @@
+# backend/app/storage/base.py
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from ..services.events import Event
+
+# Stored fields of an entry (besides its id)
+ENTRY_FIELDS = {
+    "user_id", "created_at", "audio_file_path", "audio_sha256", "audio_size_bytes",
+    "transcription", "sentiment_score", "sentence_sentiments", "events_tagged",
+}
+
+class StorageUnavailableError(RuntimeError):
+    """ Raised when the configured storage backend cannot be reached. """
+
+def utc(value: datetime) -> datetime:
+    """ value as an aware UTC datetime (naive values are assumed to be UTC already). """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+class Storage(ABC):
+    """
+    Persistence for voice entries and the main-events aggregate.
+
+    Entries are plain dicts with an "id" plus any of ENTRY_FIELDS; created_at is
+    assigned by the backend when an entry is added and is returned as an aware
+    datetime. events_tagged is the encoded events produced by link_events
+    (see services.events).
+    """
+
+    name = "storage"
+
+    @abstractmethod
+    def add_entries(self, entries: List[Tuple[Dict, List[Event]]]) -> List[str]:
+        """
+        Insert (entry, events) pairs in as few round trips as possible, bumping the
+        main-events counts by each entry's events in the same transaction.
+        Returns the new entry ids, in order.
+        """
+
+    def add_entry(self, entry: Dict, events: List[Event]) -> str:
+        """ Insert one entry (see add_entries). Returns its id. """
+        return self.add_entries([(entry, events)])[0]
+
+    @abstractmethod
+    def get_entry(self, entry_id: str) -> Optional[Dict]:
+        """ The entry with all of its fields, or None if it doesn't exist. """
+
+    @abstractmethod
+    def list_entries(self, limit: int, start_after: Optional[Tuple[datetime, str]] = None,
+                     fields: Optional[Set[str]] = None, user_id: Optional[str] = None) -> List[Dict]:
+        """
+        Up to limit entries ordered by (created_at, id) descending, starting after
+        the given (created_at, id) position.
+
+        fields restricts the returned stored fields (id and created_at are always
+        included); user_id restricts the entries to one user.
+        """
+
+    @abstractmethod
+    def iter_entries(self, fields: Optional[Set[str]] = None, user_id: Optional[str] = None,
+                     start_after: Optional[Tuple[datetime, str]] = None) -> Iterator[Dict]:
+        """
+        Every entry (or every entry of one user) in (created_at, id) order, fetched
+        in batches so only one batch is held in memory at a time. start_after resumes
+        the iteration after the given (created_at, id) position.
+        """
+
+    @abstractmethod
+    def update_entries(self, updates: List[Tuple[str, Dict]]):
+        """
+        Set the given fields of existing entries, as (entry id, {field: value}) pairs,
+        in as few round trips as possible. Event counts are not adjusted; call
+        rebuild_aggregates after changing events_tagged.
+        """
+
+    @abstractmethod
+    def main_events(self, min_count: int = 2) -> Dict:
+        """
+        The main-events aggregate.
+
+        Returns:
+            dict: "main_events" (events seen at least min_count times) and "all_events"
+            (a map from each event's JSON string to its count).
+        """
+
+    @abstractmethod
+    def rebuild_aggregates(self) -> int:
+        """ Recompute every event count from the stored entries. Returns the number of distinct events. """
+
+    def close(self):
+        """ Release connections held by the backend. """
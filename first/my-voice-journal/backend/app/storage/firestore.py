@@ -0,0 +1,108 @@
+# backend/app/storage/firestore.py
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from firebase_admin import firestore as admin_firestore
+from ..services import aggregates
+from ..services.events import Event
+from .base import ENTRY_FIELDS, Storage
+
+ENTRY_COLLECTION = "voice_entries"
+
+# Documents fetched per query when iterating over the whole collection
+ITER_BATCH_SIZE = 500
+
+class FirestoreStorage(Storage):
+    """
+    Entries in the voice_entries collection, with event counts maintained in
+    event_aggregates (see services.aggregates).
+
+    Per-user timelines and exports need composite indexes on
+    (user_id ASC, created_at DESC, __name__ DESC) and
+    (user_id ASC, created_at ASC, __name__ ASC).
+    """
+
+    name = "firestore"
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.collection(ENTRY_COLLECTION)
+
+    def add_entries(self, entries: List[Tuple[Dict, List[Event]]]) -> List[str]:
+        ids = []
+        batch, pending = self.db.batch(), 0
+        for entry, events in entries:
+            # An entry and its count increments are never split across batches.
+            writes = 1 + len(aggregates.count_events(events))
+            if pending and pending + writes > aggregates.BATCH_SIZE:
+                batch.commit()
+                batch, pending = self.db.batch(), 0
+            doc_ref = self.collection.document()
+            batch.set(doc_ref, {**entry, "created_at": admin_firestore.SERVER_TIMESTAMP})
+            aggregates.add_event_counts(self.db, batch, events)
+            pending += writes
+            ids.append(doc_ref.id)
+        if pending:
+            batch.commit()
+        return ids
+
+    def get_entry(self, entry_id: str) -> Optional[Dict]:
+        doc = self.collection.document(entry_id).get()
+        if not doc.exists:
+            return None
+        return {"id": doc.id, **doc.to_dict()}
+
+    def list_entries(self, limit: int, start_after: Optional[Tuple[datetime, str]] = None,
+                     fields: Optional[Set[str]] = None, user_id: Optional[str] = None) -> List[Dict]:
+        query = self.collection
+        if user_id is not None:
+            query = query.where("user_id", "==", user_id)
+        query = (query
+                 .order_by("created_at", direction=admin_firestore.Query.DESCENDING)
+                 .order_by("__name__", direction=admin_firestore.Query.DESCENDING))
+        if fields is not None:
+            query = query.select(sorted((fields & ENTRY_FIELDS) | {"created_at"}))
+        if start_after is not None:
+            created_at, entry_id = start_after
+            query = query.start_after({"created_at": created_at,
+                                       "__name__": self.collection.document(entry_id)})
+        return [{"id": doc.id, **doc.to_dict()} for doc in query.limit(limit).stream()]
+
+    def iter_entries(self, fields: Optional[Set[str]] = None, user_id: Optional[str] = None,
+                     start_after: Optional[Tuple[datetime, str]] = None) -> Iterator[Dict]:
+        query = self.collection
+        if user_id is not None:
+            query = query.where("user_id", "==", user_id)
+        query = (query
+                 .order_by("created_at", direction=admin_firestore.Query.ASCENDING)
+                 .order_by("__name__", direction=admin_firestore.Query.ASCENDING))
+        if fields is not None:
+            query = query.select(sorted((fields & ENTRY_FIELDS) | {"created_at"}))
+        last = None
+        if start_after is not None:
+            created_at, entry_id = start_after
+            last = {"created_at": created_at, "__name__": self.collection.document(entry_id)}
+        while True:
+            page = query.start_after(last) if last is not None else query
+            docs = list(page.limit(ITER_BATCH_SIZE).stream())
+            for doc in docs:
+                yield {"id": doc.id, **doc.to_dict()}
+            if len(docs) < ITER_BATCH_SIZE:
+                return
+            last = docs[-1]
+
+    def update_entries(self, updates: List[Tuple[str, Dict]]):
+        batch, pending = self.db.batch(), 0
+        for entry_id, values in updates:
+            batch.update(self.collection.document(entry_id), values)
+            pending += 1
+            if pending >= aggregates.BATCH_SIZE:
+                batch.commit()
+                batch, pending = self.db.batch(), 0
+        if pending:
+            batch.commit()
+
+    def main_events(self, min_count: int = 2) -> Dict:
+        return aggregates.read_main_events(self.db, min_count=min_count)
+
+    def rebuild_aggregates(self) -> int:
+        return aggregates.rebuild(self.db)
@@ -0,0 +1,189 @@
+# backend/app/storage/sql.py
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import sessionmaker
+from ..models import EventAggregate, VoiceEntry, create_tables
+from ..services import aggregates
+from ..services.events import Event, decode_events
+from .base import ENTRY_FIELDS, Storage, utc
+
+# Rows fetched per query when iterating over the whole table
+ITER_BATCH_SIZE = 500
+
+_entries = VoiceEntry.__table__
+_aggregates = EventAggregate.__table__
+
+def _row_to_entry(row) -> Dict:
+    entry = dict(row._mapping)
+    entry["created_at"] = utc(entry["created_at"])
+    return entry
+
+class SqlStorage(Storage):
+    """
+    Entries and event counts in a SQL database (SQLite or PostgreSQL) through
+    SQLAlchemy, using the engine's connection pool.
+
+    Timeline pages are keyset queries on the (user_id, created_at, id) and
+    (created_at, id) indexes, inserts are batched into one executemany per call,
+    and count increments are single upserts.
+    """
+
+    name = "sql"
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.sessions = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        create_tables(engine)
+
+    def _columns(self, fields: Optional[Set[str]]):
+        names = ENTRY_FIELDS if fields is None else (fields & ENTRY_FIELDS) | {"created_at"}
+        return [_entries.c.id] + [_entries.c[name] for name in sorted(names)]
+
+    def _increment_counts(self, session, counts: Dict[str, Dict]):
+        if not counts:
+            return
+        rows = [{"fingerprint": fingerprint,
+                 "event": json.dumps(item["event"], sort_keys=True),
+                 "count": item["count"]}
+                for fingerprint, item in counts.items()]
+        dialect = self.engine.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            module = sqlite if dialect == "sqlite" else postgresql
+            stmt = module.insert(_aggregates)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[_aggregates.c.fingerprint],
+                set_={"count": _aggregates.c.count + stmt.excluded.count},
+            )
+            session.execute(stmt, rows)
+            return
+        # Other databases: update what exists, insert the rest.
+        existing = set(session.scalars(
+            select(_aggregates.c.fingerprint).where(_aggregates.c.fingerprint.in_(list(counts)))
+        ))
+        for row in rows:
+            if row["fingerprint"] in existing:
+                session.execute(update(_aggregates)
+                                .where(_aggregates.c.fingerprint == row["fingerprint"])
+                                .values(count=_aggregates.c.count + row["count"]))
+        missing = [row for row in rows if row["fingerprint"] not in existing]
+        if missing:
+            session.execute(insert(_aggregates), missing)
+
+    def add_entries(self, entries: List[Tuple[Dict, List[Event]]]) -> List[str]:
+        if not entries:
+            return []
+        now = datetime.now(timezone.utc)
+        rows, counts = [], {}
+        for entry, events in entries:
+            row = {name: entry.get(name) for name in ENTRY_FIELDS}
+            row["id"] = uuid.uuid4().hex
+            row["created_at"] = now
+            rows.append(row)
+            for fingerprint, item in aggregates.count_events(events).items():
+                if fingerprint in counts:
+                    counts[fingerprint]["count"] += item["count"]
+                else:
+                    counts[fingerprint] = item
+        with self.sessions.begin() as session:
+            session.execute(insert(_entries), rows)
+            self._increment_counts(session, counts)
+        return [row["id"] for row in rows]
+
+    def get_entry(self, entry_id: str) -> Optional[Dict]:
+        with self.sessions() as session:
+            row = session.execute(select(*self._columns(None)).where(_entries.c.id == entry_id)).first()
+        return _row_to_entry(row) if row is not None else None
+
+    def list_entries(self, limit: int, start_after: Optional[Tuple[datetime, str]] = None,
+                     fields: Optional[Set[str]] = None, user_id: Optional[str] = None) -> List[Dict]:
+        query = select(*self._columns(fields))
+        if user_id is not None:
+            query = query.where(_entries.c.user_id == user_id)
+        if start_after is not None:
+            created_at, entry_id = start_after
+            created_at = utc(created_at)
+            query = query.where(or_(
+                _entries.c.created_at < created_at,
+                and_(_entries.c.created_at == created_at, _entries.c.id < entry_id),
+            ))
+        query = query.order_by(_entries.c.created_at.desc(), _entries.c.id.desc()).limit(limit)
+        with self.sessions() as session:
+            return [_row_to_entry(row) for row in session.execute(query)]
+
+    def iter_entries(self, fields: Optional[Set[str]] = None, user_id: Optional[str] = None,
+                     start_after: Optional[Tuple[datetime, str]] = None) -> Iterator[Dict]:
+        base = select(*self._columns(fields)).order_by(_entries.c.created_at, _entries.c.id)
+        if user_id is not None:
+            base = base.where(_entries.c.user_id == user_id)
+        last = None
+        if start_after is not None:
+            last = (utc(start_after[0]), start_after[1])
+        while True:
+            query = base
+            if last is not None:
+                created_at, entry_id = last
+                query = query.where(or_(
+                    _entries.c.created_at > created_at,
+                    and_(_entries.c.created_at == created_at, _entries.c.id > entry_id),
+                ))
+            with self.sessions() as session:
+                batch = [_row_to_entry(row) for row in session.execute(query.limit(ITER_BATCH_SIZE))]
+            yield from batch
+            if len(batch) < ITER_BATCH_SIZE:
+                return
+            last = (batch[-1]["created_at"], batch[-1]["id"])
+
+    def update_entries(self, updates: List[Tuple[str, Dict]]):
+        if not updates:
+            return
+        # Group by the set of fields, so each group is a single executemany.
+        groups: Dict[Tuple[str, ...], List[Dict]] = {}
+        for entry_id, values in updates:
+            values = {name: value for name, value in values.items() if name in ENTRY_FIELDS}
+            groups.setdefault(tuple(sorted(values)), []).append({"id": entry_id, **values})
+        with self.sessions.begin() as session:
+            for names, rows in groups.items():
+                if names:
+                    # ORM bulk UPDATE by primary key
+                    session.execute(update(VoiceEntry), rows)
+
+    def main_events(self, min_count: int = 2) -> Dict:
+        main_events = []
+        all_events = {}
+        query = (select(_aggregates.c.event, _aggregates.c.count)
+                 .where(_aggregates.c.count > 0)
+                 .order_by(_aggregates.c.count.desc()))
+        with self.sessions() as session:
+            for event_json, count in session.execute(query):
+                event = json.loads(event_json)
+                if count >= min_count:
+                    main_events.append(event)
+                all_events[event_json] = count
+        return {"main_events": main_events, "all_events": all_events}
+
+    def rebuild_aggregates(self) -> int:
+        counts: Dict[str, Dict] = {}
+        for entry in self.iter_entries(fields={"events_tagged"}):
+            if not entry.get("events_tagged"):
+                continue
+            try:
+                event_list = decode_events(entry["events_tagged"])
+            except Exception as e:
+                print(f"Error parsing events_tagged of {entry['id']}: {e}")
+                continue
+            for fingerprint, item in aggregates.count_events(event_list).items():
+                if fingerprint in counts:
+                    counts[fingerprint]["count"] += item["count"]
+                else:
+                    counts[fingerprint] = item
+        with self.sessions.begin() as session:
+            session.execute(delete(_aggregates))
+            self._increment_counts(session, counts)
+        return len(counts)
+
+    def close(self):
+        self.engine.dispose()
@@ -0,0 +1,29 @@
+# backend/benchmarks/compare.py
+# Compare two benchmark result files: python -m benchmarks.compare before.json after.json
+import json
+import sys
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {(r["name"], r["scale"]): r for r in json.load(f)["results"]}
+
+def compare(before_path: str, after_path: str):
+    before, after = _load(before_path), _load(after_path)
+    print(f"{'benchmark':>16} {'scale':>8} {'before':>10} {'after':>10} {'speedup':>8} {'memory':>8}")
+    for key in sorted(set(before) & set(after), key=lambda k: (k[1], k[0])):
+        old, new = before[key], after[key]
+        if "error" in old or "error" in new:
+            print(f"{key[0]:>16} {key[1]:>8} {'error' if 'error' in old else '':>10} "
+                  f"{'error' if 'error' in new else '':>10}")
+            continue
+        speedup = old["seconds"] / new["seconds"] if new["seconds"] else float("inf")
+        memory = ""
+        if old.get("peak_bytes") and new.get("peak_bytes"):
+            memory = f"{new['peak_bytes'] / old['peak_bytes']:7.2f}x"
+        print(f"{key[0]:>16} {key[1]:>8} {old['seconds']:9.3f}s {new['seconds']:9.3f}s "
+              f"{speedup:7.2f}x {memory:>8}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: python -m benchmarks.compare before.json after.json")
+    compare(sys.argv[1], sys.argv[2])
@@ -0,0 +1,88 @@
+# backend/benchmarks/corpus.py
+import random
+from typing import Dict, List, Tuple
+from app.services.events import Entity, Event, encode_events
+
+# Vocabulary of the synthetic journal. Subjects, actions and objects are drawn
+# from small pools, so events repeat across entries like they do in real journals.
+SUBJECTS = ["I", "We", "My sister", "My brother", "The dog", "Sam", "Alex", "My manager",
+            "The team", "She", "He", "They", "My mom", "The kids", "Our neighbor"]
+ACTIONS = ["went to", "ran to", "saw", "ate", "called", "visited", "finished", "started",
+           "walked to", "cooked", "watched", "bought", "met", "fixed", "talked about",
+           "played", "read", "cleaned", "planned", "missed"]
+OBJECTS = ["the park", "the store", "a movie", "dinner", "the report", "the project", "the bug",
+           "pasta", "a book", "the river", "the concert", "my friend", "the meeting", "coffee",
+           "the gym", "the car", "lunch", "the garden", "the train", "the museum"]
+PLACES = ["Chicago", "Boston", "downtown", "the office", "home", "the lake", "Paris", "school"]
+TIMES = ["this morning", "yesterday", "today", "last night", "on Monday", "after work", "at noon"]
+FEELINGS = ["It was a good day.", "I felt happy about it.", "That was terrible.",
+            "I was not sad at all.", "The weather was great.", "It went wrong again.",
+            "Honestly it was fine.", "I am grateful for my friends."]
+
+def make_sentence(rnd: random.Random) -> str:
+    parts = [rnd.choice(SUBJECTS), rnd.choice(ACTIONS), rnd.choice(OBJECTS)]
+    if rnd.random() < 0.4:
+        parts.append(f"in {rnd.choice(PLACES)}")
+    if rnd.random() < 0.4:
+        parts.append(rnd.choice(TIMES))
+    return " ".join(parts) + "."
+
+def make_transcript(rnd: random.Random, min_sentences: int = 4, max_sentences: int = 20) -> str:
+    """ A journal entry: a few paragraphs of event sentences mixed with feelings. """
+    sentences = []
+    for _ in range(rnd.randint(min_sentences, max_sentences)):
+        sentences.append(rnd.choice(FEELINGS) if rnd.random() < 0.25 else make_sentence(rnd))
+    paragraphs, i = [], 0
+    while i < len(sentences):
+        size = rnd.randint(2, 6)
+        paragraphs.append(" ".join(sentences[i:i + size]))
+        i += size
+    return "\n".join(paragraphs)
+
+def make_transcripts(n: int, seed: int = 0) -> List[str]:
+    rnd = random.Random(seed)
+    return [make_transcript(rnd) for _ in range(n)]
+
+def make_event(rnd: random.Random, index: int) -> Event:
+    """ An event shaped like the output of nlp.extract_events. """
+    subject = rnd.choice(SUBJECTS) if rnd.random() < 0.95 else None
+    action = rnd.choice(ACTIONS).split()[0]
+    obj = rnd.choice(OBJECTS) if rnd.random() < 0.9 else None
+    if obj and rnd.random() < 0.3:
+        obj = f"{obj} {rnd.choice(['again', 'with Alex', 'downtown', 'early', 'late'])}"
+    times = [rnd.choice(TIMES)] if rnd.random() < 0.3 else []
+    locations = [rnd.choice(PLACES)] if rnd.random() < 0.2 else []
+    return Event(
+        event_id=f"evt-{index}",
+        sentence=" ".join(p for p in [subject, action, obj] if p) + ".",
+        sentence_index=index,
+        extracted_at="2024-01-01T00:00:00",
+        subject=subject,
+        subjects=[subject] if subject else [],
+        action=action,
+        action_lemma=action,
+        object=obj,
+        objects=[obj] if obj else [],
+        time=times,
+        location=locations,
+        additional_info=[],
+        entities=[Entity(loc, "GPE") for loc in locations],
+    )
+
+def make_events(n: int, seed: int = 0) -> List[Event]:
+    rnd = random.Random(seed)
+    return [make_event(rnd, i) for i in range(n)]
+
+def make_entries(n: int, seed: int = 0, events_per_entry: int = 5) -> List[Tuple[Dict, List[Event]]]:
+    """ (entry, events) pairs ready for Storage.add_entries. """
+    rnd = random.Random(seed)
+    entries = []
+    for i in range(n):
+        events = [make_event(rnd, j) for j in range(rnd.randint(1, 2 * events_per_entry - 1))]
+        entries.append(({
+            "user_id": f"user-{rnd.randint(0, 9)}",
+            "transcription": make_transcript(rnd, 2, 6),
+            "sentiment_score": rnd.uniform(-0.2, 0.2),
+            "events_tagged": encode_events(events),
+        }, events))
+    return entries
@@ -0,0 +1,280 @@
+# backend/benchmarks/run.py
+# Benchmarks of the hot paths over a seeded synthetic corpus, run from the backend directory:
+#     python -m benchmarks.run --scales 1k,10k --output results.json
+#     python -m benchmarks.compare before.json after.json
+# Transcription is faked and storage is an in-memory SQLite database, so no
+# credentials or network access are needed.
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# Must be set before the app modules read their configuration
+os.environ.setdefault("TRANSCRIBER_BACKEND", "fake")
+os.environ.setdefault("STORAGE_BACKEND", "sql")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("CACHE_ENABLED", "0")
+
+from app.database import create_sql_engine
+from app.pipeline import process_audio
+from app.services.event_linking import link_events
+from app.services.event_registry import EventRegistry
+from app.services.events import decode_events
+from app.services.nlp import analyze_text, extract_events, merge_events
+from app.services.registry import registry
+from app.services.search import SearchIndex
+from app.services.transcription import FakeTranscriber, set_transcriber
+from app.storage import set_storage
+from app.storage.sql import SqlStorage
+from . import corpus
+
+# name -> (setup(n, args) -> state, run(state) -> number of items processed)
+BENCHMARKS: Dict[str, tuple] = {}
+
+def benchmark(name: str, setup: Callable):
+    def register(run: Callable):
+        BENCHMARKS[name] = (setup, run)
+        return run
+    return register
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    for suffix, factor in (("k", 1000), ("m", 1000000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+def _memory_storage() -> SqlStorage:
+    return SqlStorage(create_sql_engine("sqlite://"))
+
+# NLP benchmarks parse at most --nlp-limit transcripts per scale (spaCy is slow)
+def _transcripts(n, args):
+    return corpus.make_transcripts(min(n, args.nlp_limit), seed=args.seed)
+
+@benchmark("extract_events", _transcripts)
+def bench_extract_events(transcripts):
+    for text in transcripts:
+        extract_events(text)
+    return len(transcripts)
+
+@benchmark("analyze_text", _transcripts)
+def bench_analyze_text(transcripts):
+    for text in transcripts:
+        analyze_text(text)
+    return len(transcripts)
+
+@benchmark("merge_events", lambda n, args: corpus.make_events(n, seed=args.seed))
+def bench_merge_events(events):
+    merge_events(events)
+    return len(events)
+
+@benchmark("link_events", lambda n, args: corpus.make_events(n, seed=args.seed))
+def bench_link_events(events):
+    link_events("[]", events)
+    return len(events)
+
+@benchmark("decode_events", lambda n, args: [entry["events_tagged"] for entry, _ in corpus.make_entries(n, seed=args.seed)])
+def bench_decode_events(encoded):
+    for data in encoded:
+        decode_events(data)
+    return len(encoded)
+
+@benchmark("add_entries", lambda n, args: corpus.make_entries(n, seed=args.seed))
+def bench_add_entries(entries):
+    storage = _memory_storage()
+    for i in range(0, len(entries), 1000):
+        storage.add_entries(entries[i:i + 1000])
+    storage.close()
+    return len(entries)
+
+def _populated_storage(n, args):
+    storage = _memory_storage()
+    entries = corpus.make_entries(n, seed=args.seed)
+    for i in range(0, len(entries), 1000):
+        storage.add_entries(entries[i:i + 1000])
+    return storage
+
+@benchmark("get_main_events", _populated_storage)
+def bench_get_main_events(storage):
+    storage.main_events()
+    return 1
+
+def _recordings(n, args):
+    """ Short silent WAV files with distinct contents, and a fresh storage for them. """
+    directory = tempfile.mkdtemp(prefix="voice-journal-bench-")
+    paths = []
+    for i in range(min(n, args.upload_limit)):
+        path = os.path.join(directory, f"{i}.wav")
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(i.to_bytes(4, "little") * 4000)
+        paths.append(path)
+    rnd = random.Random(args.seed)
+    sentences = [corpus.make_sentence(rnd) for _ in range(200)]
+    set_transcriber(FakeTranscriber(sentences=sentences))
+    set_storage(_memory_storage())
+    recordings = []
+    for path in paths:
+        with open(path, "rb") as f:
+            recordings.append((path, hashlib.sha256(f.read()).hexdigest(), os.path.getsize(path)))
+    return recordings
+
+@benchmark("upload_path", _recordings)
+def bench_upload_path(recordings):
+    for path, sha256, size in recordings:
+        result = process_audio(path, sha256, size)
+        if result["entry_id"] is None:
+            raise RuntimeError("process_audio did not save the entry")
+    return len(recordings)
+
+def _indexed_entries(n, args):
+    """ The corpus entries with ids, and a fresh search index file for them. """
+    directory = tempfile.mkdtemp(prefix="voice-journal-bench-")
+    entries = [dict(entry, id=f"entry-{i}") for i, (entry, _) in enumerate(corpus.make_entries(n, seed=args.seed))]
+    return SearchIndex(os.path.join(directory, "search.sqlite3")), entries
+
+@benchmark("index_entries", _indexed_entries)
+def bench_index_entries(state):
+    index, entries = state
+    for i in range(0, len(entries), 1000):
+        index.add_entries(entries[i:i + 1000])
+    return len(entries)
+
+SEARCH_QUERIES = ["park", "\"the report\"", "cooked pasta", "walk*", "Chicago OR Boston",
+                  "\"my sister called\"", "museum train", "grateful"]
+
+def _search_index(n, args):
+    index, entries = _indexed_entries(n, args)
+    bench_index_entries((index, entries))
+    return index
+
+@benchmark("search", _search_index)
+def bench_search(index):
+    count = 0
+    for _ in range(10):
+        for query in SEARCH_QUERIES:
+            index.search(query, limit=20)
+            index.search(query, limit=20, user_id="user-3")
+            count += 2
+    return count
+
+def _event_registry(n, args):
+    """ The corpus entries, and a fresh event registry file for them. """
+    directory = tempfile.mkdtemp(prefix="voice-journal-bench-")
+    return EventRegistry(os.path.join(directory, "events.sqlite3")), corpus.make_entries(n, seed=args.seed)
+
+@benchmark("link_registry", _event_registry)
+def bench_link_registry(state):
+    event_registry, entries = state
+    for i, (entry, events) in enumerate(entries):
+        event_registry.link_entry(f"entry-{i}", entry["user_id"], events)
+    return len(entries)
+
+def _linked_registry(n, args):
+    event_registry, entries = _event_registry(n, args)
+    bench_link_registry((event_registry, entries))
+    return event_registry
+
+@benchmark("recurring_events", _linked_registry)
+def bench_recurring_events(event_registry):
+    for i in range(100):
+        event_registry.recurring(f"user-{i % 10}", limit=20)
+    return 100
+
+def _measure(name: str, n: int, args) -> Dict:
+    setup, run = BENCHMARKS[name]
+    result = {"name": name, "scale": n}
+    try:
+        timings = []
+        for _ in range(args.repeat):
+            state = setup(n, args)
+            started = time.perf_counter()
+            items = run(state)
+            timings.append(time.perf_counter() - started)
+        result.update({
+            "items": items,
+            "seconds": min(timings),
+            "seconds_all": timings,
+            "items_per_sec": items / min(timings) if min(timings) > 0 else None,
+        })
+        if args.memory:
+            state = setup(n, args)
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            run(state)
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+            tracemalloc.stop()
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run_benchmarks(names: List[str], scales: List[int], args) -> Dict:
+    # Load the models up front so their load time isn't counted in the first benchmark
+    registry.warm_up()
+    results = []
+    for n in scales:
+        for name in names:
+            result = _measure(name, n, args)
+            results.append(result)
+            if "error" in result:
+                print(f"{name:>16} n={n:<8} error: {result['error']}")
+            else:
+                memory = f"{result['peak_bytes'] / 1e6:8.1f} MB" if "peak_bytes" in result else ""
+                print(f"{name:>16} n={n:<8} {result['seconds']:9.3f}s "
+                      f"{result['items_per_sec'] or 0:12.1f} items/s {memory}")
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "nlp_limit": args.nlp_limit,
+            "upload_limit": args.upload_limit,
+        },
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the journal's hot paths.")
+    parser.add_argument("--scales", default="1k,10k", help="comma-separated corpus sizes, e.g. 1k,10k,100k")
+    parser.add_argument("--only", help="comma-separated benchmark names (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per benchmark (the best is reported)")
+    parser.add_argument("--nlp-limit", type=int, default=500, help="max transcripts parsed by the NLP benchmarks")
+    parser.add_argument("--upload-limit", type=int, default=200, help="max recordings sent through the upload path")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    report = run_benchmarks(names, [parse_scale(s) for s in args.scales.split(",")], args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
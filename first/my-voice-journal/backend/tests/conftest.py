@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+# The tests import the app package from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+# backend/tests/test_cache.py
+import os
+from app.services.cache import DiskCache, content_key
+
+def _size(cache: DiskCache, key: str) -> int:
+    return os.path.getsize(cache._path(key))
+
+def test_get_adopts_entries_written_by_another_instance(tmp_path):
+    # Two processes (e.g. uvicorn workers) sharing one cache directory
+    first = DiskCache(str(tmp_path), max_bytes=0)
+    second = DiskCache(str(tmp_path), max_bytes=0)
+    key = content_key("transcript")
+    first.set(key, {"text": "hello"})
+
+    assert second.get(key) == {"text": "hello"}
+    stats = second.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 0)
+    assert (stats["entries"], stats["bytes"]) == (1, _size(first, key))
+
+    assert second.get(content_key("missing")) is None
+    assert second.stats()["misses"] == 1
+
+def test_adopted_entries_count_towards_eviction(tmp_path):
+    first = DiskCache(str(tmp_path), max_bytes=0)
+    keys = [content_key(str(i)) for i in range(3)]
+    for key in keys:
+        first.set(key, "x" * 100)
+    size = _size(first, keys[0])
+
+    second = DiskCache(str(tmp_path), max_bytes=3 * size)
+    new_keys = [content_key(f"new {i}") for i in range(2)]
+    for key in new_keys:
+        first.set(key, "y" * 100)
+    assert second.get(new_keys[0]) == "y" * 100
+    assert second.stats()["bytes"] == 3 * size
+    # The adopted entry is the most recently used, so the oldest ones go first
+    assert second.stats()["evictions"] == 1
+    assert not os.path.exists(second._path(keys[0]))
+    assert second.get(new_keys[1]) == "y" * 100
+    assert second.get(new_keys[0]) == "y" * 100
+    assert not os.path.exists(second._path(keys[1]))
+    assert second.stats()["bytes"] == 3 * size
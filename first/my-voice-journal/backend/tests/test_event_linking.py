@@ -0,0 +1,135 @@
+# backend/tests/test_event_linking.py
+import difflib
+import random
+from collections import OrderedDict
+import numpy as np
+import pytest
+from app.services import event_index, event_linking
+from app.services.event_index import CandidateIndex
+from app.services.event_linking import canonical_event, link_event_list, similar_events
+from app.services.events import Event
+
+# Includes non-ASCII words, whose characters land in the hashed signature columns
+WORDS = ["i", "we", "my sister", "the team", "walked", "walk", "ate", "met", "the dog",
+         "a movie", "pizza", "rome", "café", "naïve", "zürich", "東京", "straße", "ñandú",
+         "x", "", "dog walk", "ride", "bike ride"]
+
+def _random_text(rng: random.Random) -> str:
+    if rng.random() < 0.1:
+        return ""
+    return " ".join(word for word in rng.choices(WORDS, k=rng.randint(1, 4)) if word)
+
+def _random_event_fields(rng: random.Random):
+    def pick():
+        return rng.choice(WORDS + [None]) if rng.random() < 0.9 else None
+    return {"subject": pick(), "action": pick(), "object": pick(),
+            "location": [rng.choice(WORDS)] if rng.random() < 0.3 else []}
+
+def _jaccard(a: str, b: str) -> float:
+    words_a, words_b = set(a.split()), set(b.split())
+    union = words_a | words_b
+    return len(words_a & words_b) / len(union) if union else 0.0
+
+@pytest.fixture(params=["numpy", "fallback"])
+def index_backend(request, monkeypatch):
+    if request.param == "fallback":
+        monkeypatch.setattr(event_index, "np", None)
+    return request.param
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("threshold", [0.3, 0.6, 0.65, 0.9, 1.0])
+def test_candidates_include_every_match(index_backend, seed, threshold):
+    rng = random.Random(seed)
+    texts = {}
+    index = CandidateIndex()
+    for item_id in range(120):
+        texts[item_id] = _random_text(rng)
+        index.add(item_id, texts[item_id])
+    # Replaced and removed entries must be reflected as well
+    for item_id in rng.sample(sorted(texts), 20):
+        texts[item_id] = _random_text(rng)
+        index.add(item_id, texts[item_id])
+    for item_id in rng.sample(sorted(texts), 20):
+        del texts[item_id]
+        index.remove(item_id)
+
+    for _ in range(60):
+        query = _random_text(rng)
+        candidates = index.candidates(query, threshold)
+        assert candidates == sorted(candidates)
+        assert set(candidates) <= set(texts)
+        expected = [item_id for item_id in sorted(texts)
+                    if difflib.SequenceMatcher(None, texts[item_id], query).ratio() >= threshold]
+        assert set(expected) <= set(candidates)
+        assert index.first_match(query, threshold) == (expected[0] if expected else -1)
+
+        word_candidates = set(index.word_candidates(query, threshold))
+        assert word_candidates <= set(texts)
+        assert {item_id for item_id in texts if _jaccard(texts[item_id], query) >= threshold} <= word_candidates
+
+class _FakeEmbeddingModel:
+    """ Deterministic low-dimensional embeddings, so that many pairs pass the cosine threshold. """
+    dim = 4
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True):
+        # Continuous components, so no pair sits exactly on the threshold
+        vectors = np.array([[random.Random(f"{text}/{i}").random() - 0.5 for i in range(self.dim)]
+                            for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+@pytest.fixture(params=["no_embeddings", "embeddings"])
+def embedding_model(request, monkeypatch):
+    model = _FakeEmbeddingModel() if request.param == "embeddings" else None
+    monkeypatch.setattr(event_linking, "get_embedding_model", lambda: model)
+    monkeypatch.setattr(event_linking, "_embedding_cache", OrderedDict())
+    return model
+
+def _brute_force_link(existing, new, model):
+    """
+    The pairwise rule link_event_list implements: each new event is counted on the
+    first similar event in list order, or appended. Returns the positions (in
+    existing + new) of the resulting events and their occurrences.
+    """
+    inputs = existing + new
+    canonicals = [canonical_event(event) for event in inputs]
+    embeddings = (list(model.encode(canonicals)) if model is not None and canonicals
+                  else [None] * len(inputs))
+    positions = list(range(len(existing)))
+    occurrences = [event.occurrences or 1 for event in existing]
+    for i in range(len(existing), len(inputs)):
+        for k, j in enumerate(positions):
+            if similar_events(canonicals[j], canonicals[i], embeddings[j], embeddings[i]):
+                occurrences[k] += 1
+                break
+        else:
+            positions.append(i)
+            occurrences.append(1)
+    return positions, occurrences
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("fuzzy, overlap", [(0.65, 0.5), (0.4, 0.3), (0.9, 0.8)])
+def test_link_event_list_matches_brute_force(embedding_model, monkeypatch, seed, fuzzy, overlap):
+    monkeypatch.setattr(event_linking, "FUZZY_THRESHOLD", fuzzy)
+    monkeypatch.setattr(event_linking, "WORD_OVERLAP_THRESHOLD", overlap)
+    rng = random.Random(seed)
+    existing = [Event(occurrences=rng.choice([None, 1, 3]), **_random_event_fields(rng))
+                for _ in range(rng.randint(0, 30))]
+    new = [Event(**_random_event_fields(rng)) for _ in range(rng.randint(0, 80))]
+    expected_positions, expected_occurrences = _brute_force_link(existing, new, embedding_model)
+
+    inputs = existing + new
+    linked = link_event_list(existing, new)
+    assert [next(i for i, event in enumerate(inputs) if event is linked_event)
+            for linked_event in linked] == expected_positions
+    assert [event.occurrences for event in linked] == expected_occurrences
+    assert all(event.first_mentioned for event in linked)
+
+def test_empty_canonicals_link_together(monkeypatch):
+    monkeypatch.setattr(event_linking, "get_embedding_model", lambda: None)
+    events = [Event(), Event(subject=""), Event(action="walked"), Event()]
+    linked = link_event_list([], events)
+    assert [canonical_event(event) for event in linked] == ["", "walked"]
+    assert [event.occurrences for event in linked] == [3, 1]
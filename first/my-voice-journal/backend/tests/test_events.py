@@ -0,0 +1,132 @@
+# backend/tests/test_events.py
+import json
+import pytest
+from app.services.events import (
+    EVENT_FIELDS, EVENTS_FORMAT_VERSION, OPTIONAL_FROM, Entity, Event,
+    decode_events, encode_events, events_json,
+)
+
+def _v1_event(**fields):
+    """ A version 1 (stored JSON dict) event with every core field. """
+    event = {
+        "event_id": "e1", "sentence": "I ate pizza in Rome.", "sentence_index": 0,
+        "extracted_at": "2024-01-01T00:00:00", "subject": "I", "subjects": ["I"],
+        "action": "ate", "action_lemma": "eat", "object": "pizza", "objects": ["pizza"],
+        "time": [], "location": ["Rome"], "additional_info": [],
+        "entities": [{"text": "Rome", "label": "GPE"}],
+    }
+    event.update(fields)
+    return event
+
+def test_v1_round_trip():
+    stored = [_v1_event(), _v1_event(event_id="e2", sentence_index=1, occurrences=2,
+                                     first_mentioned="2024-01-01T00:00:00")]
+    events = decode_events(json.dumps(stored))
+    assert [event.to_dict() for event in events] == stored
+    assert events[0].entities == [Entity("Rome", "GPE")]
+    assert [event.to_dict() for event in decode_events(encode_events(events))] == stored
+
+def test_v1_unknown_keys_kept_in_extra():
+    stored = [_v1_event(custom=5, tags=["a"])]
+    event = decode_events(json.dumps(stored))[0]
+    assert event.extra == {"custom": 5, "tags": ["a"]}
+    assert event.to_dict() == stored[0]
+    assert decode_events(encode_events([event]))[0].to_dict() == stored[0]
+
+def test_v1_none_list_fields():
+    event = decode_events(json.dumps([_v1_event(subjects=None, time=None, entities=None)]))[0]
+    assert event.subjects == []
+    assert event.time == []
+    assert event.entities == []
+    assert event.extra is None
+    assert event.to_dict()["subjects"] == []
+
+def test_v1_missing_fields_default():
+    event = decode_events(json.dumps([{"sentence": "Hello.", "action": "say"}]))[0]
+    assert event.sentence == "Hello."
+    assert event.event_id is None
+    assert event.objects == []
+    assert event.occurrences is None
+
+def test_v2_trims_trailing_none():
+    event = Event.from_dict(_v1_event())
+    row = event.to_row()
+    assert len(row) == OPTIONAL_FROM
+    event.occurrences = 3
+    assert len(event.to_row()) == OPTIONAL_FROM + 1
+
+    # A missing field in the middle is kept as None, only the tail is trimmed
+    event.raw_sentences = ["I ate pizza in Rome."]
+    row = event.to_row()
+    assert len(row) == EVENT_FIELDS.index("raw_sentences") + 1
+    assert row[EVENT_FIELDS.index("first_mentioned")] is None
+
+    decoded = decode_events(encode_events([event]))[0]
+    assert decoded.to_dict() == event.to_dict()
+    assert decoded.sentence_indices is None
+
+def test_v2_rows_with_extra():
+    event = Event.from_dict(_v1_event(custom={"nested": True}))
+    row = event.to_row()
+    # Extra comes after every field, so the optional fields are written as None
+    assert len(row) == len(EVENT_FIELDS) + 1
+    assert row[-1] == {"custom": {"nested": True}}
+
+    encoded = encode_events([event])
+    assert json.loads(encoded)["v"] == EVENTS_FORMAT_VERSION
+    decoded = decode_events(encoded)[0]
+    assert decoded.extra == {"custom": {"nested": True}}
+    assert decoded.occurrences is None
+    assert decoded.to_dict() == event.to_dict()
+
+def test_v2_entities_are_tuples():
+    encoded = encode_events([Event.from_dict(_v1_event())])
+    assert decode_events(encoded)[0].entities == [Entity("Rome", "GPE")]
+
+@pytest.mark.parametrize("data", [None, ""])
+def test_empty(data):
+    assert decode_events(data) == []
+    assert events_json(data) == data
+
+def test_empty_v2():
+    assert decode_events(encode_events([])) == []
+    assert events_json(encode_events([])) == "[]"
+
+@pytest.mark.parametrize("data", [
+    "[1, 2]",
+    '[{"sentence": "x", "entities": [1]}]',
+    '{"v": 2}',
+    '{"v": 2, "events": [5]}',
+    '{"v": 2, "events": [["e1", "x", 0, null, null, [], null, null, null, [], [], [], [], [1]]]}',
+])
+def test_malformed(data):
+    with pytest.raises(ValueError, match="Malformed"):
+        decode_events(data)
+
+def test_invalid_json():
+    with pytest.raises(ValueError):
+        decode_events("{not json")
+
+@pytest.mark.parametrize("data", [
+    json.dumps({"v": EVENTS_FORMAT_VERSION + 1, "events": []}),
+    '{"events": []}',
+    '"text"',
+    "5",
+])
+def test_unsupported_version(data):
+    with pytest.raises(ValueError, match="Unsupported"):
+        decode_events(data)
+
+def test_events_json_v1_unchanged():
+    data = json.dumps([_v1_event(custom=1)])
+    assert events_json(data) is data
+    assert events_json("  " + data) == "  " + data
+
+def test_events_json_v2():
+    stored = [_v1_event(custom=1), _v1_event(event_id="e2", occurrences=2)]
+    data = events_json(encode_events([Event.from_dict(event) for event in stored]))
+    assert json.loads(data) == stored
+
+def test_events_json_unsupported_version():
+    with pytest.raises(ValueError):
+        events_json(json.dumps({"v": EVENTS_FORMAT_VERSION + 1, "events": []}))
@@ -0,0 +1,136 @@
+# backend/tests/test_merge_events.py
+import difflib
+import random
+import pytest
+from app.services import event_index
+from app.services.events import Event
+from app.services.nlp import (
+    _cluster_deterministic, _cluster_greedy, _primary_string, canonical_primary, merge_events,
+)
+
+# Includes non-ASCII words, whose characters land in the hashed signature columns
+WORDS = ["I", "we", "my sister", "The team", "walked", "walk", "ate", "met", "the dog",
+         "a movie", "pizza", "Rome", "café", "naïve", "Zürich", "東京", "straße", "ñandú", "x", ""]
+
+def _random_events(rng: random.Random, n: int, words=WORDS):
+    # Missing subjects and objects are common, so clusters often change their string
+    def pick():
+        return rng.choice(words) if rng.random() < 0.6 else None
+    return [Event(event_id=f"e{i}", sentence=f"Sentence {rng.randint(0, 5)}.", sentence_index=i,
+                  subject=pick(), action=pick(), object=pick())
+            for i in range(n)]
+
+def _ratio(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+def _brute_force_greedy(events, threshold):
+    """ Each event joins the first cluster whose current string is similar enough. """
+    clusters, primaries = [], []
+    for i, event in enumerate(events):
+        canon = canonical_primary(event)
+        for k, primary in enumerate(primaries):
+            if _ratio(_primary_string(*primary), canon) >= threshold:
+                clusters[k].append(i)
+                if not primary[0] and event.subject:
+                    primary[0] = event.subject
+                if not primary[2] and event.object:
+                    primary[2] = event.object
+                break
+        else:
+            clusters.append([i])
+            primaries.append([event.subject, event.action, event.object])
+    return clusters
+
+def _brute_force_deterministic(events, threshold):
+    """ Distinct strings by frequency join the first similar leader; clusters ordered by content. """
+    canons = [canonical_primary(event) for event in events]
+    unique = sorted(set(canons), key=lambda canon: (-canons.count(canon), canon))
+    leaders, leader_of = [], {}
+    for canon in unique:
+        for leader in leaders:
+            if _ratio(*sorted((leader, canon))) >= threshold:
+                leader_of[canon] = leader
+                break
+        else:
+            leaders.append(canon)
+            leader_of[canon] = canon
+
+    def key(i):
+        event = events[i]
+        return (canons[i], event.sentence, event.sentence_index, event.subject or "",
+                event.object or "", event.event_id)
+    clusters = [sorted((i for i in range(len(events)) if leader_of[canons[i]] == leader), key=key)
+                for leader in leaders]
+    return sorted(clusters, key=lambda members: key(members[0]))
+
+@pytest.fixture(params=["numpy", "fallback"])
+def index_backend(request, monkeypatch):
+    if request.param == "fallback":
+        monkeypatch.setattr(event_index, "np", None)
+    return request.param
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("threshold", [0.3, 0.6, 0.9])
+@pytest.mark.parametrize("words", [WORDS, WORDS[:8]], ids=["words", "few_words"])
+def test_greedy_matches_brute_force(index_backend, seed, threshold, words):
+    events = _random_events(random.Random(seed), 150, words)
+    canons = [canonical_primary(event) for event in events]
+    assert _cluster_greedy(events, canons, threshold) == _brute_force_greedy(events, threshold)
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("threshold", [0.3, 0.6, 0.9])
+@pytest.mark.parametrize("words", [WORDS, WORDS[:8]], ids=["words", "few_words"])
+def test_deterministic_matches_brute_force(index_backend, seed, threshold, words):
+    events = _random_events(random.Random(seed), 150, words)
+    canons = [canonical_primary(event) for event in events]
+    assert _cluster_deterministic(events, canons, threshold) == _brute_force_deterministic(events, threshold)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_deterministic_ignores_input_order(seed):
+    rng = random.Random(seed)
+    events = _random_events(rng, 100)
+    shuffled = events[:]
+    rng.shuffle(shuffled)
+
+    def ids(events):
+        canons = [canonical_primary(event) for event in events]
+        return [[events[i].event_id for i in members]
+                for members in _cluster_deterministic(events, canons, 0.6)]
+    assert ids(shuffled) == ids(events)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_paths_agree_on_separated_strings(seed):
+    # With identical strings per group and no two groups similar, both paths find the groups
+    rng = random.Random(seed)
+    threshold = 0.6
+    groups = []
+    for _ in range(200):
+        primary = (rng.choice(WORDS[:6]), rng.choice(WORDS[4:12]), rng.choice(WORDS[8:]) or None)
+        canon = _primary_string(*primary)
+        # ratio() is not symmetric; greedy and deterministic compare in different orders
+        others = [_primary_string(*other) for other in groups]
+        if all(max(_ratio(canon, other), _ratio(other, canon)) < threshold for other in others):
+            groups.append(primary)
+    events = []
+    for i in range(120):
+        subject, action, obj = rng.choice(groups)
+        events.append(Event(event_id=f"e{i}", sentence=f"Sentence {i}.", sentence_index=i,
+                            subject=subject, action=action, object=obj))
+    canons = [canonical_primary(event) for event in events]
+
+    greedy = {frozenset(members) for members in _cluster_greedy(events, canons, threshold)}
+    deterministic = {frozenset(members) for members in _cluster_deterministic(events, canons, threshold)}
+    assert greedy == deterministic
+    assert len(greedy) == len(set(canons))
+
+@pytest.mark.parametrize("deterministic", [False, True])
+def test_merge_events_counts_every_event(deterministic):
+    events = _random_events(random.Random(1), 80)
+    merged = merge_events(events, deterministic=deterministic)
+    assert sum(event.occurrences for event in merged) == len(events)
+
+def test_empty_primaries_merge():
+    events = [Event(event_id="a"), Event(event_id="b", subject=""), Event(event_id="c", action="walked")]
+    canons = [canonical_primary(event) for event in events]
+    assert _cluster_greedy(events, canons, 0.6) == [[0, 1], [2]]
+    assert _cluster_deterministic(events, canons, 0.6) == [[0, 1], [2]]
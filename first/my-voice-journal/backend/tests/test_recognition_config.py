@@ -0,0 +1,42 @@
+# backend/tests/test_recognition_config.py
+import wave
+import pytest
+from google.cloud import speech
+from app.services import audio
+from app.services.transcription import GoogleTranscriber
+
+Encoding = speech.RecognitionConfig.AudioEncoding
+
+@pytest.fixture
+def no_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio, "ffmpeg_available", lambda: False)
+
+@pytest.mark.parametrize("name, encoding", [
+    ("recording.webm", Encoding.WEBM_OPUS),
+    ("recording.WEBM", Encoding.WEBM_OPUS),
+    ("recording.ogg", Encoding.OGG_OPUS),
+])
+def test_unprobed_browser_recordings_use_extension(tmp_path, no_ffmpeg, name, encoding):
+    path = tmp_path / name
+    path.write_bytes(b"\x1aE\xdf\xa3" + bytes(64))
+    config = GoogleTranscriber("unused.json").recognition_config(str(path))
+    assert config.encoding == encoding
+    assert config.sample_rate_hertz == 48000
+
+def test_unknown_format_lets_the_api_detect_it(tmp_path, no_ffmpeg):
+    path = tmp_path / "recording.m4a"
+    path.write_bytes(bytes(64))
+    config = GoogleTranscriber("unused.json").recognition_config(str(path))
+    assert config.encoding == Encoding.ENCODING_UNSPECIFIED
+
+def test_probed_header_wins_over_extension(tmp_path, no_ffmpeg):
+    # A WAV saved under a .webm name is described by its header
+    path = tmp_path / "recording.webm"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(bytes(3200))
+    config = GoogleTranscriber("unused.json").recognition_config(str(path))
+    assert config.encoding == Encoding.LINEAR16
+    assert config.sample_rate_hertz == 16000
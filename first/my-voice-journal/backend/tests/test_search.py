@@ -0,0 +1,40 @@
+# backend/tests/test_search.py
+from datetime import datetime, timedelta
+from app.services.search import MAX_PREFIX_TERMS, SearchIndex
+
+def _index(tmp_path, n: int, max_candidates: int) -> SearchIndex:
+    index = SearchIndex(str(tmp_path / "search.sqlite3"), max_candidates=max_candidates)
+    start = datetime(2024, 1, 1)
+    index.add_entries([{"id": str(i), "user_id": "u", "created_at": start + timedelta(days=i),
+                        "transcription": f"Walked the dog, day {i}."} for i in range(n)])
+    return index
+
+def test_search_reports_truncation(tmp_path):
+    index = _index(tmp_path, 5, max_candidates=3)
+    found = index.search("dog", limit=10)
+    assert sorted(result["id"] for result in found["results"]) == ["2", "3", "4"]
+    assert found["truncated"] is True
+    assert found["cutoff_created_at"].startswith("2024-01-03")
+
+def test_search_not_truncated(tmp_path):
+    for n in (2, 3):
+        index = _index(tmp_path / str(n), n, max_candidates=3)
+        found = index.search("dog", limit=10)
+        assert len(found["results"]) == n
+        assert found["truncated"] is False
+        assert found["cutoff_created_at"] is None
+
+def test_prefix_with_many_terms_matches_them_all(tmp_path):
+    # More distinct indexed terms share the prefix than MAX_PREFIX_TERMS
+    letters = "bcdfghjkmnpqrtvwxz"
+    words = [f"zq{a}{b}" for a in letters for b in letters][:MAX_PREFIX_TERMS + 20]
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    index.add_entries([{"id": word, "user_id": "u", "created_at": datetime(2024, 1, 1),
+                        "transcription": f"Found {word} today."} for word in words])
+
+    found = index.search("zq*", limit=len(words) + 10)
+    assert sorted(result["id"] for result in found["results"]) == sorted(words)
+    assert found["truncated"] is False
+    few = index.search("zqb*", limit=100)
+    assert sorted(result["id"] for result in few["results"]) == [word for word in words if word.startswith("zqb")]
+    assert "<mark>" in few["results"][0]["snippet"]
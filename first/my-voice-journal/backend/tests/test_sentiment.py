@@ -0,0 +1,140 @@
+# backend/tests/test_sentiment.py
+import random
+import re
+import pytest
+import spacy
+from spacy.tokens import Doc
+from app.services import nlp as nlp_module
+from app.services.nlp import TextAnalysis, _analysis_from_doc, analyze_transcripts
+from app.services.sentiment import _SENTENCE_RE, SentimentAnalyzer, SentimentResult
+
+@pytest.fixture(scope="module")
+def blank_nlp():
+    model = spacy.blank("en")
+    model.add_pipe("sentencizer")
+    return model
+
+def test_score_spans_scores_every_span():
+    analyzer = SentimentAnalyzer()
+    text = "A good day. 42! Not bad, sad."
+    result = analyzer.score_spans(text, [(0, 11), (12, 15), (16, 29)])
+    assert result.sentence_scores == [pytest.approx(1 / 3), 0.0, pytest.approx((1.0 - 1.0) / 3)]
+    assert result.score == pytest.approx((1.0 + 0.0) / 6)
+
+def test_score_keeps_sentences_without_words():
+    result = SentimentAnalyzer().score("Great. 123. Bad!")
+    assert result.sentence_scores == [1.0, 0.0, -1.0]
+    assert result.score == 0.0
+
+def test_negation_scope():
+    analyzer = SentimentAnalyzer()
+    assert analyzer.score("not good").score == -0.5
+    assert analyzer.score("not, good").score == 0.5
+    assert analyzer.score("I don't feel good").score == -0.25
+
+def test_sentence_sentiments_follow_parsed_sentences(blank_nlp):
+    text = "What a great day! 2024. It was bad... Really bad\n\nHappy now."
+    doc = blank_nlp(text)
+    sentences = list(doc.sents)
+    analysis = _analysis_from_doc(text, doc, chunk_size=500, max_sentences=3)
+
+    assert len(analysis.sentence_sentiments) == len(sentences)
+    analyzer = SentimentAnalyzer()
+    for sentence, score in zip(sentences, analysis.sentence_sentiments):
+        assert score == pytest.approx(analyzer.score_spans(text, [(sentence.start_char, sentence.end_char)]).score)
+
+def test_sentence_sentiments_match_event_sentences():
+    # A parsed Doc (sentences come from the dependency tree), so events are extracted
+    vocab = spacy.blank("en").vocab
+    words = ["It", "was", "great", ".", "42", ".", "She", "visited", "a", "bad", "place", "."]
+    doc = Doc(vocab, words=words, heads=[1, 1, 1, 1, 4, 4, 7, 7, 10, 10, 7, 7],
+              deps=["nsubj", "ROOT", "acomp", "punct", "ROOT", "punct",
+                    "nsubj", "ROOT", "det", "amod", "dobj", "punct"],
+              pos=["PRON", "AUX", "ADJ", "PUNCT", "NUM", "PUNCT",
+                   "PRON", "VERB", "DET", "ADJ", "NOUN", "PUNCT"])
+    text = doc.text
+    analysis = _analysis_from_doc(text, doc, chunk_size=500, max_sentences=3)
+
+    assert analysis.sentence_sentiments == [pytest.approx(1 / 3), 0.0, pytest.approx(-1 / 5)]
+    scores = {event.sentence: analysis.sentence_sentiments[event.sentence_index] for event in analysis.events}
+    assert scores["She visited a bad place ."] == pytest.approx(-1 / 5)
+
+# Lexicon words in several cases, negations, clause punctuation, digits, and
+# characters whose lowercase depends on context (final sigma) or is longer ("İ")
+PIECES = ["good", "Great", "BAD", "sad", "not", "don't", "Never", "won’t", "happy", "day",
+          "ΟΔΟΣ", "Σ", "İyi", ",", ";", ".", "!", "?", "...", "\n", "\n\n", "42", "x_y", "  ", " "]
+LEXICON = {"good": 1.0, "great": 2.0, "bad": -1.0, "sad": -0.5, "οδος": 0.25, "οδοσ": -0.25, "iyi": 3.0}
+
+def _random_text(rng: random.Random) -> str:
+    text = "".join(rng.choice(PIECES) + rng.choice(["", " ", " "]) for _ in range(rng.randint(0, 30)))
+    # The batch separator inside a text must not split its sentence
+    return text + "\x00bad" if rng.random() < 0.05 else text
+
+def _random_spans(rng: random.Random, text: str):
+    # Arbitrary spans, as a parser may cut sentences anywhere, including mid-word
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 6))))
+    return list(zip(cuts, cuts[1:]))
+
+def _reference_totals(analyzer: SentimentAnalyzer, sentence: str):
+    """ The documented rule, one sentence at a time. """
+    total, words, negated = 0.0, 0, 0
+    for token in re.findall(r"[^\W\d_]+(?:['’][^\W\d_]+)*|[,;:]", sentence.lower()):
+        if token in ",;:":
+            negated = 0
+            continue
+        words += 1
+        weight = analyzer.lexicon.get(token)
+        if weight is not None:
+            total += weight * analyzer.negation_weight if negated else weight
+        if token in analyzer.negations or token.endswith(("n't", "n’t")):
+            negated = analyzer.negation_window
+        elif negated:
+            negated -= 1
+    return total, words
+
+def _reference_score(analyzer: SentimentAnalyzer, text: str, spans):
+    totals = [_reference_totals(analyzer, text[start:end]) for start, end in spans]
+    words = sum(count for _, count in totals)
+    return SentimentResult(
+        score=sum(total for total, _ in totals) / words if words else 0.0,
+        sentence_scores=[total / count if count else 0.0 for total, count in totals],
+    )
+
+@pytest.mark.parametrize("seed", range(20))
+def test_score_many_matches_reference(seed):
+    rng = random.Random(seed)
+    analyzer = SentimentAnalyzer(lexicon=LEXICON, negation_window=rng.randint(1, 4),
+                                 negation_weight=rng.choice([-1.0, -0.5, 0.0]))
+    texts = [_random_text(rng) for _ in range(rng.randint(0, 40))]
+    results = analyzer.score_many(texts)
+    assert results == [analyzer.score(text) for text in texts]
+    for text, result in zip(texts, results):
+        expected = _reference_score(analyzer, text, [match.span() for match in _SENTENCE_RE.finditer(text)])
+        assert result == expected
+
+@pytest.mark.parametrize("seed", range(10))
+def test_score_many_matches_score_spans(seed):
+    rng = random.Random(seed)
+    analyzer = SentimentAnalyzer(lexicon=LEXICON)
+    texts = [_random_text(rng) for _ in range(30)]
+    spans = [_random_spans(rng, text) for text in texts]
+    results = analyzer.score_many(texts, spans)
+    assert results == [analyzer.score_spans(text, text_spans) for text, text_spans in zip(texts, spans)]
+    for text, text_spans, result in zip(texts, spans, results):
+        expected = _reference_score(analyzer, text, text_spans)
+        assert result == expected
+
+def test_analyze_transcripts_scores_batches_like_single_docs(blank_nlp, monkeypatch):
+    monkeypatch.setattr(nlp_module, "get_nlp", lambda: blank_nlp)
+    rng = random.Random(0)
+    texts = [_random_text(rng) if i % 4 else "" for i in range(23)]
+    analyses = list(analyze_transcripts(texts, batch_size=5))
+
+    assert len(analyses) == len(texts)
+    for text, analysis in zip(texts, analyses):
+        if not text:
+            assert analysis == TextAnalysis()
+            continue
+        expected = _analysis_from_doc(text, blank_nlp(text), chunk_size=500, max_sentences=3)
+        assert analysis.sentiment_score == expected.sentiment_score
+        assert analysis.sentence_sentiments == expected.sentence_sentiments
@@ -0,0 +1,45 @@
+# backend/tests/test_vector_store.py
+import numpy as np
+import pytest
+from app.services.vector_store import VectorStore
+
+DIM = 16
+
+def _unit(rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=-1, keepdims=True)
+
+@pytest.fixture(params=["exact", "ann"])
+def store_and_query(request, tmp_path):
+    rng = np.random.default_rng(0)
+    query = _unit(rng.normal(size=DIM))
+    store = VectorStore(str(tmp_path), DIM, ann_min_rows=10 if request.param == "ann" else 10 ** 6, nprobe=64)
+    # Entry A: many events right next to the query, more than k + 8 of them
+    near = _unit(query + 0.01 * rng.normal(size=(40, DIM)))
+    store.add("A", "u", ["event"] * 40, [f"a{i}" for i in range(40)], near)
+    store.add("A", "u", ["transcript"], ["A"], near[:1])
+    for i in range(30):
+        others = _unit(query + 0.5 * rng.normal(size=(2, DIM)))
+        store.add(f"e{i}", "u", ["event", "transcript"], [f"e{i}", f"e{i}"], others)
+    if request.param == "ann":
+        store.build_ann_index(nlist=4)
+    return store, query
+
+@pytest.mark.parametrize("kind", [None, "event", "transcript"])
+def test_search_excludes_entry_before_ranking(store_and_query, kind):
+    store, query = store_and_query
+    results = store.search(query, k=10, kind=kind, exclude_entry="A")
+    assert len(results) == 10
+    assert all(result["entry_id"] != "A" for result in results)
+    scores = [result["score"] for result in results]
+    assert scores == sorted(scores, reverse=True)
+
+def test_search_without_exclusion_ranks_entry_first(store_and_query):
+    store, query = store_and_query
+    results = store.search(query, k=10, kind="event")
+    assert [result["entry_id"] for result in results] == ["A"] * 10
+
+def test_search_exclusion_with_user_filter(store_and_query):
+    store, query = store_and_query
+    assert store.search(query, k=5, user_id="u", exclude_entry="A")[0]["entry_id"] != "A"
+    assert store.search(query, k=5, user_id="other", exclude_entry="A") == []